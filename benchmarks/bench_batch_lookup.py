@@ -0,0 +1,44 @@
+"""
+Compares batched membership tests with one `in` test per query.
+
+contains_many sorts the batch and answers it by finger search, or by one in-order
+walk when the batch holds a query for at least every other entry of the tree.
+
+    $ python benchmarks/bench_batch_lookup.py [--size N] [--seed S]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pybstree import AVLTree  # noqa: E402
+
+
+def bench(label, run, batch):
+    start = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - start
+    print(f'{label:<28} {elapsed * 1e3:9.1f} ms  {elapsed / batch * 1e6:6.2f} us/query')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--size', type=int, default=200_000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    tree = AVLTree.from_sorted(range(0, 2 * args.size, 2))
+    print(f'AVLTree with {args.size:,} entries, half of the queries miss')
+
+    for batch in (1_000, 10_000, 100_000, args.size):
+        queries = [random.randrange(2 * args.size) for _ in range(batch)]
+        bench(f'{batch:>7,} x in', lambda: [query in tree for query in queries], batch)
+        bench(f'{batch:>7,} contains_many', lambda: tree.contains_many(queries), batch)
+
+
+if __name__ == '__main__':
+    main()
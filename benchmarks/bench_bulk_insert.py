@@ -0,0 +1,56 @@
+"""
+Finds the crossover between per-entry updates and a full rebuild for insert_many.
+
+Every batch size is timed with both strategies forced through the module's
+threshold, next to the strategy insert_many picks on its own.
+
+    $ python benchmarks/bench_bulk_insert.py [--size N] [--seed S]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pybstree  # noqa: E402
+from pybstree import AVLTree, BinarySearchTree  # noqa: E402
+
+
+def timed_insert_many(tree, batch, ratio):
+    default, pybstree._BULK_REBUILD_RATIO = pybstree._BULK_REBUILD_RATIO, ratio
+    try:
+        tree = tree.__class__(tree)
+        start = time.perf_counter()
+        tree.insert_many(batch)
+        return time.perf_counter() - start
+    finally:
+        pybstree._BULK_REBUILD_RATIO = default
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--size', type=int, default=100_000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    entries = list(range(0, 4 * args.size, 4))
+    random.shuffle(entries)
+    print(f'threshold: rebuild when batch >= size / {pybstree._BULK_REBUILD_RATIO}')
+
+    for tree in (BinarySearchTree(entries), AVLTree(entries)):
+        print(f'{type(tree).__name__} with {args.size:,} entries')
+        print(f'{"batch":>10} {"per entry":>12} {"rebuild":>12} {"insert_many":>12}')
+        for divisor in (64, 32, 16, 8, 4, 2, 1):
+            batch = [random.randrange(4 * args.size) for _ in range(args.size // divisor)]
+            per_entry = timed_insert_many(tree, batch, 0)
+            rebuild = timed_insert_many(tree, batch, float('inf'))
+            chosen = timed_insert_many(tree, batch, pybstree._BULK_REBUILD_RATIO)
+            print(f'{len(batch):>10,} {per_entry * 1e3:>10.1f}ms {rebuild * 1e3:>10.1f}ms '
+                  f'{chosen * 1e3:>10.1f}ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Counts the rich comparisons made per lookup with tuple and string keys.
+
+The keys are wrapped in an object that counts every ordering and equality
+comparison, then each tree answers a lookup for every key it holds (hits) and for
+as many keys it does not hold (misses).
+
+    $ python benchmarks/bench_comparisons.py [--size N]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pybstree import AVLTree, BinarySearchTree  # noqa: E402
+
+
+class CountingKey:
+    comparisons = 0
+
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        CountingKey.comparisons += 1
+        return self.value < other.value
+
+    def __gt__(self, other):
+        CountingKey.comparisons += 1
+        return self.value > other.value
+
+    def __le__(self, other):
+        CountingKey.comparisons += 1
+        return self.value <= other.value
+
+    def __ge__(self, other):
+        CountingKey.comparisons += 1
+        return self.value >= other.value
+
+    def __eq__(self, other):
+        CountingKey.comparisons += 1
+        return self.value == other.value
+
+    __hash__ = None
+
+
+def make_keys(kind, size):
+    if kind == 'tuple':
+        values = [(i % 97, f'user-{i}', i) for i in range(2 * size)]
+    else:
+        values = [f'/var/log/service/{i:08d}/events' for i in range(2 * size)]
+
+    random.seed(7477)
+    random.shuffle(values)
+    return [CountingKey(value) for value in values[:size]], [CountingKey(value) for value in values[size:]]
+
+
+def bench(tree_class, kind, size):
+    present, missing = make_keys(kind, size)
+    tree = tree_class(present)
+
+    for label, queries in (('hit', present), ('miss', missing)):
+        CountingKey.comparisons = 0
+        start = time.perf_counter()
+        for query in queries:
+            query in tree
+        elapsed = time.perf_counter() - start
+        print(f'{tree_class.__name__:<18} {kind:<7} {label:<5} '
+              f'{CountingKey.comparisons / size:6.2f} comparisons/lookup  '
+              f'{elapsed / size * 1e6:6.2f} us/lookup')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--size', type=int, default=100_000)
+    args = parser.parse_args()
+
+    for tree_class in (AVLTree, BinarySearchTree):
+        for kind in ('tuple', 'str'):
+            bench(tree_class, kind, args.size)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Measures throughput of a shared tree under mixed read/write workloads.
+
+ConcurrentAVLTree, whose readers take no lock, is compared with an AVLTree that
+guards every operation with one lock. Each thread picks a lookup or an update at
+random according to the read ratio. On a GIL build the threads still take turns,
+so the lock-free reads show most on free-threaded CPython.
+
+    $ python benchmarks/bench_concurrent.py [--size N] [--threads T] [--ops N]
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pybstree import AVLTree, ConcurrentAVLTree  # noqa: E402
+
+
+class LockedAVLTree:
+    def __init__(self, entries):
+        self._tree = AVLTree.from_sorted(entries)
+        self._lock = threading.Lock()
+
+    def __contains__(self, entry):
+        with self._lock:
+            return entry in self._tree
+
+    def insert(self, entry):
+        with self._lock:
+            self._tree.insert(entry)
+
+    def delete(self, entry):
+        with self._lock:
+            try:
+                self._tree.delete(entry)
+            except KeyError:
+                pass
+
+
+class SnapshotAVLTree(ConcurrentAVLTree):
+    def delete(self, entry):
+        try:
+            super().delete(entry)
+        except KeyError:
+            pass
+
+
+def run(tree, threads, ops, read_ratio, size):
+    def worker(seed):
+        rng = random.Random(seed)
+        for _ in range(ops):
+            entry = rng.randrange(2 * size)
+            if rng.random() < read_ratio:
+                entry in tree
+            elif rng.random() < 0.5:
+                tree.insert(entry)
+            else:
+                tree.delete(entry)
+
+    workers = [threading.Thread(target=worker, args=(seed,)) for seed in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return threads * ops / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--size', type=int, default=100_000)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--ops', type=int, default=50_000)
+    args = parser.parse_args()
+
+    entries = range(0, 2 * args.size, 2)
+    print(f'{args.threads} threads, {args.ops:,} operations each, {args.size:,} entries')
+    print(f'{"reads":>6} {"locked AVLTree":>16} {"ConcurrentAVLTree":>19}')
+    for read_ratio in (0.5, 0.9, 0.99, 1.0):
+        locked = run(LockedAVLTree(entries), args.threads, args.ops, read_ratio, args.size)
+        snapshot = run(SnapshotAVLTree(entries), args.threads, args.ops, read_ratio, args.size)
+        print(f'{read_ratio:>6.0%} {locked / 1e3:>12.0f} k/s {snapshot / 1e3:>15.0f} k/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""
+Measures overlap queries on an IntervalTree against filtering every entry of traverse().
+
+    $ python benchmarks/bench_intervals.py [--size N] [--queries N] [--width N]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pybstree import IntervalTree  # noqa: E402
+
+
+def scan(tree, lo, hi):
+    return [interval for interval in tree.traverse() if interval[0] < hi and lo < interval[1]]
+
+
+def bench(label, overlap, queries):
+    start = time.perf_counter()
+    found = 0
+    for lo, hi in queries:
+        found += len(list(overlap(lo, hi)))
+    elapsed = time.perf_counter() - start
+    print(f'{label:<10} {elapsed / len(queries) * 1e6:12.2f} us/query {found / len(queries):8.1f} intervals/query')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--size', type=int, default=200_000)
+    parser.add_argument('--queries', type=int, default=1_000)
+    parser.add_argument('--width', type=int, default=100)
+    args = parser.parse_args()
+
+    random.seed(0)
+    span = 100 * args.size
+    starts = sorted(random.sample(range(span), args.size))
+    tree = IntervalTree.from_sorted([(start, start + random.randrange(1, args.width)) for start in starts])
+    lows = [random.randrange(span) for _ in range(args.queries)]
+    queries = [(lo, lo + random.randrange(1, args.width)) for lo in lows]
+
+    bench('overlap', tree.overlap, queries)
+    bench('scan', lambda lo, hi: scan(tree, lo, hi), queries[:max(len(queries) // 100, 1)])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""
+Measures membership tests on hits and on misses separately.
+
+The "try/except" line is the former __contains__, which called the raising search
+and caught its KeyError, kept here as a reference point for the exception-free path.
+
+    $ python benchmarks/bench_membership.py [--size N] [--lookups N]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pybstree import ArrayAVLTree, AVLTree, BinarySearchTree  # noqa: E402
+
+
+def contains_by_search(tree, entry):
+    try:
+        tree.search(entry)
+        return True
+    except KeyError:
+        return False
+
+
+def bench(label, contains, queries):
+    start = time.perf_counter()
+    for query in queries:
+        contains(query)
+    elapsed = time.perf_counter() - start
+    print(f'{label:<34} {elapsed / len(queries) * 1e6:6.2f} us/lookup')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--size', type=int, default=100_000)
+    parser.add_argument('--lookups', type=int, default=200_000)
+    args = parser.parse_args()
+
+    random.seed(0)
+    entries = list(range(0, 2 * args.size, 2))
+    hits = [random.choice(entries) for _ in range(args.lookups)]
+    misses = [hit + 1 for hit in hits]
+    shuffled = entries[:]
+    random.shuffle(shuffled)
+
+    for tree in (BinarySearchTree(shuffled), AVLTree(shuffled), ArrayAVLTree(shuffled)):
+        name = type(tree).__name__
+        for label, queries in (('hit', hits), ('miss', misses)):
+            bench(f'{name} {label} try/except', lambda entry: contains_by_search(tree, entry), queries)
+            bench(f'{name} {label} in', tree.__contains__, queries)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Measures the memory held by the tree nodes with tracemalloc.
+
+The entries are allocated before tracing starts, so the figures only count the
+node objects the trees allocate for them. The before column builds the same tree
+out of DictNode, the nodes as they were before they had __slots__, kept here as
+a reference point.
+
+    $ python benchmarks/bench_memory.py [--size N]
+"""
+import argparse
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pybstree import ArrayAVLTree, AVLTree, BinarySearchTree  # noqa: E402
+
+
+class DictNode:
+    """A node with the attributes of BSTreeNode and _AVLNode, held in a __dict__."""
+
+    def __init__(self, entry, key):
+        self.entry = entry
+        self.key = key
+        self.left = None
+        self.right = None
+        self.height = 1
+        self.size = 1
+
+
+def build_dict_nodes(entries, lo=0, hi=None):
+    """Builds a perfectly balanced tree of DictNode out of the sorted entries."""
+    if hi is None:
+        hi = len(entries)
+    if lo == hi:
+        return None
+
+    mid = (lo + hi) // 2
+    node = DictNode(entries[mid], entries[mid])
+    node.left = build_dict_nodes(entries, lo, mid)
+    node.right = build_dict_nodes(entries, mid + 1, hi)
+    node.height = 1 + max(node.left.height if node.left else 0, node.right.height if node.right else 0)
+    node.size = hi - lo
+    return node
+
+
+def traced(build, entries):
+    """Returns the bytes allocated by build(entries) that are still held afterwards."""
+    tracemalloc.start()
+    result = build(entries)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    del result
+    return current
+
+
+def bench(tree_class, entries, before=None):
+    after = traced(tree_class.from_sorted, entries)
+    before = '' if before is None else f'{before / len(entries):8.1f}'
+    print(f'{tree_class.__name__:<18} {len(entries):>10,} entries  '
+          f'{before:>8} {after / len(entries):8.1f} bytes/entry  {after / 2 ** 20:8.1f} MiB')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--size', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    entries = list(range(args.size))
+    before = traced(build_dict_nodes, entries)
+    print(f'{"":<39}{"before":>8} {"after":>8}')
+    bench(BinarySearchTree, entries, before)
+    bench(AVLTree, entries, before)
+    bench(ArrayAVLTree, entries)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Compares restoring a tree from disk with rebuilding it entry by entry.
+
+The "nodes" line pickles the node objects themselves, the way trees were pickled
+before they had __reduce__; it is skipped for trees too deep to pickle that way.
+
+    $ python benchmarks/bench_serialization.py [--size N]
+"""
+import argparse
+import copyreg
+import io
+import os
+import pickle
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pybstree import AVLTree  # noqa: E402
+
+
+def timed(run):
+    start = time.perf_counter()
+    result = run()
+    return result, time.perf_counter() - start
+
+
+def pickle_nodes(tree):
+    """Pickles tree with its __reduce__ bypassed, so the node objects are pickled one by one."""
+    stream = io.BytesIO()
+    pickler = pickle.Pickler(stream, pickle.HIGHEST_PROTOCOL)
+    pickler.dispatch_table = copyreg.dispatch_table.copy()
+    pickler.dispatch_table[type(tree)] = lambda tree: (copyreg.__newobj__, (type(tree),), tree.__dict__)
+    try:
+        pickler.dump(tree)
+    except RecursionError:
+        return None
+    return stream.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--size', type=int, default=500_000)
+    args = parser.parse_args()
+
+    random.seed(0)
+    entries = random.sample(range(10 * args.size), args.size)
+    tree, elapsed = timed(lambda: AVLTree(entries))
+    print(f'AVLTree with {args.size:,} random entries')
+    print(f'{"insert one by one":<28} {elapsed:8.3f}s')
+
+    data, dumped = timed(lambda: pickle_nodes(tree))
+    if data is not None:
+        _, loaded = timed(lambda: pickle.loads(data))
+        print(f'{"pickle nodes":<28} {dumped:8.3f}s dump {loaded:8.3f}s load {len(data) / 1e6:8.1f} MB')
+
+    data, dumped = timed(lambda: pickle.dumps(tree, pickle.HIGHEST_PROTOCOL))
+    _, loaded = timed(lambda: pickle.loads(data))
+    print(f'{"pickle":<28} {dumped:8.3f}s dump {loaded:8.3f}s load {len(data) / 1e6:8.1f} MB')
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'tree.bin')
+        for keep_shape in (True, False):
+            _, dumped = timed(lambda: tree.save(path, keep_shape=keep_shape))
+            _, loaded = timed(lambda: AVLTree.load(path))
+            label = f'save/load keep_shape={keep_shape}'
+            print(f'{label:<28} {dumped:8.3f}s dump {loaded:8.3f}s load {os.path.getsize(path) / 1e6:8.1f} MB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""
+Inserts keys in ascending order, the worst case for an unbalanced tree.
+
+The BinarySearchTree degenerates into a linked list, so its run is quadratic and
+uses a smaller default size; the point is that it completes instead of raising
+RecursionError. The AVLTree and Treap runs insert the full 1M keys.
+
+    $ python benchmarks/bench_sorted_insert.py [--avl-size N] [--bst-size N]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pybstree import AVLTree, BinarySearchTree, Treap  # noqa: E402
+
+
+def bench(tree_class, size):
+    tree = tree_class()
+    start = time.perf_counter()
+    for entry in range(size):
+        tree.insert(entry)
+    elapsed = time.perf_counter() - start
+
+    assert len(tree) == size
+    print(f'{tree_class.__name__:<18} {size:>10,} sorted inserts  '
+          f'{elapsed:8.2f}s  {size / elapsed:12,.0f} inserts/s  height {tree.height}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--avl-size', type=int, default=1_000_000)
+    parser.add_argument('--bst-size', type=int, default=5_000)
+    args = parser.parse_args()
+
+    bench(AVLTree, args.avl_size)
+    bench(Treap, args.avl_size)
+    bench(BinarySearchTree, args.bst_size)
+
+
+if __name__ == '__main__':
+    main()
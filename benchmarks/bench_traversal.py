@@ -0,0 +1,48 @@
+"""
+Measures full-scan throughput of every traversal order.
+
+The recursive line is the nested `yield from` in-order generator the trees used
+to have, kept here as a reference point for the stack based traversals.
+
+    $ python benchmarks/bench_traversal.py [--size N]
+"""
+import argparse
+import os
+import sys
+import time
+from collections import deque
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pybstree import AVLTree  # noqa: E402
+
+
+def recursive_inorder(root):
+    if root:
+        yield from recursive_inorder(root.left)
+        yield root.entry
+        yield from recursive_inorder(root.right)
+
+
+def bench(label, make_iterator, size):
+    start = time.perf_counter()
+    deque(make_iterator(), maxlen=0)
+    elapsed = time.perf_counter() - start
+    print(f'{label:<20} {elapsed:8.3f}s  {size / elapsed / 1e6:8.2f} M entries/s')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--size', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    tree = AVLTree.from_sorted(range(args.size))
+    print(f'AVLTree with {args.size:,} entries, height {tree.height}')
+
+    bench('inorder (recursive)', lambda: recursive_inorder(tree.root), args.size)
+    for order in ('inorder', 'preorder', 'postorder', 'bfs'):
+        bench(order, lambda: tree.traverse(order), args.size)
+
+
+if __name__ == '__main__':
+    main()
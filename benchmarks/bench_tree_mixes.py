@@ -0,0 +1,111 @@
+"""
+Compares BinarySearchTree, AVLTree, RBTree and Treap on insert-heavy, delete-heavy and lookup-heavy mixes.
+
+Each tree starts from the same entries, inserted in random order, then runs the same
+operations, generated beforehand so that deletes always hit. A second, untimed run
+counts the rotations of the balanced trees.
+
+    $ python benchmarks/bench_tree_mixes.py [--size N] [--operations N]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pybstree  # noqa: E402
+from pybstree import AVLTree, BinarySearchTree, RBTree, Treap  # noqa: E402
+
+MIXES = {
+    'insert-heavy': (0.8, 0.1, 0.1),
+    'delete-heavy': (0.4, 0.5, 0.1),
+    'lookup-heavy': (0.1, 0.1, 0.8),
+}
+
+
+def make_operations(entries, count, weights, span):
+    """Returns (operation, entry) pairs drawn with the weights of insert, delete and search."""
+    present = list(entries)
+    index = {entry: i for i, entry in enumerate(present)}
+    operations = []
+    for operation in random.choices(('insert', 'delete', 'search'), weights, k=count):
+        if operation == 'delete' and present:
+            entry = present[random.randrange(len(present))]
+            last = present.pop()
+            if last != entry:
+                present[index[entry]] = last
+                index[last] = index[entry]
+            del index[entry]
+        elif operation == 'delete':
+            continue
+        else:
+            entry = random.randrange(span)
+            if operation == 'insert' and entry not in index:
+                index[entry] = len(present)
+                present.append(entry)
+        operations.append((operation, entry))
+    return operations
+
+
+def build(tree_class, entries):
+    tree = tree_class()
+    for entry in entries:
+        tree.insert(entry)
+    return tree
+
+
+def apply(tree, operations):
+    actions = {'insert': tree.insert, 'delete': tree.delete, 'search': tree.__contains__}
+    for operation, entry in operations:
+        actions[operation](entry)
+
+
+def count_rotations(tree, operations):
+    """Applies the operations to tree and returns the number of single rotations made."""
+    counts = [0]
+    node_class = pybstree._AVLNode
+    rotate_left, rotate_right = node_class._rotate_left, node_class._rotate_right
+
+    def counting(rotate):
+        def wrapper(node):
+            counts[0] += 1
+            return rotate(node)
+        return wrapper
+
+    node_class._rotate_left, node_class._rotate_right = counting(rotate_left), counting(rotate_right)
+    try:
+        apply(tree, operations)
+    finally:
+        node_class._rotate_left, node_class._rotate_right = rotate_left, rotate_right
+    return counts[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--size', type=int, default=100_000)
+    parser.add_argument('--operations', type=int, default=200_000)
+    args = parser.parse_args()
+
+    random.seed(0)
+    span = 4 * args.size
+    entries = random.sample(range(span), args.size)
+
+    for mix, weights in MIXES.items():
+        operations = make_operations(entries, args.operations, weights, span)
+        for tree_class in (BinarySearchTree, AVLTree, RBTree, Treap):
+            tree = build(tree_class, entries)
+            start = time.perf_counter()
+            apply(tree, operations)
+            elapsed = time.perf_counter() - start
+            line = (f'{mix:<13} {tree_class.__name__:<17} {elapsed / len(operations) * 1e6:6.2f} us/op'
+                    f'  height {tree.height:3}')
+            if tree_class is not BinarySearchTree:
+                rotations = count_rotations(build(tree_class, entries), operations)
+                line += f'  {rotations / len(operations):5.3f} rotations/op'
+            print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -20,20 +20,54 @@ LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
 OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
 WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 """
+import gc
+import math
+import operator
+import pickle
+import random
+import sys
+import threading
 from abc import ABC
+from array import array
 from collections import deque
+from collections.abc import ItemsView, Mapping, MutableMapping, ValuesView
+from contextlib import contextmanager
+from copy import deepcopy
+from itertools import islice
+
+# A batch of lookups is answered by one in-order walk over the tree once it has at least
+# one query for every _DENSE_BATCH_RATIO entries, and by finger searches below that.
+_DENSE_BATCH_RATIO = 2
+
+# insert_many and delete_many rebuild the whole tree once the batch holds at least one entry
+# for every _BULK_REBUILD_RATIO entries of the tree, and update it entry by entry below that.
+_BULK_REBUILD_RATIO = 3
+
+# save() streams a tree to its file in pickled chunks of this many entries.
+_SAVE_CHUNK_SIZE = 1 << 16
+_SAVE_FORMAT = ('pybstree', 3)
+_SAVE_MULTISET_FORMAT = ('pybstree-multiset', 3)
+
+# Pauses of the garbage collector may nest and overlap between threads, so they are counted
+# and only the last one to end turns the collector back on, if it was on before the first.
+_gc_pause_lock = threading.Lock()
+_gc_pauses = 0
+_gc_was_enabled = False
 
 
 class EmptyBSTNode:
+    __slots__ = ('height', 'size')
+
     def __init__(self):
         self.height = 0
+        self.size = 0
 
-    def insert(self, entry):
-        return BSTreeNode(entry)
+    def insert(self, key, entry):
+        return BSTreeNode(entry, key)
 
-    def delete(self, entry):
+    def delete(self, key):
         """Cannot delete a entry from a EmptyNode"""
-        raise KeyError(f"KeyError: {entry}")
+        raise KeyError(f"KeyError: {key}")
 
     def __str__(self):
         return ""
@@ -53,51 +87,109 @@ class EmptyBSTNode:
         """Clears the whole subtree"""
         return EMPTY_NODE
 
-    def pred(self, pred, entry):
-        raise KeyError(f'Predecessor of {entry} not found.')
+    def pred(self, pred, key):
+        raise KeyError(f'Predecessor of {key} not found.')
 
-    def succ(self, pred, entry):
-        raise KeyError(f'Successor of {entry} not found.')
+    def succ(self, pred, key):
+        raise KeyError(f'Successor of {key} not found.')
 
 
 EMPTY_NODE = EmptyBSTNode()
 
 
-class AbstractBSTreeNode(ABC):
-    def __init__(self, entry):
+class AbstractBSTreeNode:
+    __slots__ = ('entry', 'key', 'left', 'right', 'height', 'size')
+    _empty = EMPTY_NODE
+
+    def __init__(self, entry, key):
         self.entry = entry
-        self.left = EMPTY_NODE
-        self.right = EMPTY_NODE
+        self.key = key
+        self.left = self._empty
+        self.right = self._empty
         self.height = 1
+        self.size = 1
 
-    def insert(self, entry):
-        if entry > self.entry:
-            self.right = self.right.insert(entry)
-        elif entry < self.entry:
-            self.left = self.left.insert(entry)
+    def insert(self, key, entry):
+        """Inserts a entry with the given key to the subtree and returns its root.
+        The descent is iterative, so a degenerate subtree cannot exhaust the stack."""
+        path = []
+        candidate = None
+        root = self
 
-        self._update_height()
+        while root:
+            path.append(root)
+            if key < root.key:
+                root = root.left
+                go_right = False
+            else:
+                candidate = root
+                root = root.right
+                go_right = True
 
-        return self
+        if candidate is not None and not candidate.key < key:
+            return self
 
-    def delete(self, entry):
-        """Deletes a entry from subtree."""
-        if entry > self.entry:
-            self.right = self.right.delete(entry)
-        elif entry < self.entry:
-            self.left = self.left.delete(entry)
+        parent = path[-1]
+        if go_right:
+            parent.right = parent.right.insert(key, entry)
         else:
-            if self.is_leaf():
-                return EMPTY_NODE
+            parent.left = parent.left.insert(key, entry)
+
+        for node in reversed(path):
+            node._update_height()
+
+        return self
+
+    def delete(self, key):
+        """Deletes the entry with the given key from subtree and returns its root.
+        The descent is iterative, so a degenerate subtree cannot exhaust the stack."""
+        path = []
+        target = None
+        root = self
 
-            if self.left:
-                new_entry = self.left.max()
-                self.entry = new_entry
-                self.left = self.left.delete(new_entry)
+        while root:
+            path.append(root)
+            if root.key < key:
+                root = root.right
             else:
-                return self.right
+                target = len(path) - 1
+                root = root.left
 
-        self._update_height()
+        if target is None or key < path[target].key:
+            raise KeyError(f"KeyError: {key}")
+
+        root = path[target]
+        del path[target:]
+
+        while True:
+            if root.is_leaf():
+                replacement = self._empty
+                break
+
+            if not root.left:
+                replacement = root.right
+                break
+
+            path.append(root)
+            max_node = root.left
+            while max_node.right:
+                path.append(max_node)
+                max_node = max_node.right
+
+            root._assign(max_node)
+            root = max_node
+
+        if not path:
+            return replacement
+
+        parent = path[-1]
+        if parent.left is root:
+            parent.left = replacement
+        else:
+            parent.right = replacement
+
+        for node in reversed(path):
+            node._update_height()
 
         return self
 
@@ -128,118 +220,440 @@ class AbstractBSTreeNode(ABC):
     def __str__(self):
         return f"{self.entry} ({str(self.left)}) ({str(self.right)})"
 
-    def __bool__(self):
-        return True
-
-    def __len__(self):
-        """Return the number of elements in this subtree."""
-        return 1 + len(self.left) + len(self.right)
-
     def __eq__(self, other) -> bool:
         """Checks if two nodes are equal."""
         return self.entry == other.entry and self.left == other.left and self.right == other.right
 
     def clear(self):
         """Clears the whole subtree"""
-        if self.is_leaf():
-            return EMPTY_NODE
-        self.left = self.left.clear()
-        self.right = self.right.clear()
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if node.left:
+                stack.append(node.left)
+            if node.right:
+                stack.append(node.right)
+            node.left = node.right = self._empty
+
+        return self._empty
+
+    def _copy(self):
+        """Returns a copy of this node alone, with empty children."""
+        node = self.__class__(self.entry, self.key)
+        node.height = self.height
+        node.size = self.size
+        return node
+
+    def _assign(self, other):
+        """Takes over the entry of other, when other is about to be removed in its place."""
+        self.entry, self.key = other.entry, other.key
+
+    def search(self, key):
+        """Returns the node with the given key, else raise KeyError"""
+        node = _lower_bound(self, key)
+        if node is None or key < node.key:
+            raise KeyError(f'Entry {key} not found.')
+        return node
+
+    def pred(self, pred, key):
+        """Returns the entry that precedes the one with the given key in the subtree, pred
+        being the closest smaller ancestor known so far. Raises KeyError if there is none."""
+        candidate = None
+        root = self
 
-        return EMPTY_NODE
+        while root:
+            if root.key < key:
+                pred = root
+                root = root.right
+            else:
+                candidate = root
+                root = root.left
 
-    def search(self, entry):
-        """Returns node.k if T has a entry k, else raise KeyError"""
+        if candidate is None or key < candidate.key or not pred:
+            raise KeyError(f'Predecessor of {key} not found.')
+        return pred.entry
+
+    def succ(self, succ, key):
+        """Returns the entry that succeeds the one with the given key in the subtree, succ
+        being the closest greater ancestor known so far. Raises KeyError if there is none."""
+        candidate = None
         root = self
 
         while root:
-            if entry > root.entry:
-                root = root.right
-            elif entry < root.entry:
+            if key < root.key:
+                succ = root
                 root = root.left
             else:
-                return root
+                candidate = root
+                root = root.right
+
+        if candidate is None or candidate.key < key or not succ:
+            raise KeyError(f'Successor of {key} not found.')
+        return succ.entry
+
+    def _update_height(self):
+        """Updates the height and the size of the subtree rooted at this node."""
+        self.height = 1 + max(self.left.height, self.right.height)
+        self.size = 1 + self.left.size + self.right.size
+
+
+class BSTreeNode(AbstractBSTreeNode):
+    __slots__ = ()
+
 
-        raise KeyError(f'Entry {entry} not found.')
+def _lower_bound(root, key):
+    """Returns the node of the subtree with the smallest key that is not smaller than key,
+    or None. Only one comparison is made per level, equality is left to the caller."""
+    candidate = None
 
-    def pred(self, pred, entry):
-        if entry > self.entry:
-            return self.right.pred(self, entry)
-        elif entry < self.entry:
-            return self.left.pred(pred, entry)
+    while root:
+        if root.key < key:
+            root = root.right
         else:
-            if self.left:
-                return self.left.max()
-            if pred:
-                return pred.entry
+            candidate = root
+            root = root.left
+
+    return candidate
+
+
+def _walk_lower_bounds(root, keys):
+    """Yields the lower bound node of each of the keys, which must be in ascending order,
+    or None, by a single in-order walk over the subtree."""
+    nodes = _range_nodes(root, None, None, (True, True), False)
+    node = next(nodes, None)
+    for key in keys:
+        while node is not None and node.key < key:
+            node = next(nodes, None)
+        yield node
+
+
+def _finger_lower_bounds(root, keys):
+    """Yields the lower bound node of each of the keys, which must be in ascending order,
+    or None. Every search resumes from the previous one, climbing back up only until the
+    key is in range, so close keys cost much less than a descent from the root."""
+    stack = []
+    subtree = root
+
+    for key in keys:
+        # stack holds the nodes where the last descent turned left, its top is the answer
+        while stack and stack[-1].key < key:
+            subtree = stack.pop().right
+        while subtree:
+            if subtree.key < key:
+                subtree = subtree.right
+            else:
+                stack.append(subtree)
+                subtree = subtree.left
+        yield stack[-1] if stack else None
 
-            raise KeyError(f'Predecessor of {entry} not found.')
 
-    def succ(self, succ, entry):
-        if entry > self.entry:
-            return self.right.succ(succ, entry)
-        elif entry < self.entry:
-            return self.left.succ(self, entry)
+def _is_ndarray(obj):
+    """Tells whether obj is a NumPy array. NumPy is never imported here: an array can only
+    exist once some other module has imported it."""
+    np = sys.modules.get('numpy')
+    return np is not None and isinstance(obj, np.ndarray)
+
+
+def _copy_nodes(root):
+    """Returns a copy of the node structure of the subtree, the entries themselves are shared."""
+    if not root:
+        return root
+
+    new_root = root._copy()
+    stack = [(root, new_root)]
+    while stack:
+        node, new_node = stack.pop()
+        if node.left:
+            new_node.left = node.left._copy()
+            stack.append((node.left, new_node.left))
+        if node.right:
+            new_node.right = node.right._copy()
+            stack.append((node.right, new_node.right))
+
+    return new_root
+
+
+def _range_nodes(root, lo, hi, inclusive, reverse):
+    """Yields the nodes of the subtree whose keys lie between lo and hi, in order or in
+    reverse order. A bound set to None leaves that side of the range open."""
+    lo_inclusive, hi_inclusive = inclusive
+
+    def below(key):
+        return lo is not None and (key < lo if lo_inclusive else key <= lo)
+
+    def above(key):
+        return hi is not None and (key > hi if hi_inclusive else key >= hi)
+
+    if reverse:
+        before, after = above, below
+    else:
+        before, after = below, above
+
+    stack = []
+
+    while root:
+        if before(root.key):
+            root = root.left if reverse else root.right
         else:
-            if self.right:
-                return self.right.min()
-            if succ:
-                return succ.entry
+            stack.append(root)
+            root = root.right if reverse else root.left
 
-            raise KeyError(f'Successor of {entry} not found.')
+    while stack:
+        root = stack.pop()
+        if after(root.key):
+            return
+        yield root
 
-    def _update_height(self):
-        self.height = 1 + max(self.left.height, self.right.height)
+        root = root.left if reverse else root.right
+        while root:
+            stack.append(root)
+            root = root.right if reverse else root.left
+
+
+@contextmanager
+def _gc_paused():
+    """Keeps the cyclic garbage collector off for the block. Building a tree allocates one
+    object per entry and no cycles, which would otherwise trigger many useless full passes.
+    The block may be entered again, from this thread or others, while it is running."""
+    global _gc_pauses, _gc_was_enabled
+    with _gc_pause_lock:
+        if not _gc_pauses:
+            _gc_was_enabled = gc.isenabled()
+            gc.disable()
+        _gc_pauses += 1
+    try:
+        yield
+    finally:
+        with _gc_pause_lock:
+            _gc_pauses -= 1
+            if not _gc_pauses and _gc_was_enabled:
+                gc.enable()
+
+
+def _load_tree(cls, entries, options, shape):
+    """Rebuilds a tree pickled by AbstractBinarySearchTree.__reduce__."""
+    tree = cls(**options)
+    with _gc_paused():
+        tree._restore(entries, shape)
+    return tree
+
+
+def _read_save_header(file, path, cls, save_format):
+    """Reads the header that save wrote at the start of file and returns the fields that
+    follow the format and the class name. Raises ValueError if the file was not written by
+    cls.save: another class reads the shape stream and the options differently."""
+    header = pickle.load(file)
+    if not isinstance(header, tuple) or header[:len(save_format)] != save_format:
+        raise ValueError(f'{path} was not written by {cls.__name__}.save.')
+    name, *fields = header[len(save_format):]
+    if name != cls.__name__:
+        raise ValueError(f'{path} was written by {name}.save, not by {cls.__name__}.save.')
+    return fields
+
+
+def _write_chunks(file, items, typecode=None):
+    """Pickles the items to file in lists of up to _SAVE_CHUNK_SIZE items, or in arrays of
+    typecode if one is given."""
+    while True:
+        chunk = list(islice(items, _SAVE_CHUNK_SIZE))
+        if not chunk:
+            return
+        pickle.dump(chunk if typecode is None else array(typecode, chunk), file, pickle.HIGHEST_PROTOCOL)
+
+
+def _read_chunks(file, items, count):
+    """Extends items with the pickled chunks read from file until it holds count items."""
+    while len(items) < count:
+        items.extend(pickle.load(file))
+    return items
+
+
+class TreeCursor:
+    """
+    TreeCursor points at an entry of a tree and steps to the neighbouring entries.
+    The cursor keeps the path from the root down to its node, so stepping only
+    walks the nodes between two neighbours: O(1) amortized per step instead of a
+    new O(log n) descent for every pred() or succ() call.
+    Stepping past either end leaves the cursor not valid instead of raising.
+    Changing the tree invalidates its cursors: using one afterwards raises
+    RuntimeError, the same way iterating over a dict that changed size does.
+    TreeCursor objects are created by tree.find_cursor(entry) and
+    tree.lower_bound_cursor(entry).
+    """
 
+    def __init__(self, tree, path):
+        """Creates a cursor on the last node of path, which goes down from the root of tree."""
+        self._tree = tree
+        self._path = path
+        self._version = tree._version
 
-class BSTreeNode(AbstractBSTreeNode):
-    pass
+    @property
+    def valid(self):
+        """True if the cursor is positioned on an entry."""
+        self._check_version()
+        return bool(self._path)
+
+    @property
+    def entry(self):
+        """The entry under the cursor. Raises IndexError if the cursor is not valid."""
+        self._check_version()
+        if not self._path:
+            raise IndexError('Cursor is not positioned on an entry.')
+        return self._path[-1].entry
+
+    def next(self):
+        """Moves the cursor to the next entry in order. Returns True if there was one."""
+        self._check_version()
+        path = self._path
+        if not path:
+            return False
+
+        node = path[-1].right
+        if node:
+            while node:
+                path.append(node)
+                node = node.left
+            return True
+
+        child = path.pop()
+        while path and path[-1].right is child:
+            child = path.pop()
+        return bool(path)
+
+    def prev(self):
+        """Moves the cursor to the previous entry in order. Returns True if there was one."""
+        self._check_version()
+        path = self._path
+        if not path:
+            return False
+
+        node = path[-1].left
+        if node:
+            while node:
+                path.append(node)
+                node = node.right
+            return True
+
+        child = path.pop()
+        while path and path[-1].left is child:
+            child = path.pop()
+        return bool(path)
+
+    def _check_version(self):
+        """Raises RuntimeError if the tree changed since the cursor was created."""
+        if self._version != self._tree._version:
+            raise RuntimeError('Tree changed since the cursor was created.')
+
+    def __repr__(self):
+        """C.__repr__(...) <==> repr(x)."""
+        if self._path:
+            return f'{self.__class__.__name__}({self._path[-1].entry!r})'
+        return f'{self.__class__.__name__}()'
 
 
 class AbstractBinarySearchTree(ABC):
-    def __init__(self, args=None):
-        """Initialize the tree according to the arguments passed. """
-        self.root = EMPTY_NODE
+    _empty_node = EMPTY_NODE
+    _node_class = BSTreeNode
+    # number of low bits of every value of _shape that carry the state of a node
+    _shape_bits = 0
+
+    def __init__(self, args=None, key=None):
+        """Initialize the tree according to the arguments passed.
+        key : optional function of one argument computing the key each entry is ordered by.
+            It is called once per entry when the entry is inserted and the result is kept
+            on the node, so lookups only compare keys. Entries with equal keys are
+            considered the same entry. By default the entries are compared directly.
+        """
+        self.key = key
+        self.root = self._empty_node
+        self._version = 0
 
         self._init_tree(args)
 
     def insert(self, entry):
-        self.root = self.root.insert(entry)
+        self._insert_key(self._key_of(entry), entry)
+        self._version += 1
+
+    def _insert_key(self, key, entry):
+        """Inserts entry with its key into the nodes of T, every single insert goes through here."""
+        self.root = self.root.insert(key, entry)
+
+    def _key_of(self, entry):
+        """Returns the key entry is ordered by."""
+        return entry if self.key is None else self.key(entry)
 
     def __bool__(self):
         return bool(self.root)
 
+    def __iter__(self):
+        """iter(T) -> iterates over the entries of T in ascending order."""
+        return self.traverse()
+
     def __len__(self):
         """T.__len__() <==> len(x). Retuns the number of elements in the tree."""
-        return len(self.root)
+        return self.root.size
 
     def _search(self, entry):
         """Returns node.k if T has a entry k, else raise KeyError"""
-        root = self.root
-
-        while root:
-            if entry > root.entry:
-                root = root.right
-            elif entry < root.entry:
-                root = root.left
-            else:
-                return root
-
-        raise KeyError(f'Entry {entry} not found.')
+        key = self._key_of(entry)
+        node = _lower_bound(self.root, key)
+        if node is None or key < node.key:
+            raise KeyError(f'Entry {entry} not found.')
+        return node
 
     def __contains__(self, entry):
         """k in T -> True if T has a entry k, else False"""
-        try:
-            self._search(entry)
-            return True
-        except KeyError:
-            return False
+        key = self._key_of(entry)
+        node = _lower_bound(self.root, key)
+        return node is not None and not key < node.key
+
+    def get(self, entry, default=None):
+        """T.get(entry[, default]) -> the entry of T equal to entry, else default."""
+        key = self._key_of(entry)
+        node = _lower_bound(self.root, key)
+        if node is None or key < node.key:
+            return default
+        return node.entry
+
+    def search_many(self, entries, default=None):
+        """T.search_many(entries) -> list with the entry of T equal to each of entries, in the
+        order given, and default in place of the ones T does not have."""
+        return [default if node is None else node.entry for node in self._search_many(entries)]
+
+    def contains_many(self, entries):
+        """T.contains_many(entries) -> list of booleans telling whether each of entries is in T,
+        in the order given. A NumPy array of entries gets a boolean array of its shape back."""
+        found = [node is not None for node in self._search_many(entries)]
+        if _is_ndarray(entries):
+            import numpy as np
+            return np.array(found, dtype=bool).reshape(entries.shape)
+        return found
+
+    def _search_many(self, entries):
+        """Returns the node equal to each of entries, or None, in the order given. The queries
+        are answered in sorted order, by one in-order walk when the batch is dense and by
+        finger search when it is sparse."""
+        if _is_ndarray(entries):
+            entries = entries.ravel().tolist()
+        keys = [self._key_of(entry) for entry in entries]
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+
+        if len(keys) * _DENSE_BATCH_RATIO >= len(self):
+            lower_bounds = _walk_lower_bounds(self.root, (keys[i] for i in order))
+        else:
+            lower_bounds = _finger_lower_bounds(self.root, (keys[i] for i in order))
+
+        nodes = [None] * len(keys)
+        for i, node in zip(order, lower_bounds):
+            if node is not None and not keys[i] < node.key:
+                nodes[i] = node
+        return nodes
 
     def pred(self, entry):
-        return self.root.pred(EMPTY_NODE, entry)
+        return self.root.pred(EMPTY_NODE, self._key_of(entry))
 
     def succ(self, entry):
-        return self.root.succ(EMPTY_NODE, entry)
+        return self.root.succ(EMPTY_NODE, self._key_of(entry))
 
     def traverse(self, order='inorder'):
         """Traverse the tree based on a given strategy.
@@ -259,64 +673,165 @@ class AbstractBinarySearchTree(ABC):
         else:
             return self._inorder(self.root)
 
+    def irange(self, lo=None, hi=None, inclusive=(True, False), reverse=False):
+        """T.irange(lo, hi) -> iterates over the entries between lo and hi in sorted order.
+        lo, hi : the bounds of the range, None leaves that side unbounded.
+        inclusive : pair of booleans telling whether lo and hi belong to the range.
+            The default (True, False) gives the half-open range [lo, hi).
+        reverse : yields the entries from hi down to lo when True.
+        """
+        lo = None if lo is None else self._key_of(lo)
+        hi = None if hi is None else self._key_of(hi)
+        return (node.entry for node in _range_nodes(self.root, lo, hi, inclusive, reverse))
+
     def _inorder(self, root):
         """Performs an in-order traversal. """
-        if root:
-            yield from self._inorder(root.left)
+        stack = []
+
+        while stack or root:
+            while root:
+                stack.append(root)
+                root = root.left
+
+            root = stack.pop()
             yield root.entry
-            yield from self._inorder(root.right)
+            root = root.right
 
     def _preorder(self, root):
         """Performs an pre-order traversal."""
-        if root:
+        stack = [root] if root else []
+
+        while stack:
+            root = stack.pop()
             yield root.entry
-            yield from self._preorder(root.left)
-            yield from self._preorder(root.right)
+
+            if root.right:
+                stack.append(root.right)
+            if root.left:
+                stack.append(root.left)
 
     def _postorder(self, root):
         """Performs an post-order traversal."""
-        if root:
-            yield from self._postorder(root.left)
-            yield from self._postorder(root.right)
-            yield root.entry
+        stack = []
+        last = None
 
-    def _bfs(self):
-        """Performs an Breadth first traversal."""
-        root = self.root
+        while stack or root:
+            while root:
+                stack.append(root)
+                root = root.left
 
-        if root:
-            q = deque()
-            q.append(root)
+            root = stack[-1]
+            if root.right and root.right is not last:
+                root = root.right
+            else:
+                last = stack.pop()
+                yield last.entry
+                root = None
 
-            while q:
-                root = q.popleft()
-                if not root:
-                    continue
+    def _bfs(self):
+        """Performs an Breadth first traversal."""
+        q = deque([self.root] if self.root else [])
 
-                yield root.entry
-                left = root.left
-                right = root.right
+        while q:
+            root = q.popleft()
+            yield root.entry
 
-                q.append(left)
-                q.append(right)
+            if root.left:
+                q.append(root.left)
+            if root.right:
+                q.append(root.right)
 
     def _init_tree(self, args):
         """Initialize the tree according to the arguments passed. """
-        self.root = EMPTY_NODE
+        self.root = self._empty_node
 
-        if args is not None:
-            if isinstance(args, self.__class__):
-                args = args.traverse('bfs')
+        if args is None:
+            return
 
-            try:
-                for entry in args:
-                    self.insert(entry)
-            except (ValueError, TypeError) as e:
-                raise TypeError(f'{self.__class__.__name__} constructor called with '
-                                f'incompatible data type: {e}')
+        if isinstance(args, self.__class__) and args.key is self.key and args._node_class is self._node_class:
+            self.root = _copy_nodes(args.root)
+            return
+
+        try:
+            entries = list(args)
+            keys = entries if self.key is None else [self.key(entry) for entry in entries]
+            unique_sorted = self._unique_sorted(entries, keys)
+
+            if unique_sorted is not None:
+                self.root = self._build_balanced(zip(*unique_sorted), len(unique_sorted[0]))
+            else:
+                for entry, key in zip(entries, keys):
+                    self._insert_key(key, entry)
+        except (ValueError, TypeError) as e:
+            raise TypeError(f'{self.__class__.__name__} constructor called with '
+                            f'incompatible data type: {e}')
+
+    @classmethod
+    def from_sorted(cls, entries, key=None, **options):
+        """T.from_sorted(seq) -> new balanced tree built from seq in O(n).
+        seq must be in ascending order of key, entries with duplicated keys are kept once.
+        Other options are passed on to the constructor."""
+        tree = cls(key=key, **options)
+        entries = list(entries)
+        keys = entries if key is None else [key(entry) for entry in entries]
+        unique_sorted = cls._unique_sorted(entries, keys)
+        if unique_sorted is None:
+            raise ValueError(f'{cls.__name__}.from_sorted expects entries in ascending order.')
+
+        tree.root = tree._build_balanced(zip(*unique_sorted), len(unique_sorted[0]))
+        return tree
+
+    @staticmethod
+    def _unique_sorted(entries, keys):
+        """Returns the entries and their keys without duplicated keys if the keys are in
+        ascending order, else None. keys may be entries itself."""
+        if not entries:
+            return entries, keys
+
+        unique_entries = [entries[0]]
+        unique_keys = unique_entries if keys is entries else [keys[0]]
+        prev = keys[0]
+        for i in range(1, len(keys)):
+            key = keys[i]
+            if prev < key:
+                unique_entries.append(entries[i])
+                if unique_keys is not unique_entries:
+                    unique_keys.append(key)
+                prev = key
+            elif key < prev:
+                return None
+
+        return unique_entries, unique_keys
+
+    def _build_balanced(self, items, count):
+        """Builds a perfectly balanced subtree with the next count (entry, key) pairs of the
+        iterator items. Every node is visited once, so the whole build is O(n)."""
+        node_class, empty = self._node_class, self._empty_node
+
+        def build(count):
+            if not count:
+                return empty
+
+            left_count = count // 2
+            left = build(left_count)
+
+            node = node_class(*next(items))
+            node.left = left
+            node.right = build(count - left_count - 1)
+            node._update_height()
+
+            return node
+
+        return build(count)
+
+    def __repr__(self):
+        """T.__repr__(...) <==> repr(x).
+        Returns representation of the object that can be used to recreate the tree with the same values."""
+        return f'{type(self).__name__}({list(self._bfs())})'
 
     def __str__(self):
-        return f"({str(self.root)})"
+        """T.__str__(...) <==> str(x)."""
+        return repr(self)
 
     @property
     def height(self) -> int:
@@ -324,18 +839,138 @@ class AbstractBinarySearchTree(ABC):
         return self.root.height
 
     def __eq__(self, other) -> bool:
-        """Checks if two trees are equal. """
+        """Checks if two trees are equal, i. e, if they hold equal entries in the same shape."""
         if isinstance(other, self.__class__):
             if self.height == other.height and len(self) == len(other):
-                return self.root == other.root
+                stack = [(self.root, other.root)]
+                while stack:
+                    node, other_node = stack.pop()
+                    if not node or not other_node:
+                        if node or other_node:
+                            return False
+                        continue
+                    if node.entry != other_node.entry:
+                        return False
+                    stack.append((node.right, other_node.right))
+                    stack.append((node.left, other_node.left))
+                return True
         return False
 
-    def __copy__(self):
-        """Returns a shallow copy of the tree."""
-        cls = self.__class__
-        result = cls.__new__(cls)
-        result.__dict__.update(self.__dict__)
-        return result
+    def copy(self):
+        """T.copy() -> a new tree with the same entries and key function. The node structure
+        is copied in O(n), the entries themselves are shared."""
+        return self._from_root(_copy_nodes(self.root))
+
+    __copy__ = copy
+
+    def __deepcopy__(self, memo):
+        """Returns a copy of T holding deep copies of its entries and keys."""
+        tree = self.copy()
+        memo[id(self)] = tree
+        for node in _range_nodes(tree.root, None, None, (True, True), False):
+            entry = deepcopy(node.entry, memo)
+            node.key = entry if node.key is node.entry else deepcopy(node.key, memo)
+            node.entry = entry
+        return tree
+
+    def __reduce__(self):
+        """Pickles T as its entries in order and its shape, from which it is rebuilt node for
+        node in O(n), without recursing through the nodes or inserting a single entry."""
+        return _load_tree, (self.__class__, list(self), self._options(), array('q', self._shape()))
+
+    def save(self, path, keep_shape=True):
+        """T.save(path) -> writes T to the file at path, streaming its entries in order, then
+        its shape when keep_shape, in pickled chunks. Without the shape, load builds a
+        balanced tree from the entries instead of the same one."""
+        with open(path, 'wb') as file:
+            header = (type(self).__name__, self._options(), len(self), keep_shape)
+            pickle.dump(_SAVE_FORMAT + header, file, pickle.HIGHEST_PROTOCOL)
+            _write_chunks(file, iter(self))
+            if keep_shape:
+                _write_chunks(file, self._shape(), 'q')
+
+    @classmethod
+    def load(cls, path):
+        """T.load(path) -> new tree read from a file written by save, built in O(n).
+        The file is unpickled, so only load files from a trusted source."""
+        with open(path, 'rb') as file:
+            options, count, keep_shape = _read_save_header(file, path, cls, _SAVE_FORMAT)
+            entries = _read_chunks(file, [], count)
+            shape = _read_chunks(file, array('q'), count) if keep_shape else None
+
+        return _load_tree(cls, entries, options, shape)
+
+    def _shape(self):
+        """Yields the size of the left subtree of every node, in pre-order, shifted left by
+        _shape_bits bits to carry the extra state _node_bits gives for the node. Together
+        with the entries in order this describes the tree exactly."""
+        bits, node_bits = self._shape_bits, self._node_bits
+        stack = [self.root] if self.root else []
+
+        while stack:
+            node = stack.pop()
+            yield node.left.size << bits | node_bits(node)
+            if node.right:
+                stack.append(node.right)
+            if node.left:
+                stack.append(node.left)
+
+    def _restore(self, entries, shape=None):
+        """Sets the root of T to a tree of entries, which must be in order. The tree is built
+        node for node after shape, as yielded by _shape, or balanced without it. O(n)."""
+        keys = entries if self.key is None else [self.key(entry) for entry in entries]
+        if shape is None:
+            self.root = self._build_balanced(zip(entries, keys), len(entries))
+            return
+
+        bits, restore_node_bits = self._shape_bits, self._restore_node_bits
+        mask = (1 << bits) - 1
+        shape = iter(shape)
+        nodes = []
+        root = self._empty_node
+        stack = [(0, len(entries), None, False)] if entries else []
+
+        while stack:
+            lo, hi, parent, went_right = stack.pop()
+            value = next(shape)
+            index = lo + (value >> bits)
+            node = self._node_class(entries[index], keys[index])
+            if bits:
+                restore_node_bits(node, value & mask)
+            if parent is None:
+                root = node
+            elif went_right:
+                parent.right = node
+            else:
+                parent.left = node
+            nodes.append(node)
+
+            if index + 1 < hi:
+                stack.append((index + 1, hi, node, True))
+            if lo < index:
+                stack.append((lo, index, node, False))
+
+        for node in reversed(nodes):
+            node._update_height()
+        self.root = root
+
+    def _node_bits(self, node):
+        """Returns the _shape_bits bits of state of node, besides its place, that _shape
+        carries. Trees whose nodes have such state override this and _restore_node_bits."""
+        return 0
+
+    def _restore_node_bits(self, node, bits):
+        """Gives node back the state _node_bits returned for it."""
+
+    def _from_root(self, root):
+        """Returns a new tree like T, with the same key function, holding the subtree root."""
+        tree = self.__class__(**self._options())
+        tree.root = root
+        return tree
+
+    def _options(self):
+        """Returns the keyword arguments that make the constructor build a tree like T."""
+        return {'key': self.key}
 
     def max(self):
         """T.max() -> get the maximum entry of T."""
@@ -347,45 +982,315 @@ class AbstractBinarySearchTree(ABC):
 
     def delete(self, entry):
         """T.remove(entry) remove item <entry> from tree."""
-        self.root = self.root.delete(entry)
+        self.root = self.root.delete(self._key_of(entry))
+        self._version += 1
+
+    def insert_many(self, entries):
+        """T.insert_many(entries) -> inserts every entry of entries, those already in T are
+        left as they are. A batch that is large next to T is sorted and merged with the
+        entries of T into a new balanced tree in O(n + m) instead of m separate inserts."""
+        entries = list(entries)
+        if len(entries) * _BULK_REBUILD_RATIO < len(self):
+            for entry in entries:
+                self._insert_key(self._key_of(entry), entry)
+        else:
+            items = self._merged_items(entries)
+            self.root = self._build_balanced(iter(items), len(items))
+        self._version += 1
+
+    def delete_many(self, entries):
+        """T.delete_many(entries) -> removes every entry of entries from T. Raises KeyError,
+        leaving T untouched, if any of them is not in T. A batch that is large next to T is
+        merged with the entries of T into a new balanced tree in O(n + m)."""
+        entries, keys = self._sorted_batch(list(entries))
+        if len(entries) * _BULK_REBUILD_RATIO < len(self):
+            for entry, key in zip(entries, keys):
+                node = _lower_bound(self.root, key)
+                if node is None or key < node.key:
+                    raise KeyError(f'Entry {entry} not found.')
+            for key in keys:
+                self.root = self.root.delete(key)
+        else:
+            items = self._remaining_items(entries, keys)
+            self.root = self._build_balanced(iter(items), len(items))
+        self._version += 1
+
+    def _merged_items(self, entries):
+        """Returns the (entry, key) pairs of T merged with those of entries in key order.
+        Entries whose key is already in T are left out."""
+        entries, keys = self._sorted_batch(entries)
+        items = []
+        i, count = 0, len(keys)
+        for node in _range_nodes(self.root, None, None, (True, True), False):
+            while i < count and keys[i] < node.key:
+                items.append((entries[i], keys[i]))
+                i += 1
+            if i < count and not node.key < keys[i]:
+                i += 1
+            items.append((node.entry, node.key))
+        items.extend(zip(entries[i:], keys[i:]))
+        return items
+
+    def _remaining_items(self, entries, keys):
+        """Returns the (entry, key) pairs of T in key order without the sorted keys, raises
+        KeyError if any of them is not in T."""
+        items = []
+        i, count = 0, len(keys)
+        for node in _range_nodes(self.root, None, None, (True, True), False):
+            if i < count and keys[i] < node.key:
+                break
+            if i < count and not node.key < keys[i]:
+                i += 1
+            else:
+                items.append((node.entry, node.key))
+        if i < count:
+            raise KeyError(f'Entry {entries[i]} not found.')
+        return items
+
+    def _sorted_batch(self, entries):
+        """Returns the entries sorted by key, without duplicated keys, and their keys.
+        Of the entries sharing a key the first one given is kept."""
+        if self.key is None:
+            entries = sorted(entries)
+            return self._unique_sorted(entries, entries)
+
+        keys = [self.key(entry) for entry in entries]
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        return self._unique_sorted([entries[i] for i in order], [keys[i] for i in order])
 
     def clear(self):
         """T.clear() -> Removes all entries of T leaving it empty."""
         self.root = self.root.clear()
+        self._version += 1
+
+    def find_cursor(self, entry):
+        """T.find_cursor(entry) -> a TreeCursor positioned on entry.
+        The cursor is not valid if entry is not in T."""
+        key = self._key_of(entry)
+        path = self._lower_bound_path(key)
+        if path and key < path[-1].key:
+            path = []
+        return TreeCursor(self, path)
+
+    def lower_bound_cursor(self, entry):
+        """T.lower_bound_cursor(entry) -> a TreeCursor positioned on the smallest entry of T
+        that is not smaller than entry. The cursor is not valid if there is none."""
+        return TreeCursor(self, self._lower_bound_path(self._key_of(entry)))
+
+    def _lower_bound_path(self, key):
+        """Returns the nodes from the root down to the node with the smallest key that is not
+        smaller than key, or an empty list if there is no such node."""
+        path = []
+        length = 0
+        root = self.root
+
+        while root:
+            path.append(root)
+            if root.key < key:
+                root = root.right
+            else:
+                length = len(path)
+                root = root.left
+
+        del path[length:]
+        return path
 
     def search(self, entry):
         """Returns k if T has a entry k, else raise KeyError"""
-        return self.root.search(entry).entry
+        return self._search(entry).entry
+
+    def floor(self, entry, default=None):
+        """T.floor(entry) -> the largest entry of T that is not greater than entry,
+        or default if there is none. entry does not need to be in the tree."""
+        key = self._key_of(entry)
+        floor = None
+        root = self.root
+
+        while root:
+            if key < root.key:
+                root = root.left
+            else:
+                floor = root
+                root = root.right
+
+        return default if floor is None else floor.entry
+
+    def ceiling(self, entry, default=None):
+        """T.ceiling(entry) -> the smallest entry of T that is not smaller than entry,
+        or default if there is none. entry does not need to be in the tree."""
+        ceiling = _lower_bound(self.root, self._key_of(entry))
+        return default if ceiling is None else ceiling.entry
+
+    def lower(self, entry, default=None):
+        """T.lower(entry) -> the largest entry of T strictly smaller than entry,
+        or default if there is none. entry does not need to be in the tree."""
+        key = self._key_of(entry)
+        lower = None
+        root = self.root
+
+        while root:
+            if root.key < key:
+                lower = root
+                root = root.right
+            else:
+                root = root.left
+
+        return default if lower is None else lower.entry
+
+    def higher(self, entry, default=None):
+        """T.higher(entry) -> the smallest entry of T strictly greater than entry,
+        or default if there is none. entry does not need to be in the tree."""
+        key = self._key_of(entry)
+        higher = None
+        root = self.root
+
+        while root:
+            if key < root.key:
+                higher = root
+                root = root.left
+            else:
+                root = root.right
+
+        return default if higher is None else higher.entry
+
+    def rank(self, entry):
+        """T.rank(entry) -> number of entries of T strictly smaller than entry.
+        The entry does not need to be in the tree."""
+        key = self._key_of(entry)
+        rank = 0
+        root = self.root
+
+        while root:
+            if root.key < key:
+                rank += root.left.size + 1
+                root = root.right
+            else:
+                root = root.left
+
+        return rank
+
+    def select(self, index):
+        """T.select(k) -> the k-th smallest entry of T, counting from zero.
+        Raises IndexError if k is out of range."""
+        if not 0 <= index < self.root.size:
+            raise IndexError(f'Index {index} out of range.')
+
+        root = self.root
+        while True:
+            left_size = root.left.size
+            if index < left_size:
+                root = root.left
+            elif index > left_size:
+                index -= left_size + 1
+                root = root.right
+            else:
+                return root.entry
+
+    def quantile(self, q):
+        """T.quantile(q) -> the smallest entry of T that at least a fraction q of the entries
+        of T are not greater than, for 0 <= q <= 1. T.quantile(0.5) is the lower median."""
+        if not 0 <= q <= 1:
+            raise ValueError(f'Quantile {q} is not between 0 and 1.')
+        return self.select(max(math.ceil(q * len(self)) - 1, 0))
+
+    def __getitem__(self, index):
+        """T[k] -> the k-th smallest entry of T. Negative indexes count from the end.
+        T[i:j:k] -> a generator over the entries in the given positions."""
+        if isinstance(index, slice):
+            return self._slice(*index.indices(len(self)))
+
+        try:
+            index = operator.index(index)
+        except TypeError:
+            raise TypeError(f'{self.__class__.__name__} indices must be integers or slices, '
+                            f'not {type(index).__name__}') from None
+        if index < 0:
+            index += len(self)
+        return self.select(index)
+
+    def _slice(self, start, stop, step):
+        """Lazily yields the entries in positions range(start, stop, step)."""
+        count = len(range(start, stop, step))
+        if not count:
+            return
+
+        entries = self._iter_from(start, reverse=step < 0)
+        skip = abs(step) - 1
+
+        for entry in entries:
+            yield entry
+            count -= 1
+            if not count:
+                return
+            for _ in range(skip):
+                next(entries)
+
+    def _iter_from(self, index, reverse=False):
+        """Yields the entries in order, or in reverse order, starting from position index."""
+        stack = []
+        root = self.root
+
+        while root:
+            left_size = root.left.size
+            if index < left_size:
+                if not reverse:
+                    stack.append(root)
+                root = root.left
+            elif index > left_size:
+                if reverse:
+                    stack.append(root)
+                index -= left_size + 1
+                root = root.right
+            else:
+                stack.append(root)
+                break
+
+        while stack:
+            root = stack.pop()
+            yield root.entry
+
+            root = root.left if reverse else root.right
+            while root:
+                stack.append(root)
+                root = root.right if reverse else root.left
 
 
 class BinarySearchTree(AbstractBinarySearchTree):
-    pass
+    def __str__(self):
+        return f"({str(self.root)})"
 
 
 class _EmptyAVLNode:
     """Internal object, represents an empty tree node using Null Object Pattern."""
 
+    __slots__ = ('height', 'size')
+
     def __init__(self):
         self.height = 0
+        self.size = 0
 
-    def insert(self, entry):
+    def insert(self, key, entry):
         """Inserting a entry in a EmptyNode means returning a concrete node back."""
-        return _AVLNode(entry)
+        return _AVLNode(entry, key)
 
-    def delete(self, entry):
+    def delete(self, key):
         """Cannot delete a entry from a EmptyNode"""
-        raise KeyError(entry)
+        raise KeyError(key)
+
+    def clear(self):
+        """Clears the whole subtree"""
+        return EMPTY_AVL_NODE
 
     @property
     def balance_factor(self):
         """The balance factor of a empty node is always 0."""
         return 0
 
-    def pred(self, pred, entry):
-        raise KeyError(f'Predecessor of {entry} not found.')
+    def pred(self, pred, key):
+        raise KeyError(f'Predecessor of {key} not found.')
 
-    def succ(self, pred, entry):
-        raise KeyError(f'Successor of {entry} not found.')
+    def succ(self, pred, key):
+        raise KeyError(f'Successor of {key} not found.')
 
     def __bool__(self):
         """Empty node is always Falsy. """
@@ -406,51 +1311,97 @@ EMPTY_AVL_NODE = _EmptyAVLNode()
 class _AVLNode:
     """Internal object, represents a tree node."""
 
-    def __init__(self, entry):
+    __slots__ = ('entry', 'key', 'left', 'right', 'height', 'size')
+    _empty = EMPTY_AVL_NODE
+
+    def __init__(self, entry, key):
         """Creates a new node."""
         self.entry = entry
-        self.left: '_AVLNode' = EMPTY_AVL_NODE
-        self.right: '_AVLNode' = EMPTY_AVL_NODE
+        self.key = key
+        self.left: '_AVLNode' = self._empty
+        self.right: '_AVLNode' = self._empty
         self.height: int = 1
+        self.size: int = 1
 
-    def insert(self, entry):
-        """Inserts a entry to the subtree."""
-        if entry > self.entry:
-            self.right = self.right.insert(entry)
-        elif entry < self.entry:
-            self.left = self.left.insert(entry)
+    def insert(self, key, entry):
+        """Inserts a entry with the given key to the subtree and returns it balanced."""
+        path = []
+        candidate = None
+        root = self
+
+        while root:
+            if key < root.key:
+                path.append((root, False))
+                root = root.left
+            else:
+                candidate = root
+                path.append((root, True))
+                root = root.right
+
+        if candidate is not None and not candidate.key < key:
+            return self
 
-        return self._balanced_tree()
+        return self._rebalance_path(path, root.insert(key, entry))
 
-    def delete(self, entry):
-        """Deletes a entry from subtree and return it balanced."""
-        if entry > self.entry:
-            self.right = self.right.delete(entry)
-        elif entry < self.entry:
-            self.left = self.left.delete(entry)
-        else:
-            if self.is_leaf():
-                return EMPTY_NODE
+    def delete(self, key):
+        """Deletes the entry with the given key from subtree and return it balanced.
+        The entry of a node with a left subtree is replaced by its predecessor's, whose node
+        is removed instead."""
+        path = []
+        target = None
+        root = self
 
-            if self.left:
-                new_entry = self.left.max()
-                self.entry = new_entry
-                self.left = self.left.delete(new_entry)
+        while root:
+            if root.key < key:
+                path.append((root, True))
+                root = root.right
+            else:
+                target = root
+                path.append((root, False))
+                root = root.left
+
+        if target is None or key < target.key:
+            raise KeyError(key)
+
+        removed, _ = path.pop()
+        if removed is not target:
+            target._assign(removed)
+
+        return self._rebalance_path(path, removed.left if removed.left else removed.right)
+
+    @staticmethod
+    def _rebalance_path(path, child):
+        """Links child under the last node of path and rebalances every node of path,
+        bottom up. path holds (node, went_right) pairs from the subtree root down.
+        Returns the new root of the subtree."""
+        for node, went_right in reversed(path):
+            if went_right:
+                node.right = child
             else:
-                new_entry = self.right.entry
-                self.entry = new_entry
-                self.right = self.right.delete(new_entry)
+                node.left = child
+            child = node._balanced_tree()
 
-        return self._balanced_tree()
+        return child
 
     def clear(self):
         """Clears the whole subtree"""
         if self.is_leaf():
-            return EMPTY_AVL_NODE
+            return self._empty
         self.left = self.left.clear()
         self.right = self.right.clear()
 
-        return EMPTY_AVL_NODE
+        return self._empty
+
+    def _copy(self):
+        """Returns a copy of this node alone, with empty children."""
+        node = self.__class__(self.entry, self.key)
+        node.height = self.height
+        node.size = self.size
+        return node
+
+    def _assign(self, other):
+        """Takes over the entry of other, when other is about to be removed in its place."""
+        self.entry, self.key = other.entry, other.key
 
     def is_leaf(self):
         """Checks if the node is a leaf node, i. e, if its siblings are empty."""
@@ -481,14 +1432,6 @@ class _AVLNode:
         """Returns the balance factor of the node."""
         return self.left.height - self.right.height
 
-    def __bool__(self):
-        """Returns True if the node is not None"""
-        return self.entry is not None
-
-    def __len__(self):
-        """Return the number of elements in this subtree."""
-        return 1 + len(self.left) + len(self.right)
-
     def __eq__(self, other):
         """Checks if two nodes are equal."""
         return self.entry == other.entry and self.left == other.left and self.right == other.right
@@ -499,8 +1442,9 @@ class _AVLNode:
         return self._balance_tree_if_unbalanced()
 
     def _update_height(self):
-        """Updated the height if tree has been rebalanced."""
+        """Updated the height and the size if tree has been rebalanced."""
         self.height = 1 + max(self.left.height, self.right.height)
+        self.size = 1 + self.left.size + self.right.size
 
     def _balance_tree_if_unbalanced(self):
         """Performs the appropriate rotation if the the subtree is unbalanced."""
@@ -547,65 +1491,1993 @@ class _AVLNode:
         self.right = self.right._rotate_right()
         return self._rotate_left()
 
-    def pred(self, pred, entry):
-        if entry > self.entry:
-            return self.right.pred(self, entry)
-        elif entry < self.entry:
-            return self.left.pred(pred, entry)
-        else:
-            if self.left:
-                return self.left.max()
-            if pred:
-                return pred.entry
+    def pred(self, pred, key):
+        """Returns the entry that precedes the one with the given key in the subtree, pred
+        being the closest smaller ancestor known so far. Raises KeyError if there is none."""
+        candidate = None
+        root = self
+
+        while root:
+            if root.key < key:
+                pred = root
+                root = root.right
+            else:
+                candidate = root
+                root = root.left
+
+        if candidate is None or key < candidate.key or not pred:
+            raise KeyError(f'Predecessor of {key} not found.')
+        return pred.entry
+
+    def succ(self, succ, key):
+        """Returns the entry that succeeds the one with the given key in the subtree, succ
+        being the closest greater ancestor known so far. Raises KeyError if there is none."""
+        candidate = None
+        root = self
+
+        while root:
+            if key < root.key:
+                succ = root
+                root = root.left
+            else:
+                candidate = root
+                root = root.right
+
+        if candidate is None or candidate.key < key or not succ:
+            raise KeyError(f'Successor of {key} not found.')
+        return succ.entry
+
+
+class _EmptyAVLMapNode(_EmptyAVLNode):
+    """Internal object, represents an empty AVLTreeMap node using Null Object Pattern."""
+
+    __slots__ = ()
+
+    def insert(self, key, value):
+        """Inserting a key in a EmptyNode means returning a concrete node back."""
+        return _AVLMapNode(key, value)
+
+    def clear(self):
+        """Clears the whole subtree"""
+        return EMPTY_AVL_MAP_NODE
+
+
+EMPTY_AVL_MAP_NODE = _EmptyAVLMapNode()
+
+
+class _AVLMapNode(_AVLNode):
+    """Internal object, represents an AVLTreeMap node.
+    The key of the map is both the entry and the key of the node, so the balancing logic
+    of _AVLNode applies unchanged, and the value has a slot of its own."""
+
+    __slots__ = ('value',)
+    _empty = EMPTY_AVL_MAP_NODE
+
+    def __init__(self, key, value):
+        """Creates a new node."""
+        super().__init__(key, key)
+        self.value = value
+
+    def insert(self, key, value):
+        """Inserts a key to the subtree, replacing the value if the key is already there."""
+        path = []
+        candidate = None
+        root = self
+
+        while root:
+            if key < root.key:
+                path.append((root, False))
+                root = root.left
+            else:
+                candidate = root
+                path.append((root, True))
+                root = root.right
+
+        if candidate is not None and not candidate.key < key:
+            candidate.value = value
+            return self
+
+        return self._rebalance_path(path, root.insert(key, value))
+
+    def _copy(self):
+        """Returns a copy of this node alone, with empty children."""
+        node = super()._copy()
+        node.value = self.value
+        return node
+
+    def _assign(self, other):
+        """Takes over the key and the value of other, when other is about to be removed in its place."""
+        super()._assign(other)
+        self.value = other.value
+
+
+class _EmptyBSTMultisetNode(EmptyBSTNode):
+    """Internal object, represents an empty BinarySearchTreeMultiset node."""
+
+    __slots__ = ()
+    total = 0
+
+    def insert(self, key, entry):
+        return _BSTMultisetNode(entry, key)
+
+    def clear(self):
+        """Clears the whole subtree"""
+        return EMPTY_BST_MULTISET_NODE
+
+
+EMPTY_BST_MULTISET_NODE = _EmptyBSTMultisetNode()
+
+
+class _EmptyAVLMultisetNode(_EmptyAVLNode):
+    """Internal object, represents an empty AVLTreeMultiset node."""
+
+    __slots__ = ()
+    total = 0
+
+    def insert(self, key, entry):
+        """Inserting a entry in a EmptyNode means returning a concrete node back."""
+        return _AVLMultisetNode(entry, key)
+
+    def clear(self):
+        """Clears the whole subtree"""
+        return EMPTY_AVL_MULTISET_NODE
+
+
+EMPTY_AVL_MULTISET_NODE = _EmptyAVLMultisetNode()
+
+
+class _MultisetNode:
+    """Internal mixin for the nodes of multisets. count is the number of occurrences of the
+    entry and total the sum of the counts in the subtree, kept up to date next to size."""
+
+    __slots__ = ()
+
+    def __init__(self, entry, key, count=1):
+        super().__init__(entry, key)
+        self.count = count
+        self.total = count
+
+    def _update_height(self):
+        """Updated the height, the size and the total of the subtree."""
+        super()._update_height()
+        self.total = self.count + self.left.total + self.right.total
+
+    def _copy(self):
+        """Returns a copy of this node alone, with empty children."""
+        node = super()._copy()
+        node.count = self.count
+        node.total = self.total
+        return node
+
+    def _assign(self, other):
+        """Takes over the entry and the count of other, when other is about to be removed in its place."""
+        super()._assign(other)
+        self.count = other.count
+
+
+class _BSTMultisetNode(_MultisetNode, AbstractBSTreeNode):
+    """Internal object, represents a BinarySearchTreeMultiset node."""
+
+    __slots__ = ('count', 'total')
+    _empty = EMPTY_BST_MULTISET_NODE
+
+
+class _AVLMultisetNode(_MultisetNode, _AVLNode):
+    """Internal object, represents an AVLTreeMultiset node."""
+
+    __slots__ = ('count', 'total')
+    _empty = EMPTY_AVL_MULTISET_NODE
+
+
+class _EmptyAugmentedAVLNode(_EmptyAVLNode):
+    """Internal object, base of the empty nodes of AugmentedAVLTree. Every monoid derives its
+    own subclass, whose aggregate is the identity of the monoid."""
+
+    __slots__ = ()
+
+    def insert(self, key, entry):
+        """Inserting a entry in a EmptyNode means returning a concrete node back."""
+        return self._node_class(entry, key)
+
+    def clear(self):
+        """Clears the whole subtree"""
+        return self
+
+
+class _AugmentedAVLNode(_AVLNode):
+    """Internal object, base of the nodes of AugmentedAVLTree. Every monoid derives its own
+    subclass, and aggregate combines the measures of the entries in the subtree in order,
+    kept up to date next to size."""
+
+    __slots__ = ('aggregate',)
+
+    def __init__(self, entry, key):
+        super().__init__(entry, key)
+        self.aggregate = self._monoid.measure_of(entry)
+
+    def _update_height(self):
+        """Updated the height, the size and the aggregate of the subtree."""
+        left, right = self.left, self.right
+        self.height = 1 + max(left.height, right.height)
+        self.size = 1 + left.size + right.size
+        monoid = self._monoid
+        combine = monoid.combine
+        self.aggregate = combine(combine(left.aggregate, monoid.measure_of(self.entry)), right.aggregate)
+
+    def _copy(self):
+        """Returns a copy of this node alone, with empty children."""
+        node = super()._copy()
+        node.aggregate = self.aggregate
+        return node
+
+
+class _EmptyRBNode(_EmptyAVLNode):
+    """Internal object, represents an empty RBTree node, black like every leaf."""
+
+    __slots__ = ()
+    red = False
+
+    def insert(self, key, entry):
+        """Inserting a entry in a EmptyNode means returning a concrete node back.
+        The node is the root of its tree, so it is black."""
+        node = _RBNode(entry, key)
+        node.red = False
+        return node
+
+    def clear(self):
+        """Clears the whole subtree"""
+        return EMPTY_RB_NODE
+
+
+EMPTY_RB_NODE = _EmptyRBNode()
+
+
+class _RBNode(_AVLNode):
+    """Internal object, represents an RBTree node. The rotations and the height and size
+    bookkeeping are those of _AVLNode, only the balancing rules differ: no red node has a
+    red child and every path down to a leaf passes the same number of black nodes."""
+
+    __slots__ = ('red',)
+    _empty = EMPTY_RB_NODE
+
+    def __init__(self, entry, key):
+        super().__init__(entry, key)
+        self.red = True
+
+    def insert(self, key, entry):
+        """Inserts a entry with the given key to the subtree and returns it balanced.
+        Recolors up the path and rotates at most twice."""
+        path = []
+        candidate = None
+        root = self
+
+        while root:
+            if key < root.key:
+                path.append((root, False))
+                root = root.left
+            else:
+                candidate = root
+                path.append((root, True))
+                root = root.right
+
+        if candidate is not None and not candidate.key < key:
+            return self
+
+        node = _RBNode(entry, key)
+        self._relink(path, len(path), node)
+        for ancestor, _ in reversed(path):
+            ancestor._update_height()
+
+        root = self
+        depth = len(path)
+        while depth > 1:
+            parent, node_went_right = path[depth - 1]
+            if not parent.red:
+                break
+            grandparent, went_right = path[depth - 2]
+            uncle = grandparent.left if went_right else grandparent.right
+            if uncle.red:
+                parent.red = uncle.red = False
+                grandparent.red = True
+                depth -= 2
+                continue
+
+            if node_went_right != went_right:
+                parent = parent._rotate_left() if node_went_right else parent._rotate_right()
+                self._relink(path, depth - 1, parent)
+            parent.red = False
+            grandparent.red = True
+            top = grandparent._rotate_left() if went_right else grandparent._rotate_right()
+            if self._relink(path, depth - 2, top):
+                root = top
+            for ancestor, _ in reversed(path[:depth - 2]):
+                ancestor._update_height()
+            break
+
+        root.red = False
+        return root
+
+    def delete(self, key):
+        """Deletes the entry with the given key from subtree and return it balanced.
+        The entry of a node with a left subtree is replaced by its predecessor's, whose node
+        is removed instead. Recolors up the path and rotates at most three times."""
+        path = []
+        target = None
+        root = self
+
+        while root:
+            if root.key < key:
+                path.append((root, True))
+                root = root.right
+            else:
+                target = root
+                path.append((root, False))
+                root = root.left
+
+        if target is None or key < target.key:
+            raise KeyError(key)
+
+        removed, _ = path.pop()
+        if removed is not target:
+            target._assign(removed)
+
+        child = removed.left if removed.left else removed.right
+        root = child if self._relink(path, len(path), child) else self
+        for ancestor, _ in reversed(path):
+            ancestor._update_height()
+
+        if child.red:
+            child.red = False
+            return root
+        if removed.red:
+            return root
+
+        # child takes the place of a black node, so its paths miss a black node to be fixed.
+        depth = len(path)
+        while depth:
+            parent, went_right = path[depth - 1]
+            sibling = parent.left if went_right else parent.right
+            if sibling.red:
+                sibling.red = False
+                parent.red = True
+                top = parent._rotate_right() if went_right else parent._rotate_left()
+                if self._relink(path, depth - 1, top):
+                    root = top
+                path.insert(depth - 1, (top, went_right))
+                depth += 1
+                sibling = parent.left if went_right else parent.right
+
+            near, far = (sibling.right, sibling.left) if went_right else (sibling.left, sibling.right)
+            if not (near.red or far.red):
+                sibling.red = True
+                if parent.red:
+                    parent.red = False
+                    break
+                depth -= 1
+                continue
+
+            if not far.red:
+                near.red = False
+                sibling.red = True
+                sibling = sibling._rotate_left() if went_right else sibling._rotate_right()
+                if went_right:
+                    parent.left = sibling
+                else:
+                    parent.right = sibling
+                far = sibling.left if went_right else sibling.right
+
+            sibling.red = parent.red
+            parent.red = far.red = False
+            top = parent._rotate_right() if went_right else parent._rotate_left()
+            if self._relink(path, depth - 1, top):
+                root = top
+            break
+
+        for ancestor, _ in reversed(path[:max(depth - 1, 0)]):
+            ancestor._update_height()
+        return root
+
+    @staticmethod
+    def _relink(path, depth, node):
+        """Puts node in place of the node at depth along path, under the node before it.
+        Returns True when node takes the place of the subtree root instead."""
+        if not depth:
+            return True
+        parent, went_right = path[depth - 1]
+        if went_right:
+            parent.right = node
+        else:
+            parent.left = node
+        return False
+
+    def _copy(self):
+        """Returns a copy of this node alone, with empty children."""
+        node = super()._copy()
+        node.red = self.red
+        return node
+
+
+class _EmptyTreapNode(_EmptyAVLNode):
+    """Internal object, represents an empty Treap node using Null Object Pattern."""
+
+    __slots__ = ()
+
+    def insert(self, key, entry, priority):
+        """Inserting a entry in a EmptyNode means returning a concrete node back."""
+        return _TreapNode(entry, key, priority)
+
+    def clear(self):
+        """Clears the whole subtree"""
+        return EMPTY_TREAP_NODE
+
+
+EMPTY_TREAP_NODE = _EmptyTreapNode()
+
+
+class _TreapNode(_AVLNode):
+    """Internal object, represents a Treap node. The rotations and the height and size
+    bookkeeping are those of _AVLNode; the keys are ordered as in any binary search tree
+    and no node has a higher priority than its parent."""
+
+    __slots__ = ('priority',)
+    _empty = EMPTY_TREAP_NODE
+
+    def __init__(self, entry, key, priority=0):
+        super().__init__(entry, key)
+        self.priority = priority
+
+    def insert(self, key, entry, priority):
+        """Inserts a entry with the given key and priority to the subtree and returns it.
+        The new leaf is rotated up as long as its priority is higher than its parent's."""
+        path = []
+        candidate = None
+        root = self
+
+        while root:
+            if key < root.key:
+                path.append((root, False))
+                root = root.left
+            else:
+                candidate = root
+                path.append((root, True))
+                root = root.right
+
+        if candidate is not None and not candidate.key < key:
+            return self
+
+        node = root.insert(key, entry, priority)
+        depth = len(path)
+        while depth and path[depth - 1][0].priority < priority:
+            parent, went_right = path[depth - 1]
+            if went_right:
+                parent.right = node
+                node = parent._rotate_left()
+            else:
+                parent.left = node
+                node = parent._rotate_right()
+            depth -= 1
+
+        root = self._link(path, depth, node)
+        for ancestor, _ in reversed(path[:depth]):
+            ancestor._update_height()
+        return root
+
+    def delete(self, key):
+        """Deletes the entry with the given key from subtree and return it. The node is
+        rotated down below its child of higher priority until it has a single child."""
+        path = []
+        root = self
+
+        while root:
+            if key < root.key:
+                path.append((root, False))
+                root = root.left
+            elif root.key < key:
+                path.append((root, True))
+                root = root.right
+            else:
+                break
+        else:
+            raise KeyError(key)
+
+        while root.left and root.right:
+            if root.left.priority < root.right.priority:
+                top = root._rotate_left()
+                went_right = False
+            else:
+                top = root._rotate_right()
+                went_right = True
+            self._link(path, len(path), top)
+            path.append((top, went_right))
+
+        subtree = self._link(path, len(path), root.left if root.left else root.right)
+        for ancestor, _ in reversed(path):
+            ancestor._update_height()
+        return subtree
+
+    @staticmethod
+    def _link(path, depth, node):
+        """Puts node in place of the node at depth along path, under the node before it,
+        and returns the root of the subtree."""
+        if not depth:
+            return node
+
+        parent, went_right = path[depth - 1]
+        if went_right:
+            parent.right = node
+        else:
+            parent.left = node
+        return path[0][0]
+
+    def _copy(self):
+        """Returns a copy of this node alone, with empty children."""
+        node = super()._copy()
+        node.priority = self.priority
+        return node
+
+
+def _treap_split(root, key):
+    """Splits the treap into the treaps with the keys smaller and greater than key and returns
+    them with the node holding key, or None, in between. The nodes on the search path are
+    dealt to either side, so the split is O(log n) expected. The nodes of root are reused,
+    root must not be used afterwards."""
+    empty = root._empty
+    left = right = empty
+    left_tail = right_tail = None
+    path = []
+    found = None
+
+    while root:
+        if root.key < key:
+            if left_tail is None:
+                left = root
+            else:
+                left_tail.right = root
+            left_tail = root
+            path.append(root)
+            root = root.right
+        elif key < root.key:
+            if right_tail is None:
+                right = root
+            else:
+                right_tail.left = root
+            right_tail = root
+            path.append(root)
+            root = root.left
+        else:
+            found = root
+            break
+
+    rest_left, rest_right = (found.left, found.right) if found is not None else (empty, empty)
+    if left_tail is None:
+        left = rest_left
+    else:
+        left_tail.right = rest_left
+    if right_tail is None:
+        right = rest_right
+    else:
+        right_tail.left = rest_right
+    for node in reversed(path):
+        node._update_height()
+
+    if found is not None:
+        found.left = found.right = empty
+        found._update_height()
+    return left, found, right
+
+
+def _treap_merge(left, right):
+    """Merges the treaps left and right, every key of left being smaller than the keys of
+    right, along the right spine of left and the left spine of right, so in O(log n)
+    expected. Both treaps are consumed."""
+    path = []
+
+    while left and right:
+        if right.priority < left.priority:
+            path.append((left, True))
+            left = left.right
+        else:
+            path.append((right, False))
+            right = right.left
+
+    root = left if left else right
+    for node, went_right in reversed(path):
+        if went_right:
+            node.right = root
+        else:
+            node.left = root
+        node._update_height()
+        root = node
+
+    return root
+
+
+def _avl_join(left, node, right):
+    """Joins the AVL subtrees left and right with the detached node in between, every key of
+    left being smaller than node.key and every key of right greater, and returns the new
+    root. Only the spine of the taller subtree is walked, so this is O(|hl - hr|)."""
+    path = []
+    while left.height > right.height + 1:
+        path.append((left, True))
+        left = left.right
+    while right.height > left.height + 1:
+        path.append((right, False))
+        right = right.left
+
+    node.left, node.right = left, right
+    node._update_height()
+    return node._rebalance_path(path, node)
+
+
+def _avl_join2(left, right):
+    """Joins the AVL subtrees left and right, every key of left being smaller than every
+    key of right, using the maximum of left as the node in between."""
+    if not left:
+        return right
+    if not right:
+        return left
+
+    path = []
+    node = left
+    while node.right:
+        path.append((node, True))
+        node = node.right
+
+    return _avl_join(node._rebalance_path(path, node.left), node, right)
+
+
+def _avl_split(root, key):
+    """Splits the AVL subtree into the subtrees with the keys smaller and greater than key
+    and returns them with the node holding key, or None, in between. Each join costs the
+    height difference of its subtrees, so the whole split is O(log n). The nodes of root
+    are reused, root must not be used afterwards."""
+    path = []
+    found = None
+
+    while root:
+        if key < root.key:
+            path.append((root, False))
+            root = root.left
+        elif root.key < key:
+            path.append((root, True))
+            root = root.right
+        else:
+            found = root
+            break
+
+    left, right = (found.left, found.right) if found is not None else (root, root)
+    for node, went_right in reversed(path):
+        if went_right:
+            left = _avl_join(node.left, node, left)
+        else:
+            right = _avl_join(right, node, node.right)
+
+    return left, found, right
+
+
+def _avl_union(a, b):
+    """Returns the union of the AVL subtrees a and b, the nodes of a win on equal keys.
+    Both subtrees are consumed. O(m log(n/m + 1)) for sizes m <= n."""
+    if not a:
+        return b
+    if not b:
+        return a
+
+    left, _, right = _avl_split(b, a.key)
+    return _avl_join(_avl_union(a.left, left), a, _avl_union(a.right, right))
+
+
+def _avl_difference(a, b):
+    """Returns the AVL subtree a without the keys of b. Both subtrees are consumed.
+    O(m log(n/m + 1)) for sizes m <= n."""
+    if not a or not b:
+        return a
+
+    left, _, right = _avl_split(a, b.key)
+    return _avl_join2(_avl_difference(left, b.left), _avl_difference(right, b.right))
+
+
+def _avl_symmetric_difference(a, b):
+    """Returns the AVL subtree with the keys that are either in a or in b but not in both.
+    Both subtrees are consumed. O(m log(n/m + 1)) for sizes m <= n."""
+    if not a:
+        return b
+    if not b:
+        return a
+
+    left, found, right = _avl_split(b, a.key)
+    left, right = _avl_symmetric_difference(a.left, left), _avl_symmetric_difference(a.right, right)
+    return _avl_join(left, a, right) if found is None else _avl_join2(left, right)
+
+
+def _clone(node):
+    """Returns a copy of node that shares its children."""
+    clone = node._copy()
+    clone.left, clone.right = node.left, node.right
+    return clone
+
+
+def _rebalance_clone(node):
+    """Balances node, a fresh clone whose children have been set, and returns the new root.
+    The children a rotation is going to relink are cloned first, so no shared node changes."""
+    node._update_height()
+    balance = node.balance_factor
+    if balance == 2:
+        node.left = _clone(node.left)
+        if node.left.balance_factor == -1:
+            node.left.right = _clone(node.left.right)
+    elif balance == -2:
+        node.right = _clone(node.right)
+        if node.right.balance_factor == 1:
+            node.right.left = _clone(node.right.left)
+
+    return node._balance_tree_if_unbalanced()
+
+
+def _persistent_insert(root, key, entry):
+    """Returns the root of a new AVL subtree with entry added under key, or root itself if
+    key is already there. Only the nodes on the path to the new leaf are copied, root and
+    everything below it is left as it is."""
+    path = []
+    candidate = None
+    node = root
+
+    while node:
+        if key < node.key:
+            path.append((node, False))
+            node = node.left
+        else:
+            candidate = node
+            path.append((node, True))
+            node = node.right
+
+    if candidate is not None and not candidate.key < key:
+        return root
+
+    child = node.insert(key, entry)
+    for node, went_right in reversed(path):
+        node = _clone(node)
+        if went_right:
+            node.right = child
+        else:
+            node.left = child
+        child = _rebalance_clone(node)
+
+    return child
+
+
+def _persistent_delete(root, key):
+    """Returns the root of a new AVL subtree without key, copying only the nodes on the path
+    to the removed node. Raises KeyError if key is not in the subtree."""
+    path = []
+    target = None
+    node = root
+
+    while node:
+        if node.key < key:
+            path.append((node, True))
+            node = node.right
+        else:
+            target = node
+            path.append((node, False))
+            node = node.left
+
+    if target is None or key < target.key:
+        raise KeyError(key)
+
+    removed, _ = path.pop()
+    child = removed.left if removed.left else removed.right
+    for node, went_right in reversed(path):
+        clone = _clone(node)
+        if node is target:
+            clone._assign(removed)
+        if went_right:
+            clone.right = child
+        else:
+            clone.left = child
+        child = _rebalance_clone(clone)
+
+    return child
+
+
+class AVLTree(AbstractBinarySearchTree):
+    """
+    AVLTree implements a balanced binary tree.
+    Reference: http://en.wikipedia.org/wiki/AVL_tree
+    In computer science, an AVL tree is a self-balancing binary search tree, and
+    it is the first such data structure to be invented. In an AVL tree, the
+    heights of the two child subtrees of any node differ by at most one;
+    therefore, it is also said to be height-balanced. Lookup, insertion, and
+    deletion all take O(log n) time in both the average and worst cases, where n
+    is the number of nodes in the tree prior to the operation. Insertions and
+    deletions may require the tree to be rebalanced by one or more tree rotations.
+    The AVL tree is named after its two inventors, G.M. Adelson-Velskii and E.M.
+    Landis, who published it in their 1962 paper "An algorithm for the
+    organization of information."
+    AVLTree expected comparable objects as entries.
+    AVLTree() -> new empty tree.
+    AVLTree(tree) -> new tree initialized from a tree
+    AVLTree(seq) -> new tree initialized from seq [(entry1), (entry2), ... (entryN)]
+    """
+
+    _empty_node = EMPTY_AVL_NODE
+    _node_class = _AVLNode
+
+    def split(self, entry):
+        """T.split(entry) -> (lesser, entry, greater), two new trees with the entries of T
+        smaller and greater than entry and, between them, the entry of T equal to entry or
+        None. The nodes of T are moved into the new trees in O(log n), leaving T empty."""
+        left, found, right = _avl_split(self.root, self._key_of(entry))
+        self.root = self._empty_node
+        self._version += 1
+        return self._from_root(left), None if found is None else found.entry, self._from_root(right)
+
+    @classmethod
+    def join(cls, left, entry, right):
+        """AVLTree.join(left, entry, right) -> new tree with the entries of left, entry and
+        the entries of right, which must come in ascending order. entry may be None to join
+        left and right alone. The nodes of left and right are moved into the new tree in
+        O(|left.height - right.height|), leaving them empty."""
+        if not (isinstance(left, cls) and isinstance(right, cls)):
+            raise TypeError(f'{cls.__name__}.join expects two {cls.__name__} instances, '
+                            f'got {type(left).__name__} and {type(right).__name__}.')
+        if left.key is not right.key:
+            raise ValueError(f'{cls.__name__}.join expects trees with the same key function.')
+        if left._node_class is not right._node_class:
+            raise ValueError(f'{cls.__name__}.join expects trees of the same kind.')
+
+        tree = left._from_root(left._empty_node)
+        key = None if entry is None else tree._key_of(entry)
+        keys = [tree._key_of(left.max())] if left else []
+        if entry is not None:
+            keys.append(key)
+        if right:
+            keys.append(tree._key_of(right.min()))
+        if any(not lo < hi for lo, hi in zip(keys, keys[1:])):
+            raise ValueError(f'{cls.__name__}.join expects left < entry < right.')
+
+        if entry is None:
+            tree.root = _avl_join2(left.root, right.root)
+        else:
+            tree.root = _avl_join(left.root, tree._node_class(entry, key), right.root)
+
+        for source in (left, right):
+            source.root = source._empty_node
+            source._version += 1
+        return tree
+
+    def __or__(self, other):
+        """T | other -> new tree with the entries of T and of other. T's entries win on equal keys.
+        The result has up to n + m nodes of its own, so both operands are copied and this is
+        O(n + m). T |= other copies only other."""
+        return self._set_operation(other, _avl_union)
+
+    def __and__(self, other):
+        """T & other -> new tree with the entries of T whose keys are also in other.
+        The result can be far smaller than T, so instead of copying both operands the
+        smaller one is walked in order and finger searched in the larger one."""
+        if not isinstance(other, AVLTree):
+            return NotImplemented
+        items = self._intersection_items(other)
+        return self._from_root(self._build_balanced(iter(items), len(items)))
+
+    def __sub__(self, other):
+        """T - other -> new tree with the entries of T whose keys are not in other.
+        Like T & other, T is walked in order and finger searched in other, which is never
+        copied, so a small T costs little however large other is."""
+        if not isinstance(other, AVLTree):
+            return NotImplemented
+        items = self._difference_items(other)
+        return self._from_root(self._build_balanced(iter(items), len(items)))
+
+    def _intersection_items(self, other):
+        """Returns the (entry, key) pairs of T whose keys are in other, in order, walking the
+        smaller tree and finger searching its keys in the larger one."""
+        if other.key is not self.key:
+            other = self.__class__(other, **self._options())
+
+        small, large = (self, other) if len(self) <= len(other) else (other, self)
+        nodes = list(_range_nodes(small.root, None, None, (True, True), False))
+        items = []
+        for node, bound in zip(nodes, _finger_lower_bounds(large.root, (node.key for node in nodes))):
+            if bound is not None and not node.key < bound.key:
+                kept = node if small is self else bound
+                items.append((kept.entry, kept.key))
+        return items
+
+    def _difference_items(self, other):
+        """Returns the (entry, key) pairs of T whose keys are not in other, in order, walking
+        T and finger searching its keys in other."""
+        if other.key is not self.key:
+            other = self.__class__(other, **self._options())
+
+        nodes = list(_range_nodes(self.root, None, None, (True, True), False))
+        items = []
+        for node, bound in zip(nodes, _finger_lower_bounds(other.root, (node.key for node in nodes))):
+            if bound is None or node.key < bound.key:
+                items.append((node.entry, node.key))
+        return items
+
+    def __xor__(self, other):
+        """T ^ other -> new tree with the entries of T and of other whose keys are not in both.
+        Like T | other this copies both operands and is O(n + m)."""
+        return self._set_operation(other, _avl_symmetric_difference)
+
+    def __ior__(self, other):
+        return self._set_operation(other, _avl_union, in_place=True)
+
+    def __iand__(self, other):
+        if not isinstance(other, AVLTree):
+            return NotImplemented
+        items = self._intersection_items(other)
+        self.root = self._build_balanced(iter(items), len(items))
+        self._version += 1
+        return self
+
+    def __isub__(self, other):
+        if not isinstance(other, AVLTree):
+            return NotImplemented
+        if len(other) < len(self):
+            # removing a smaller tree, the join-based difference only copies other
+            return self._set_operation(other, _avl_difference, in_place=True)
+        items = self._difference_items(other)
+        self.root = self._build_balanced(iter(items), len(items))
+        self._version += 1
+        return self
+
+    def __ixor__(self, other):
+        return self._set_operation(other, _avl_symmetric_difference, in_place=True)
+
+    def _set_operation(self, other, operation, in_place=False):
+        """Applies the join-based operation to copies of the node structures of T and other,
+        so neither operand changes, or to T itself when in_place. The copies make it O(n + m),
+        while the operation alone is O(m log(n/m + 1)) for sizes m <= n. If other orders its
+        entries with another key function, or has other nodes, they are first rebuilt into a
+        tree like T."""
+        if not isinstance(other, AVLTree):
+            return NotImplemented
+
+        if other.key is self.key and other._node_class is self._node_class:
+            other_root = _copy_nodes(other.root)
+        else:
+            other_root = self.__class__(other, **self._options()).root
+
+        if in_place:
+            self.root = operation(self.root, other_root)
+            self._version += 1
+            return self
+        return self._from_root(operation(_copy_nodes(self.root), other_root))
+
+
+class Monoid:
+    """
+    Monoid describes the aggregate an AugmentedAVLTree keeps for every subtree.
+    combine : associative function of two aggregates, applied in key order.
+    identity : the aggregate of an empty subtree, so that combine(identity, a) == a.
+    measure : function turning an entry into the aggregate of that entry alone,
+        the entry itself when None.
+    Monoid(operator.add, 0) -> sums the entries.
+    Monoid(operator.add, 0, measure=lambda entry: entry[1]) -> sums the second items of the entries.
+    Trees sharing a monoid also share their node classes, so create a monoid once and reuse it.
+    """
+
+    __slots__ = ('combine', 'identity', 'measure', '_nodes')
+
+    def __init__(self, combine, identity, measure=None):
+        self.combine = combine
+        self.identity = identity
+        self.measure = measure
+        self._nodes = None
+
+    @classmethod
+    def sum(cls, measure=None):
+        """Monoid.sum() -> monoid adding up the measures of the entries."""
+        return cls(operator.add, 0, measure)
+
+    @classmethod
+    def min(cls, measure=None):
+        """Monoid.min() -> monoid keeping the smallest measure, inf when empty."""
+        return cls(min, math.inf, measure)
+
+    @classmethod
+    def max(cls, measure=None):
+        """Monoid.max() -> monoid keeping the largest measure, -inf when empty."""
+        return cls(max, -math.inf, measure)
+
+    def measure_of(self, entry):
+        """M.measure_of(entry) -> the aggregate of entry alone."""
+        return entry if self.measure is None else self.measure(entry)
+
+    def _node_classes(self):
+        """Returns the node class and the empty node of the trees aggregating with this monoid,
+        derived on first use."""
+        if self._nodes is None:
+            empty_class = type('_EmptyAugmentedAVLNode', (_EmptyAugmentedAVLNode,),
+                               {'__slots__': (), 'aggregate': self.identity})
+            empty = empty_class()
+            node_class = type('_AugmentedAVLNode', (_AugmentedAVLNode,),
+                              {'__slots__': (), '_monoid': self, '_empty': empty})
+            empty_class._node_class = node_class
+            self._nodes = node_class, empty
+        return self._nodes
+
+    def __reduce__(self):
+        return self.__class__, (self.combine, self.identity, self.measure)
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.combine!r}, {self.identity!r}, measure={self.measure!r})'
+
+
+class AugmentedAVLTree(AVLTree):
+    """
+    AugmentedAVLTree is an AVLTree whose nodes also keep the aggregate of their subtree,
+    as described by a Monoid. The aggregate is recomputed from the children wherever the
+    height is, rotations included, so updates stay O(log n) and aggregate(lo, hi) answers
+    any range in O(log n) as well.
+    AugmentedAVLTree() -> new empty tree summing its entries.
+    AugmentedAVLTree(seq, monoid=Monoid.max()) -> new tree keeping the largest entry of a range.
+    AugmentedAVLTree(seq, key=key, monoid=monoid) -> new tree ordered by key, aggregating with monoid.
+    """
+
+    _default_monoid = Monoid.sum()
+
+    def __init__(self, args=None, key=None, monoid=None):
+        self.monoid = self._default_monoid if monoid is None else monoid
+        self._node_class, self._empty_node = self.monoid._node_classes()
+        super().__init__(args, key)
+
+    def _options(self):
+        """Returns the keyword arguments that make the constructor build a tree like T.
+        The default monoid is left out, so a tree that is loaded or unpickled gets the
+        default of this process, and its node classes, back instead of a copy."""
+        options = {'key': self.key}
+        if self.monoid is not self._default_monoid:
+            options['monoid'] = self.monoid
+        return options
+
+    def aggregate(self, lo=None, hi=None, inclusive=(True, False)):
+        """T.aggregate(lo, hi) -> the measures of the entries between lo and hi, combined in order.
+        lo, hi and inclusive bound the range as in irange; the whole tree by default.
+        An empty range gives the identity of the monoid."""
+        lo = None if lo is None else self._key_of(lo)
+        hi = None if hi is None else self._key_of(hi)
+        lo_inclusive, hi_inclusive = inclusive
+        combine = self.monoid.combine
+        measure_of = self.monoid.measure_of
+
+        def below(key):
+            return lo is not None and (key < lo if lo_inclusive else key <= lo)
+
+        def above(key):
+            return hi is not None and (key > hi if hi_inclusive else key >= hi)
+
+        # The highest node in the range splits it into a part of its left subtree and a part of its right one.
+        root = self.root
+        while root:
+            if below(root.key):
+                root = root.right
+            elif above(root.key):
+                root = root.left
+            else:
+                break
+        else:
+            return self.monoid.identity
+
+        # Each node in the range on the way down the left side brings its right subtree along.
+        left = self.monoid.identity
+        node = root.left
+        while node:
+            if below(node.key):
+                node = node.right
+            else:
+                left = combine(combine(measure_of(node.entry), node.right.aggregate), left)
+                node = node.left
+
+        right = self.monoid.identity
+        node = root.right
+        while node:
+            if above(node.key):
+                node = node.left
+            else:
+                right = combine(right, combine(node.left.aggregate, measure_of(node.entry)))
+                node = node.right
+
+        return combine(combine(left, measure_of(root.entry)), right)
+
+
+class IntervalTree(AugmentedAVLTree):
+    """
+    IntervalTree keeps half-open intervals [start, end), given as tuples (start, end, ...)
+    whose further items can carry data. The intervals are ordered by start, then by end,
+    and every node keeps the largest end point of its subtree, so overlap queries skip
+    the subtrees that end too early and stop at the first interval starting too late.
+    IntervalTree() -> new empty tree.
+    IntervalTree(seq) -> new tree initialized from the intervals of seq.
+    IntervalTree(seq, key=lambda interval: interval[:2]) -> new tree ordering the intervals
+        without comparing their data; key must order them by start first.
+    """
+
+    _default_monoid = Monoid.max(measure=operator.itemgetter(1))
+
+    def __init__(self, args=None, key=None):
+        super().__init__(args, key, monoid=self._default_monoid)
+
+    def _options(self):
+        """Returns the keyword arguments that make the constructor build a tree like T."""
+        return {'key': self.key}
+
+    def overlap(self, lo, hi):
+        """T.overlap(lo, hi) -> iterates over the intervals overlapping [lo, hi), in order.
+        Takes O(log n) to find the first one and O(log n) per interval reported at worst."""
+        if not lo < hi:
+            return iter(())
+        return self._overlapping(lo, hi, False)
+
+    def at(self, point):
+        """T.at(point) -> iterates over the intervals containing point, in order."""
+        return self._overlapping(point, point, True)
+
+    def _overlapping(self, lo, hi, hi_inclusive):
+        """Yields the intervals ending after lo and starting before hi, or at hi when
+        hi_inclusive."""
+        stack = []
+        root = self.root
+
+        while True:
+            while root and root.aggregate > lo:
+                stack.append(root)
+                root = root.left
+
+            if not stack:
+                return
+
+            node = stack.pop()
+            start, end = node.entry[0], node.entry[1]
+            if start > hi or (start == hi and not hi_inclusive):
+                return
+            if end > lo:
+                yield node.entry
+            root = node.right
+
+
+class RBTree(AbstractBinarySearchTree):
+    """
+    RBTree implements a red-black tree.
+    Reference: https://en.wikipedia.org/wiki/Red%E2%80%93black_tree
+    Every node is colored red or black, no red node has a red child and every path from
+    a node down to a leaf passes the same number of black nodes, which keeps the height
+    within twice the optimum. Lookup, insertion, and deletion all take O(log n) time,
+    like in an AVLTree, but an update needs at most two rotations for an insertion and
+    three for a deletion, at the price of a somewhat taller tree.
+    RBTree expected comparable objects as entries.
+    RBTree() -> new empty tree.
+    RBTree(tree) -> new tree initialized from a tree
+    RBTree(seq) -> new tree initialized from seq values
+    RBTree(seq, key=key) -> new tree ordering its entries by key(entry)
+    """
+
+    _empty_node = EMPTY_RB_NODE
+    _node_class = _RBNode
+    _shape_bits = 1
+
+    def _build_balanced(self, items, count):
+        """Builds a perfectly balanced subtree, like every tree, and colors it: every level
+        is full but maybe the last one, whose nodes are colored red and all others black."""
+        root = super()._build_balanced(items, count)
+        red_depth = (count + 1).bit_length() - 1
+        level = [root] if root else []
+        depth = 0
+        while level:
+            for node in level:
+                node.red = depth == red_depth
+            level = [child for node in level for child in (node.left, node.right) if child]
+            depth += 1
+        return root
+
+    def _node_bits(self, node):
+        """The color of node, set when it is red."""
+        return node.red
+
+    def _restore_node_bits(self, node, bits):
+        node.red = bool(bits)
+
+
+class Treap(AbstractBinarySearchTree):
+    """
+    Treap implements a randomized binary search tree.
+    Reference: https://en.wikipedia.org/wiki/Treap
+    Every node draws a random priority and the tree is kept ordered by key like any binary
+    search tree and by priority like a heap, so its shape is that of a tree built by
+    inserting the entries in random order, whatever order they really come in. Lookup,
+    insertion, and deletion take O(log n) expected time even on sorted or adversarial
+    input, and so do split and merge, which follow a single path.
+    Treap expected comparable objects as entries.
+    Treap() -> new empty tree.
+    Treap(tree) -> new tree initialized from a tree
+    Treap(seq) -> new tree initialized from seq values
+    Treap(seq, key=key) -> new tree ordering its entries by key(entry)
+    Treap(seq, rng=random.Random(seed)) -> new tree drawing its priorities from rng,
+        which gives the same tree on every run. Copies and the trees split or merged from
+        T draw from generators of their own seeded from rng. Pickling and save need an rng
+        whose state can be saved, so not random.SystemRandom.
+    """
+
+    _empty_node = EMPTY_TREAP_NODE
+    _node_class = _TreapNode
+    _shape_bits = 32
+
+    def __init__(self, args=None, key=None, rng=None):
+        self.rng = random.Random() if rng is None else rng
+        super().__init__(args, key)
+
+    def _options(self):
+        """Returns the keyword arguments that make the constructor build a tree like T."""
+        return {'key': self.key, 'rng': self.rng}
+
+    def _from_root(self, root):
+        """Returns a new tree like T holding the subtree root, drawing its priorities from a
+        random.Random of its own seeded from T.rng, so the trees derived from T do not
+        draw the same priorities and a seeded T still derives the same trees every run."""
+        tree = super()._from_root(root)
+        tree.rng = random.Random(self.rng.getrandbits(64))
+        return tree
+
+    def _insert_key(self, key, entry):
+        """Inserts entry with its key into the nodes of T, with a priority drawn from T.rng."""
+        self.root = self.root.insert(key, entry, self.rng.getrandbits(32))
+
+    def _build_balanced(self, items, count):
+        """Builds a perfectly balanced subtree, like every tree, and gives it count priorities
+        drawn from T.rng, in decreasing order level by level, so every parent outranks its
+        children. O(n log n) for the sort of the priorities, which runs at C speed."""
+        root = super()._build_balanced(items, count)
+        priorities = iter(sorted((self.rng.getrandbits(32) for _ in range(count)), reverse=True))
+        level = [root] if root else []
+        while level:
+            for node in level:
+                node.priority = next(priorities)
+            level = [child for node in level for child in (node.left, node.right) if child]
+        return root
+
+    def _node_bits(self, node):
+        """The priority of node."""
+        return node.priority
+
+    def _restore_node_bits(self, node, bits):
+        node.priority = bits
+
+    def split(self, entry):
+        """T.split(entry) -> (lesser, entry, greater), two new trees with the entries of T
+        smaller and greater than entry and, between them, the entry of T equal to entry or
+        None. The nodes of T are moved into the new trees in O(log n) expected, leaving T
+        empty."""
+        left, found, right = _treap_split(self.root, self._key_of(entry))
+        self.root = self._empty_node
+        self._version += 1
+        return self._from_root(left), None if found is None else found.entry, self._from_root(right)
+
+    @classmethod
+    def merge(cls, left, right):
+        """Treap.merge(left, right) -> new tree with the entries of left and the entries of
+        right, which must all be greater. The nodes of left and right are moved into the
+        new tree in O(log n) expected, leaving them empty."""
+        if not (isinstance(left, cls) and isinstance(right, cls)):
+            raise TypeError(f'{cls.__name__}.merge expects two {cls.__name__} instances, '
+                            f'got {type(left).__name__} and {type(right).__name__}.')
+        if left.key is not right.key:
+            raise ValueError(f'{cls.__name__}.merge expects trees with the same key function.')
+        if left._node_class is not right._node_class:
+            raise ValueError(f'{cls.__name__}.merge expects trees of the same kind.')
+        if left and right and not left._key_of(left.max()) < right._key_of(right.min()):
+            raise ValueError(f'{cls.__name__}.merge expects left < right.')
+
+        tree = left._from_root(_treap_merge(left.root, right.root))
+        for source in (left, right):
+            source.root = source._empty_node
+            source._version += 1
+        return tree
+
+
+class PersistentAVLTree(AbstractBinarySearchTree):
+    """
+    PersistentAVLTree is an immutable AVLTree.
+    insert and delete leave the tree as it is and return a new tree, which shares every
+    subtree the update did not touch. Only the O(log n) nodes on the path to the change
+    are copied (path copying), so every version stays valid and keeping one, for undo or
+    to hand it to a reader thread, costs nothing.
+    PersistentAVLTree() -> new empty tree.
+    PersistentAVLTree(tree) -> new tree initialized from a tree
+    PersistentAVLTree(seq) -> new tree initialized from seq [(entry1), (entry2), ... (entryN)]
+    """
+
+    _empty_node = EMPTY_AVL_NODE
+    _node_class = _AVLNode
+
+    def _init_tree(self, args):
+        """Initialize the tree according to the arguments passed. Another persistent tree
+        with the same key function is shared as it is."""
+        if isinstance(args, PersistentAVLTree) and args.key is self.key:
+            self.root = args.root
+        else:
+            super()._init_tree(args)
+
+    def insert(self, entry):
+        """T.insert(entry) -> new tree with entry added, T itself does not change."""
+        return self._from_root(_persistent_insert(self.root, self._key_of(entry), entry))
+
+    def delete(self, entry):
+        """T.delete(entry) -> new tree without entry, T itself does not change.
+        Raises KeyError if entry is not in T."""
+        return self._from_root(_persistent_delete(self.root, self._key_of(entry)))
+
+    def insert_many(self, entries):
+        """T.insert_many(entries) -> new tree with every entry of entries added.
+        A batch that is large next to T is merged into a new balanced tree in O(n + m)."""
+        entries = list(entries)
+        if len(entries) * _BULK_REBUILD_RATIO < len(self):
+            root = self.root
+            for entry in entries:
+                root = _persistent_insert(root, self._key_of(entry), entry)
+            return self._from_root(root)
+
+        items = self._merged_items(entries)
+        return self._from_root(self._build_balanced(iter(items), len(items)))
+
+    def delete_many(self, entries):
+        """T.delete_many(entries) -> new tree without the entries of entries.
+        Raises KeyError if any of them is not in T."""
+        entries, keys = self._sorted_batch(list(entries))
+        if len(entries) * _BULK_REBUILD_RATIO < len(self):
+            root = self.root
+            for entry, key in zip(entries, keys):
+                try:
+                    root = _persistent_delete(root, key)
+                except KeyError:
+                    raise KeyError(f'Entry {entry} not found.')
+            return self._from_root(root)
+
+        items = self._remaining_items(entries, keys)
+        return self._from_root(self._build_balanced(iter(items), len(items)))
+
+    def clear(self):
+        """T.clear() -> new empty tree with the key function of T."""
+        return self._from_root(self._empty_node)
+
+    def copy(self):
+        """T.copy() -> T itself, a persistent tree never changes."""
+        return self
+
+    __copy__ = copy
+
+    def __deepcopy__(self, memo):
+        """Returns a new tree holding deep copies of the entries and keys of T. The nodes
+        of T may be shared with other versions, so the copy gets nodes of its own."""
+        tree = self._from_root(_copy_nodes(self.root))
+        memo[id(self)] = tree
+        for node in _range_nodes(tree.root, None, None, (True, True), False):
+            entry = deepcopy(node.entry, memo)
+            node.key = entry if node.key is node.entry else deepcopy(node.key, memo)
+            node.entry = entry
+        return tree
+
+
+class ConcurrentAVLTree:
+    """
+    ConcurrentAVLTree is an AVLTree that can be shared between threads.
+    It publishes its content as a PersistentAVLTree, which never changes once built.
+    Writers are serialized by a lock; each builds the next version from the published one
+    by path copying and swaps it in with a single assignment. Readers take no lock: they
+    query whichever version is published at the time, never see an update half done and
+    never block each other or the writer.
+    ConcurrentAVLTree() -> new empty tree.
+    ConcurrentAVLTree(tree) -> new tree initialized from a tree
+    ConcurrentAVLTree(seq) -> new tree initialized from seq [(entry1), (entry2), ... (entryN)]
+    """
+
+    def __init__(self, args=None, key=None):
+        if isinstance(args, ConcurrentAVLTree):
+            args = args.snapshot()
+        self._tree = PersistentAVLTree(args, key=key)
+        self._write_lock = threading.Lock()
+
+    @property
+    def key(self):
+        return self._tree.key
+
+    def __reduce__(self):
+        """Pickles the published version of T, the lock is created anew on loading."""
+        return self.__class__, (self._tree, self.key)
+
+    def save(self, path, keep_shape=True):
+        """T.save(path) -> writes the published version of T to the file at path."""
+        self._tree.save(path, keep_shape)
+
+    @classmethod
+    def load(cls, path):
+        """T.load(path) -> new tree read from a file written by save, built in O(n)."""
+        tree = PersistentAVLTree.load(path)
+        return cls(tree, key=tree.key)
+
+    def snapshot(self):
+        """T.snapshot() -> the published version of T as a PersistentAVLTree, in O(1).
+        Later updates do not show in it, so several queries on it see the same entries."""
+        return self._tree
+
+    def insert(self, entry):
+        """T.insert(entry) -> inserts entry as one update."""
+        with self._write_lock:
+            self._tree = self._tree.insert(entry)
+
+    def delete(self, entry):
+        """T.remove(entry) remove item <entry> from tree."""
+        with self._write_lock:
+            self._tree = self._tree.delete(entry)
+
+    def insert_many(self, entries):
+        """T.insert_many(entries) -> inserts every entry of entries as one update."""
+        entries = list(entries)
+        with self._write_lock:
+            self._tree = self._tree.insert_many(entries)
+
+    def delete_many(self, entries):
+        """T.delete_many(entries) -> removes every entry of entries as one update.
+        Raises KeyError, leaving T untouched, if any of them is not in T."""
+        entries = list(entries)
+        with self._write_lock:
+            self._tree = self._tree.delete_many(entries)
+
+    def clear(self):
+        """T.clear() -> Removes all entries of T leaving it empty."""
+        with self._write_lock:
+            self._tree = self._tree.clear()
+
+    def search(self, entry):
+        """Returns k if T has a entry k, else raise KeyError"""
+        return self._tree.search(entry)
+
+    def get(self, entry, default=None):
+        """T.get(entry[, default]) -> the entry of T equal to entry, else default."""
+        return self._tree.get(entry, default)
+
+    def search_many(self, entries, default=None):
+        """T.search_many(entries) -> list with the entry of T equal to each of entries."""
+        return self._tree.search_many(entries, default)
+
+    def contains_many(self, entries):
+        """T.contains_many(entries) -> list of booleans telling whether each of entries is in T."""
+        return self._tree.contains_many(entries)
+
+    def floor(self, entry, default=None):
+        """T.floor(entry) -> the largest entry of T not greater than entry, else default."""
+        return self._tree.floor(entry, default)
+
+    def ceiling(self, entry, default=None):
+        """T.ceiling(entry) -> the smallest entry of T not smaller than entry, else default."""
+        return self._tree.ceiling(entry, default)
+
+    def lower(self, entry, default=None):
+        """T.lower(entry) -> the largest entry of T smaller than entry, else default."""
+        return self._tree.lower(entry, default)
+
+    def higher(self, entry, default=None):
+        """T.higher(entry) -> the smallest entry of T greater than entry, else default."""
+        return self._tree.higher(entry, default)
+
+    def pred(self, entry):
+        """T.pred(entry) -> the entry of T preceding entry. Raises KeyError if there is none."""
+        return self._tree.pred(entry)
+
+    def succ(self, entry):
+        """T.succ(entry) -> the entry of T succeeding entry. Raises KeyError if there is none."""
+        return self._tree.succ(entry)
+
+    def irange(self, lo=None, hi=None, inclusive=(True, False), reverse=False):
+        """T.irange(lo, hi) -> iterates over the entries between lo and hi of the version
+        published when the iteration starts."""
+        return self._tree.irange(lo, hi, inclusive, reverse)
+
+    def traverse(self, order='inorder'):
+        """T.traverse(order) -> iterates over the entries of the version published when the
+        traversal starts, in the order given as for AVLTree.traverse."""
+        return self._tree.traverse(order)
+
+    def rank(self, entry):
+        """T.rank(entry) -> number of entries of T strictly smaller than entry."""
+        return self._tree.rank(entry)
+
+    def select(self, index):
+        """T.select(k) -> the k-th smallest entry of T, counting from zero."""
+        return self._tree.select(index)
+
+    def quantile(self, q):
+        """T.quantile(q) -> the smallest entry of T that at least a fraction q of the entries
+        of T are not greater than, for 0 <= q <= 1."""
+        return self._tree.quantile(q)
+
+    def __getitem__(self, index):
+        """T[k] -> the k-th smallest entry of T, T[i:j] -> those entries of a slice."""
+        return self._tree[index]
+
+    def max(self):
+        """T.max() -> get the maximum entry of T."""
+        return self._tree.max()
 
-            raise KeyError(f'Predecessor of {entry} not found.')
+    def min(self):
+        """T.min() -> get the minimum entry of T."""
+        return self._tree.min()
+
+    @property
+    def height(self):
+        """Returns the height of the tree. When the tree is empty its height is zero."""
+        return self._tree.height
+
+    def __contains__(self, entry):
+        """k in T -> True if T has a entry k, else False"""
+        return entry in self._tree
+
+    def __len__(self):
+        """T.__len__() <==> len(x). Returns the number of elements in the tree."""
+        return len(self._tree)
+
+    def __bool__(self):
+        return bool(self._tree)
+
+    def __iter__(self):
+        """iter(T) -> iterates over the entries of the version published when the
+        iteration starts, in ascending order."""
+        return iter(self._tree)
 
-    def succ(self, succ, entry):
-        if entry > self.entry:
-            return self.right.succ(succ, entry)
-        elif entry < self.entry:
-            return self.left.succ(self, entry)
+    def __repr__(self):
+        """T.__repr__(...) <==> repr(x)."""
+        return f'{self.__class__.__name__}({list(self._tree.traverse("bfs"))})'
+
+    def __str__(self):
+        """T.__str__(...) <==> str(x)."""
+        return repr(self)
+
+
+def _load_multiset(cls, items, options):
+    """Rebuilds a multiset pickled by AbstractTreeMultiset.__reduce__."""
+    tree = cls(**options)
+    with _gc_paused():
+        tree._restore_counts([entry for entry, _ in items], [count for _, count in items])
+    return tree
+
+
+class AbstractTreeMultiset(AbstractBinarySearchTree):
+    """
+    Base of the multisets, trees that keep every entry added to them.
+    Entries with equal keys share a node that counts them; the first one added stands for
+    all of them. Every node also keeps the total of the counts in its subtree, so len,
+    rank, select and quantile take the multiplicities into account in O(log n).
+    Iterating, indexing and irange yield each entry as many times as it occurs, traverse
+    and cursors visit each node once.
+    """
+
+    def add(self, entry, n=1):
+        """T.add(entry, n=1) -> adds n occurrences of entry to T. n must be a positive integer."""
+        n = operator.index(n)
+        if n < 1:
+            raise ValueError(f'Cannot add {n} occurrences of {entry}.')
+
+        key = self._key_of(entry)
+        path = self._lower_bound_path(key)
+        if not path or key < path[-1].key:
+            self.root = self.root.insert(key, entry)
+            n -= 1
+            path = self._lower_bound_path(key)
+
+        path[-1].count += n
+        for node in path:
+            node.total += n
+        self._version += 1
+
+    def remove(self, entry, n=1):
+        """T.remove(entry, n=1) -> removes n occurrences of entry from T. Raises KeyError if
+        entry is not in T and ValueError if it occurs fewer than n times."""
+        n = operator.index(n)
+        if n < 1:
+            raise ValueError(f'Cannot remove {n} occurrences of {entry}.')
+
+        key = self._key_of(entry)
+        path = self._lower_bound_path(key)
+        if not path or key < path[-1].key:
+            raise KeyError(f'Entry {entry} not found.')
+
+        count = path[-1].count
+        if count < n:
+            raise ValueError(f'Cannot remove {n} occurrences of {entry}, there are {count}.')
+        if count == n:
+            self.root = self.root.delete(key)
         else:
-            if self.right:
-                return self.right.min()
-            if succ:
-                return succ.entry
+            path[-1].count -= n
+            for node in path:
+                node.total -= n
+        self._version += 1
+
+    def count(self, entry):
+        """T.count(entry) -> number of occurrences of entry in T."""
+        key = self._key_of(entry)
+        node = _lower_bound(self.root, key)
+        if node is None or key < node.key:
+            return 0
+        return node.count
 
-            raise KeyError(f'Successor of {entry} not found.')
+    def insert(self, entry):
+        """T.insert(entry) -> adds one occurrence of entry to T."""
+        self.add(entry)
+
+    def delete(self, entry):
+        """T.delete(entry) -> removes one occurrence of entry from T."""
+        self.remove(entry)
+
+    def insert_many(self, entries):
+        """T.insert_many(entries) -> adds one occurrence of every entry of entries."""
+        for entry in entries:
+            self.add(entry)
+
+    def delete_many(self, entries):
+        """T.delete_many(entries) -> removes one occurrence of every entry of entries. Raises
+        KeyError or ValueError, leaving T untouched, if T does not hold them all."""
+        entries, counts = self._counted(entries)
+        for entry, n in zip(entries, counts):
+            count = self.count(entry)
+            if not count:
+                raise KeyError(f'Entry {entry} not found.')
+            if count < n:
+                raise ValueError(f'Cannot remove {n} occurrences of {entry}, there are {count}.')
+        for entry, n in zip(entries, counts):
+            self.remove(entry, n)
+
+    def __repr__(self):
+        """T.__repr__(...) <==> repr(x)."""
+        return f'{type(self).__name__}({list(self)})'
+
+    def items(self):
+        """T.items() -> iterates over the (entry, count) pairs of T in ascending order."""
+        return ((node.entry, node.count) for node in _range_nodes(self.root, None, None, (True, True), False))
+
+    def __len__(self):
+        """T.__len__() <==> len(x). Returns the number of entries, counting every occurrence."""
+        return self.root.total
+
+    def __iter__(self):
+        """iter(T) -> iterates over the entries of T in ascending order, each one as many
+        times as it occurs."""
+        return self._iter_from(0)
+
+    def __eq__(self, other):
+        """T == other -> True if other is a multiset of the same kind with the same entries
+        and counts, whatever the shapes of the trees."""
+        if not isinstance(other, self.__class__):
+            return False
+        return len(self) == len(other) and list(self.items()) == list(other.items())
+
+    def irange(self, lo=None, hi=None, inclusive=(True, False), reverse=False):
+        """T.irange(lo, hi) -> iterates over the entries between lo and hi in sorted order,
+        each one as many times as it occurs. See AbstractBinarySearchTree.irange."""
+        lo = None if lo is None else self._key_of(lo)
+        hi = None if hi is None else self._key_of(hi)
+        for node in _range_nodes(self.root, lo, hi, inclusive, reverse):
+            for _ in range(node.count):
+                yield node.entry
+
+    def rank(self, entry):
+        """T.rank(entry) -> number of occurrences in T of entries strictly smaller than entry.
+        The entry does not need to be in the tree."""
+        key = self._key_of(entry)
+        rank = 0
+        root = self.root
+
+        while root:
+            if root.key < key:
+                rank += root.left.total + root.count
+                root = root.right
+            else:
+                root = root.left
+
+        return rank
+
+    def select(self, index):
+        """T.select(k) -> the k-th smallest entry of T, counting from zero and counting every
+        occurrence. Raises IndexError if k is out of range."""
+        if not 0 <= index < self.root.total:
+            raise IndexError(f'Index {index} out of range.')
+
+        root = self.root
+        while True:
+            left_total = root.left.total
+            if index < left_total:
+                root = root.left
+            elif index >= left_total + root.count:
+                index -= left_total + root.count
+                root = root.right
+            else:
+                return root.entry
+
+    def _iter_from(self, index, reverse=False):
+        """Yields the entries in order, or in reverse order, starting from position index,
+        each one as many times as it occurs."""
+        stack = []
+        root = self.root
+
+        while root:
+            left_total = root.left.total
+            if index < left_total:
+                if not reverse:
+                    stack.append(root)
+                root = root.left
+            elif index >= left_total + root.count:
+                if reverse:
+                    stack.append(root)
+                index -= left_total + root.count
+                root = root.right
+            else:
+                offset = index - left_total
+                for _ in range(offset + 1 if reverse else root.count - offset):
+                    yield root.entry
+                root = root.left if reverse else root.right
+                break
+
+        while stack or root:
+            while root:
+                stack.append(root)
+                root = root.right if reverse else root.left
+
+            root = stack.pop()
+            for _ in range(root.count):
+                yield root.entry
+            root = root.left if reverse else root.right
+
+    def _init_tree(self, args):
+        """Initialize the tree according to the arguments passed. """
+        self.root = self._empty_node
+
+        if args is None:
+            return
 
+        if isinstance(args, self.__class__) and args.key is self.key:
+            self.root = _copy_nodes(args.root)
+            return
 
-class AVLTree:
+        try:
+            self._restore_counts(*self._counted(args))
+        except (ValueError, TypeError) as e:
+            raise TypeError(f'{self.__class__.__name__} constructor called with '
+                            f'incompatible data type: {e}')
+
+    @classmethod
+    def from_sorted(cls, entries, key=None):
+        """T.from_sorted(seq) -> new balanced multiset built from seq in O(n).
+        seq must be in ascending order of key, entries with equal keys are counted."""
+        tree = cls(key=key)
+        entries = list(entries)
+        keys = entries if key is None else [key(entry) for entry in entries]
+        if any(keys[i] < keys[i - 1] for i in range(1, len(keys))):
+            raise ValueError(f'{cls.__name__}.from_sorted expects entries in ascending order.')
+
+        tree._restore_counts(*tree._counted(entries))
+        return tree
+
+    def _counted(self, entries):
+        """Returns the distinct entries of entries sorted by key, the first of the entries
+        sharing a key standing for them, and the number of entries with each key."""
+        entries = sorted(entries, key=self.key)
+        distinct, counts = [], []
+        prev = None
+        for entry in entries:
+            key = self._key_of(entry)
+            if counts and not prev < key:
+                counts[-1] += 1
+            else:
+                distinct.append(entry)
+                counts.append(1)
+                prev = key
+        return distinct, counts
+
+    def _restore_counts(self, entries, counts, shape=None):
+        """Sets the root of T to a tree of the distinct entries, which must be in order, with
+        their counts. The tree is built node for node after shape, as yielded by _shape, or
+        balanced without it. O(n)."""
+        if shape is None:
+            keys = entries if self.key is None else [self.key(entry) for entry in entries]
+            self.root = self._build_balanced(zip(entries, keys, counts), len(entries))
+            return
+
+        self._restore(entries, shape)
+        for node, count in zip(_range_nodes(self.root, None, None, (True, True), False), counts):
+            node.count = count
+
+        # the totals were summed with counts of one, redo them children first
+        stack, nodes = [self.root], []
+        while stack:
+            node = stack.pop()
+            if node:
+                nodes.append(node)
+                stack.extend((node.left, node.right))
+        for node in reversed(nodes):
+            node.total = node.count + node.left.total + node.right.total
+
+    def __reduce__(self):
+        """Pickles T as its distinct entries with their counts, rebuilt balanced in O(n)."""
+        return _load_multiset, (self.__class__, list(self.items()), self._options())
+
+    def save(self, path, keep_shape=True):
+        """T.save(path) -> writes T to the file at path, streaming its distinct entries in
+        order, then their counts, then its shape when keep_shape, in pickled chunks. Without
+        the shape, load builds a balanced multiset instead of the same one."""
+        with open(path, 'wb') as file:
+            header = (type(self).__name__, self._options(), self.root.size, keep_shape)
+            pickle.dump(_SAVE_MULTISET_FORMAT + header, file, pickle.HIGHEST_PROTOCOL)
+            _write_chunks(file, (entry for entry, _ in self.items()))
+            _write_chunks(file, (count for _, count in self.items()), 'q')
+            if keep_shape:
+                _write_chunks(file, self._shape(), 'q')
+
+    @classmethod
+    def load(cls, path):
+        """T.load(path) -> new multiset read from a file written by save, built in O(n).
+        The file is unpickled, so only load files from a trusted source."""
+        with open(path, 'rb') as file:
+            options, count, keep_shape = _read_save_header(file, path, cls, _SAVE_MULTISET_FORMAT)
+            entries = _read_chunks(file, [], count)
+            counts = _read_chunks(file, array('q'), count)
+            shape = _read_chunks(file, array('q'), count) if keep_shape else None
+
+        tree = cls(**options)
+        with _gc_paused():
+            tree._restore_counts(entries, counts, shape)
+        return tree
+
+
+class BinarySearchTreeMultiset(AbstractTreeMultiset):
     """
-    AVLTree implements a balanced binary tree.
-    Reference: http://en.wikipedia.org/wiki/AVL_tree
-    In computer science, an AVL tree is a self-balancing binary search tree, and
-    it is the first such data structure to be invented. In an AVL tree, the
-    heights of the two child subtrees of any node differ by at most one;
-    therefore, it is also said to be height-balanced. Lookup, insertion, and
-    deletion all take O(log n) time in both the average and worst cases, where n
-    is the number of nodes in the tree prior to the operation. Insertions and
-    deletions may require the tree to be rebalanced by one or more tree rotations.
-    The AVL tree is named after its two inventors, G.M. Adelson-Velskii and E.M.
-    Landis, who published it in their 1962 paper "An algorithm for the
-    organization of information."
-    AVLTree expected comparable objects as entries.
-    AVLTree() -> new empty tree.
-    AVLTree(tree) -> new tree initialized from a tree
-    AVLTree(seq) -> new tree initialized from seq [(entry1), (entry2), ... (entryN)]
+    BinarySearchTreeMultiset is a BinarySearchTree that counts repeated entries.
+    BinarySearchTreeMultiset() -> new empty multiset.
+    BinarySearchTreeMultiset(seq) -> new multiset with every entry of seq, duplicates included
     """
 
-    def __init__(self, args=None):
-        """Initialize an AVL Tree. """
-        self.root = None
+    _empty_node = EMPTY_BST_MULTISET_NODE
+    _node_class = _BSTMultisetNode
+
+
+class AVLTreeMultiset(AbstractTreeMultiset):
+    """
+    AVLTreeMultiset is an AVLTree that counts repeated entries.
+    AVLTreeMultiset() -> new empty multiset.
+    AVLTreeMultiset(seq) -> new multiset with every entry of seq, duplicates included
+    """
+
+    _empty_node = EMPTY_AVL_MULTISET_NODE
+    _node_class = _AVLMultisetNode
+
+
+class ArrayAVLTree:
+    """
+    ArrayAVLTree is an AVLTree for numeric entries that keeps its nodes in
+    parallel arrays instead of node objects.
+    A node is an index into array.array buffers holding the entries, the
+    indexes of the left and right children, the heights and the subtree sizes.
+    Index 0 is the empty node. Deleted nodes are chained in a free list and
+    reused by later insertions. Compared to AVLTree this takes a fraction of the
+    memory, leaves no node objects for the garbage collector to track, and a
+    snapshot of the tree is a plain copy of the buffers.
+    The balancing is the same as AVLTree's, so both build the same shape from
+    the same operations.
+    typecode : the array typecode of the entries, 'q' (64 bits signed integers)
+        by default. Use 'd' for floats.
+    ArrayAVLTree() -> new empty tree.
+    ArrayAVLTree(tree) -> new tree initialized from a tree
+    ArrayAVLTree(seq) -> new tree initialized from seq [(entry1), (entry2), ... (entryN)]
+    """
+
+    def __init__(self, args=None, typecode='q'):
+        """Initialize an array backed AVL Tree. """
+        self.typecode = typecode
         self._init_tree(args)
 
     def insert(self, entry):
         """T.insert(entry) -- insert elem"""
-        self.root = self.root.insert(entry)
+        entries, left, right = self._entries, self._left, self._right
+        path = []
+        candidate = 0
+        node = self._root
+
+        while node:
+            if entry < entries[node]:
+                path.append((node, False))
+                node = left[node]
+            else:
+                candidate = node
+                path.append((node, True))
+                node = right[node]
+
+        if candidate and not entries[candidate] < entry:
+            return
+
+        self._root = self._rebalance_path(path, self._new_node(entry))
 
     def delete(self, entry):
         """T.remove(entry) remove item <entry> from tree."""
-        self.root = self.root.delete(entry)
+        entries, left, right = self._entries, self._left, self._right
+        path = []
+        target = 0
+        node = self._root
+
+        while node:
+            if entries[node] < entry:
+                path.append((node, True))
+                node = right[node]
+            else:
+                target = node
+                path.append((node, False))
+                node = left[node]
+
+        if not target or entry < entries[target]:
+            raise KeyError(entry)
+
+        node, _ = path.pop()
+        if node != target:
+            entries[target] = entries[node]
+
+        child = left[node] if left[node] else right[node]
+        self._free_node(node)
+        self._root = self._rebalance_path(path, child)
+
+    def search(self, entry):
+        """Returns k if T has a entry k, else raise KeyError"""
+        node = self._lower_bound(entry)
+        if not node or entry < self._entries[node]:
+            raise KeyError(f'Entry {entry} not found.')
+        return self._entries[node]
+
+    def pred(self, entry):
+        """Returns the entry that precedes entry in T. Raises KeyError if there is none."""
+        entries, left, right = self._entries, self._left, self._right
+        candidate = pred = 0
+        node = self._root
+
+        while node:
+            if entries[node] < entry:
+                pred = node
+                node = right[node]
+            else:
+                candidate = node
+                node = left[node]
+
+        if not candidate or entry < entries[candidate] or not pred:
+            raise KeyError(f'Predecessor of {entry} not found.')
+        return entries[pred]
+
+    def succ(self, entry):
+        """Returns the entry that succeeds entry in T. Raises KeyError if there is none."""
+        entries, left, right = self._entries, self._left, self._right
+        candidate = succ = 0
+        node = self._root
+
+        while node:
+            if entry < entries[node]:
+                succ = node
+                node = left[node]
+            else:
+                candidate = node
+                node = right[node]
+
+        if not candidate or entries[candidate] < entry or not succ:
+            raise KeyError(f'Successor of {entry} not found.')
+        return entries[succ]
+
+    def max(self):
+        """T.max() -> get the maximum entry of T."""
+        if not self._root:
+            raise ValueError('max() of an empty tree.')
+        return self._entries[self._max_node(self._root)]
+
+    def min(self):
+        """T.min() -> get the minimum entry of T."""
+        if not self._root:
+            raise ValueError('min() of an empty tree.')
+        return self._entries[self._min_node(self._root)]
 
     def traverse(self, order='inorder'):
         """Traverse the tree based on a given strategy.
@@ -617,66 +3489,81 @@ class AVLTree:
             The default is 'inorder' which prints the left subtree, the root and the right subtree.
         """
         if order == 'preorder':
-            return self._preorder(self.root)
+            return self._preorder()
         elif order == 'postorder':
-            return self._postorder(self.root)
+            return self._postorder()
         elif order == 'bfs':
             return self._bfs()
         else:
-            return self._inorder(self.root)
+            return self._inorder()
 
     @property
     def height(self):
         """Returns the height of the tree. When the tree is empty its height is zero."""
-        return self.root.height
-
-    def search(self, entry):
-        """Returns k if T has a entry k, else raise KeyError"""
-        return self._search(entry).entry
-
-    def _search(self, entry):
-        """Returns node.k if T has a entry k, else raise KeyError"""
-        root = self.root
-
-        while root:
-            if entry > root.entry:
-                root = root.right
-            elif entry < root.entry:
-                root = root.left
-            else:
-                return root
-
-        raise KeyError(f'Entry {entry} not found.')
-
-    def pred(self, entry):
-        return self.root.pred(EMPTY_NODE, entry)
+        return self._height[self._root]
 
-    def succ(self, entry):
-        return self.root.succ(EMPTY_NODE, entry)
+    def clear(self):
+        """T.clear() -> Removes all entries of T leaving it empty."""
+        self._init_tree(None)
+
+    def copy(self):
+        """T.copy() -> a snapshot of T, taken by copying its buffers."""
+        tree = self.__class__(typecode=self.typecode)
+        tree._entries = self._entries[:]
+        tree._left = self._left[:]
+        tree._right = self._right[:]
+        tree._height = self._height[:]
+        tree._size = self._size[:]
+        tree._root = self._root
+        tree._free = self._free
+        return tree
+
+    __copy__ = copy
+
+    @classmethod
+    def from_sorted(cls, entries, typecode='q'):
+        """T.from_sorted(seq) -> new balanced tree built from seq in O(n).
+        seq must be in ascending order, duplicated entries are kept once."""
+        entries = list(entries)
+        unique_sorted = AbstractBinarySearchTree._unique_sorted(entries, entries)
+        if unique_sorted is None:
+            raise ValueError(f'{cls.__name__}.from_sorted expects entries in ascending order.')
+
+        unique_entries = unique_sorted[0]
+        tree = cls(typecode=typecode)
+        tree._root = tree._build_balanced(unique_entries, 0, len(unique_entries))
+        return tree
 
     def __len__(self):
         """T.__len__() <==> len(x). Retuns the number of elements in the tree."""
-        return len(self.root)
+        return self._size[self._root]
+
+    def __bool__(self):
+        """Returns True if the tree is not empty"""
+        return bool(self._root)
+
+    def __iter__(self):
+        """iter(T) -> iterates over the entries of T in ascending order."""
+        return self._inorder()
 
     def __contains__(self, entry):
         """k in T -> True if T has a entry k, else False"""
-        try:
-            self.search(entry)
-            return True
-        except KeyError:
-            return False
-
-    def max(self):
-        """T.max() -> get the maximum entry of T."""
-        return self.root.max()
+        node = self._lower_bound(entry)
+        return node != 0 and not entry < self._entries[node]
 
-    def min(self):
-        """T.min() -> get the minimum entry of T."""
-        return self.root.min()
+    def get(self, entry, default=None):
+        """T.get(entry[, default]) -> the entry of T equal to entry, else default."""
+        node = self._lower_bound(entry)
+        if not node or entry < self._entries[node]:
+            return default
+        return self._entries[node]
 
-    def clear(self):
-        """T.clear() -> Removes all entries of T leaving it empty."""
-        self.root = self.root.clear()
+    def __eq__(self, other):
+        """Checks if two trees are equal. """
+        if isinstance(other, self.__class__):
+            if self.height == other.height and len(self) == len(other):
+                return list(self._preorder()) == list(other._preorder())
+        return False
 
     def __repr__(self):
         """T.__repr__(...) <==> repr(x).
@@ -687,76 +3574,466 @@ class AVLTree:
         """T.__str__(...) <==> str(x)."""
         return repr(self)
 
-    def __eq__(self, other):
-        """Checks if two trees are equal. """
-        if isinstance(other, self.__class__):
-            if self.height == other.height and len(self) == len(other):
-                return self.root == other.root
-        return False
-
-    def __bool__(self):
-        """Returns True if the tree is not empty"""
-        return bool(self.root)
-
-    def __copy__(self):
-        """Returns a shallow copy of the tree."""
-        cls = self.__class__
-        result = cls.__new__(cls)
-        result.__dict__.update(self.__dict__)
-        return result
-
     def _init_tree(self, args):
         """Initialize the tree according to the arguments passed. """
-        self.root = EMPTY_AVL_NODE
+        self._entries = array(self.typecode, [0])
+        self._left = array('i', [0])
+        self._right = array('i', [0])
+        self._height = array('b', [0])
+        self._size = array('i', [0])
+        self._root = 0
+        self._free = 0
+
+        if args is None:
+            return
 
-        if args is not None:
-            if isinstance(args, self.__class__):
-                args = args.traverse('bfs')
+        try:
+            entries = list(args)
+            unique_sorted = AbstractBinarySearchTree._unique_sorted(entries, entries)
 
-            try:
-                for entry in args:
+            if unique_sorted is not None:
+                self._root = self._build_balanced(unique_sorted[0], 0, len(unique_sorted[0]))
+            else:
+                for entry in entries:
                     self.insert(entry)
-            except (ValueError, TypeError) as e:
-                raise TypeError('AVLTree constructor called with '
-                                f'incompatible data type: {e}')
+        except (ValueError, TypeError, OverflowError) as e:
+            raise TypeError(f'{self.__class__.__name__} constructor called with '
+                            f'incompatible data type: {e}')
+
+    def _build_balanced(self, entries, lo, hi):
+        """Builds a perfectly balanced subtree with entries[lo:hi] and returns its root."""
+        if lo == hi:
+            return 0
+
+        mid = (lo + hi) // 2
+        node = self._new_node(entries[mid])
+        self._left[node] = self._build_balanced(entries, lo, mid)
+        self._right[node] = self._build_balanced(entries, mid + 1, hi)
+        self._update(node)
+
+        return node
+
+    def _new_node(self, entry):
+        """Returns the index of a new leaf holding entry, reusing a freed slot if there is one."""
+        node = self._free
+        if node:
+            self._free = self._left[node]
+            self._entries[node] = entry
+            self._left[node] = 0
+            self._right[node] = 0
+            self._height[node] = 1
+            self._size[node] = 1
+            return node
+
+        self._entries.append(entry)
+        self._left.append(0)
+        self._right.append(0)
+        self._height.append(1)
+        self._size.append(1)
+        return len(self._entries) - 1
+
+    def _free_node(self, node):
+        """Pushes a detached node onto the free list."""
+        self._left[node] = self._free
+        self._free = node
+
+    def _rebalance_path(self, path, child):
+        """Links child under the last node of path and rebalances every node of path,
+        bottom up. path holds (node, went_right) pairs from the root down.
+        Returns the new root."""
+        left, right = self._left, self._right
+
+        for node, went_right in reversed(path):
+            if went_right:
+                right[node] = child
+            else:
+                left[node] = child
+            child = self._balance(node)
+
+        return child
+
+    def _update(self, node):
+        """Updates the height and the size of node from its children."""
+        left, right, height, size = self._left, self._right, self._height, self._size
+        left_node, right_node = left[node], right[node]
+        height[node] = 1 + max(height[left_node], height[right_node])
+        size[node] = 1 + size[left_node] + size[right_node]
+
+    def _balance_factor(self, node):
+        """Returns the balance factor of node."""
+        return self._height[self._left[node]] - self._height[self._right[node]]
+
+    def _balance(self, node):
+        """Updates node and performs the appropriate rotation if its subtree is unbalanced.
+        Returns the root of the balanced subtree."""
+        self._update(node)
+        balance_factor = self._balance_factor(node)
+
+        if balance_factor == 2:
+            if self._balance_factor(self._left[node]) == -1:
+                self._left[node] = self._rotate_left(self._left[node])
+            return self._rotate_right(node)
+        elif balance_factor == -2:
+            if self._balance_factor(self._right[node]) == 1:
+                self._right[node] = self._rotate_right(self._right[node])
+            return self._rotate_left(node)
+
+        return node
+
+    def _rotate_left(self, node):
+        """Performs a left rotation."""
+        right_node = self._right[node]
+        self._right[node] = self._left[right_node]
+        self._left[right_node] = node
 
-    def _inorder(self, root):
-        """Performs an in-order traversal. """
-        if root:
-            yield from self._inorder(root.left)
-            yield root.entry
-            yield from self._inorder(root.right)
+        self._update(node)
+        self._update(right_node)
 
-    def _preorder(self, root):
-        """Performs an pre-order traversal."""
-        if root:
-            yield root.entry
-            yield from self._preorder(root.left)
-            yield from self._preorder(root.right)
+        return right_node
 
-    def _postorder(self, root):
+    def _rotate_right(self, node):
+        """Performs a right rotation."""
+        left_node = self._left[node]
+        self._left[node] = self._right[left_node]
+        self._right[left_node] = node
+
+        self._update(node)
+        self._update(left_node)
+
+        return left_node
+
+    def _lower_bound(self, entry):
+        """Returns the node with the smallest entry that is not smaller than entry, or 0.
+        Only one comparison is made per level, equality is left to the caller."""
+        entries, left, right = self._entries, self._left, self._right
+        candidate = 0
+        node = self._root
+
+        while node:
+            if entries[node] < entry:
+                node = right[node]
+            else:
+                candidate = node
+                node = left[node]
+
+        return candidate
+
+    def _max_node(self, node):
+        """Returns the rightmost node of the subtree."""
+        right = self._right
+        while right[node]:
+            node = right[node]
+        return node
+
+    def _min_node(self, node):
+        """Returns the leftmost node of the subtree."""
+        left = self._left
+        while left[node]:
+            node = left[node]
+        return node
+
+    def _inorder(self):
+        """Performs an in-order traversal. """
+        entries, left, right = self._entries, self._left, self._right
+        stack = []
+        node = self._root
+
+        while stack or node:
+            while node:
+                stack.append(node)
+                node = left[node]
+            node = stack.pop()
+            yield entries[node]
+            node = right[node]
+
+    def _preorder(self):
+        """Performs an pre-order traversal."""
+        entries, left, right = self._entries, self._left, self._right
+        stack = [self._root] if self._root else []
+
+        while stack:
+            node = stack.pop()
+            yield entries[node]
+            if right[node]:
+                stack.append(right[node])
+            if left[node]:
+                stack.append(left[node])
+
+    def _postorder(self):
         """Performs an post-order traversal."""
-        if root:
-            yield from self._postorder(root.left)
-            yield from self._postorder(root.right)
-            yield root.entry
+        entries, left, right = self._entries, self._left, self._right
+        stack = []
+        node = self._root
+        last = 0
+
+        while stack or node:
+            while node:
+                stack.append(node)
+                node = left[node]
+
+            node = stack[-1]
+            if right[node] and right[node] != last:
+                node = right[node]
+            else:
+                last = stack.pop()
+                yield entries[last]
+                node = 0
 
     def _bfs(self):
         """Performs an Breadth first traversal."""
+        entries, left, right = self._entries, self._left, self._right
+        q = deque([self._root] if self._root else [])
+
+        while q:
+            node = q.popleft()
+            yield entries[node]
+            if left[node]:
+                q.append(left[node])
+            if right[node]:
+                q.append(right[node])
+
+
+class AVLTreeMap(MutableMapping):
+    """
+    AVLTreeMap is a sorted mapping backed by an AVL tree.
+    Each node holds a key and its value in separate slots, so only the keys are
+    compared while walking down the tree. Lookups, insertions and deletions take
+    O(log n) time, and the keys, values and items are iterated in key order.
+    AVLTreeMap expects comparable objects as keys.
+    AVLTreeMap() -> new empty map.
+    AVLTreeMap(mapping) -> new map initialized from a mapping
+    AVLTreeMap(seq) -> new map initialized from seq [(key1, value1), ... (keyN, valueN)]
+    """
+
+    def __init__(self, args=None):
+        """Initialize an AVL Tree Map. """
+        self._init_tree(args)
+
+    def __getitem__(self, key):
+        """T[k] -> the value stored for k, raises KeyError if k is not in T."""
+        return self._search(key).value
+
+    def __setitem__(self, key, value):
+        """T[k] = v -> stores v for k, replacing any previous value."""
+        self.root = self.root.insert(key, value)
+
+    def __delitem__(self, key):
+        """del T[k] -> removes k and its value from T."""
+        self.root = self.root.delete(key)
+
+    def __contains__(self, key):
+        """k in T -> True if T has a key k, else False"""
+        node = _lower_bound(self.root, key)
+        return node is not None and not key < node.key
+
+    def get(self, key, default=None):
+        """T.get(k[, d]) -> T[k] if k in T, else d. d defaults to None."""
+        node = _lower_bound(self.root, key)
+        if node is None or key < node.key:
+            return default
+        return node.value
+
+    def __iter__(self):
+        """iter(T) -> iterates over the keys of T in ascending order."""
+        return (node.key for node in _range_nodes(self.root, None, None, (True, True), False))
+
+    def __reversed__(self):
+        """reversed(T) -> iterates over the keys of T in descending order."""
+        return (node.key for node in _range_nodes(self.root, None, None, (True, True), True))
+
+    def __len__(self):
+        """T.__len__() <==> len(x). Retuns the number of keys in the map."""
+        return self.root.size
+
+    def __repr__(self):
+        """T.__repr__(...) <==> repr(x)."""
+        items = ', '.join(f'{key!r}: {value!r}' for key, value in self.items())
+        return f'{self.__class__.__name__}({{{items}}})'
+
+    def items(self):
+        """T.items() -> a view of the (key, value) pairs of T in key order."""
+        return _AVLTreeMapItemsView(self)
+
+    def values(self):
+        """T.values() -> a view of the values of T in key order."""
+        return _AVLTreeMapValuesView(self)
+
+    def clear(self):
+        """T.clear() -> Removes all keys of T leaving it empty."""
+        self.root = self.root.clear()
+
+    def copy(self):
+        """T.copy() -> a new map with the same keys and values, the tree nodes are not shared."""
+        tree = self.__class__()
+        tree.root = _copy_nodes(self.root)
+        return tree
+
+    __copy__ = copy
+
+    def __reduce__(self):
+        """Pickles the map as its items in key order, which are rebuilt balanced in O(n)."""
+        return self.__class__, (list(self.items()),)
+
+    def __deepcopy__(self, memo):
+        """Returns a copy of the map holding deep copies of its keys and values."""
+        tree = self.copy()
+        memo[id(self)] = tree
+        for node in _range_nodes(tree.root, None, None, (True, True), False):
+            node.entry = node.key = deepcopy(node.key, memo)
+            node.value = deepcopy(node.value, memo)
+        return tree
+
+    @property
+    def height(self):
+        """Returns the height of the tree. When the map is empty its height is zero."""
+        return self.root.height
+
+    def floor_item(self, key):
+        """T.floor_item(k) -> the (key, value) pair with the largest key <= k.
+        Raises KeyError if there is none."""
+        floor = None
         root = self.root
 
-        if root:
-            q = deque()
-            q.append(root)
+        while root:
+            if key < root.key:
+                root = root.left
+            else:
+                floor = root
+                root = root.right
+
+        if floor is None:
+            raise KeyError(f'Floor of {key} not found.')
+        return floor.key, floor.value
+
+    def ceiling_item(self, key):
+        """T.ceiling_item(k) -> the (key, value) pair with the smallest key >= k.
+        Raises KeyError if there is none."""
+        ceiling = _lower_bound(self.root, key)
+
+        if ceiling is None:
+            raise KeyError(f'Ceiling of {key} not found.')
+        return ceiling.key, ceiling.value
+
+    def pop_min(self):
+        """T.pop_min() -> removes and returns the (key, value) pair with the smallest key.
+        Raises KeyError if the map is empty."""
+        if not self.root:
+            raise KeyError('pop_min(): map is empty.')
+
+        node = self.root
+        while node.left:
+            node = node.left
+        item = node.key, node.value
+        self.root = self.root.delete(node.key)
+        return item
+
+    def pop_max(self):
+        """T.pop_max() -> removes and returns the (key, value) pair with the largest key.
+        Raises KeyError if the map is empty."""
+        if not self.root:
+            raise KeyError('pop_max(): map is empty.')
+
+        node = self.root
+        while node.right:
+            node = node.right
+        item = node.key, node.value
+        self.root = self.root.delete(node.key)
+        return item
+
+    popitem = pop_min
+
+    def irange(self, lo=None, hi=None, inclusive=(True, False), reverse=False):
+        """T.irange(lo, hi) -> iterates over the keys between lo and hi in sorted order.
+        The arguments have the same meaning as in AVLTree.irange."""
+        return (node.key for node in _range_nodes(self.root, lo, hi, inclusive, reverse))
+
+    def irange_items(self, lo=None, hi=None, inclusive=(True, False), reverse=False):
+        """T.irange_items(lo, hi) -> iterates over the (key, value) pairs whose keys are
+        between lo and hi in sorted order."""
+        return ((node.key, node.value) for node in _range_nodes(self.root, lo, hi, inclusive, reverse))
+
+    def _search(self, key):
+        """Returns the node holding key, else raise KeyError"""
+        node = _lower_bound(self.root, key)
+        if node is None or key < node.key:
+            raise KeyError(key)
+        return node
+
+    def _init_tree(self, args):
+        """Initialize the map according to the arguments passed. """
+        self.root = EMPTY_AVL_MAP_NODE
+
+        if args is None:
+            return
 
-            while q:
-                root = q.popleft()
-                if not root:
+        if isinstance(args, self.__class__):
+            self.root = _copy_nodes(args.root)
+            return
+
+        try:
+            items = list(args.items() if isinstance(args, Mapping) else args)
+            unique_items = self._unique_sorted_items(items)
+
+            if unique_items is not None:
+                self.root = self._build_balanced(iter(unique_items), len(unique_items))
+            else:
+                for key, value in items:
+                    self[key] = value
+        except (ValueError, TypeError) as e:
+            raise TypeError(f'{self.__class__.__name__} constructor called with '
+                            f'incompatible data type: {e}')
+
+    @staticmethod
+    def _unique_sorted_items(items):
+        """Returns items keeping the last value of each key if the keys are in ascending
+        order, else None."""
+        unique_items = []
+        for key, value in items:
+            if unique_items:
+                prev_key = unique_items[-1][0]
+                if key < prev_key:
+                    return None
+                if not prev_key < key:
+                    unique_items[-1] = (key, value)
                     continue
+            unique_items.append((key, value))
 
-                yield root.entry
-                left = root.left
-                right = root.right
+        return unique_items
+
+    def _build_balanced(self, items, count):
+        """Builds a perfectly balanced subtree with the next count items of the iterator items."""
+        if not count:
+            return EMPTY_AVL_MAP_NODE
+
+        left_count = count // 2
+        left = self._build_balanced(items, left_count)
+
+        key, value = next(items)
+        node = _AVLMapNode(key, value)
+        node.left = left
+        node.right = self._build_balanced(items, count - left_count - 1)
+        node._update_height()
+
+        return node
+
+
+class _AVLTreeMapItemsView(ItemsView):
+    """Internal object, the items view of an AVLTreeMap, iterated without extra lookups."""
+
+    def __iter__(self):
+        return ((node.key, node.value) for node in
+                _range_nodes(self._mapping.root, None, None, (True, True), False))
+
+    def __reversed__(self):
+        return ((node.key, node.value) for node in
+                _range_nodes(self._mapping.root, None, None, (True, True), True))
+
+
+class _AVLTreeMapValuesView(ValuesView):
+    """Internal object, the values view of an AVLTreeMap, iterated without extra lookups."""
+
+    def __iter__(self):
+        return (node.value for node in _range_nodes(self._mapping.root, None, None, (True, True), False))
 
-                q.append(left)
-                q.append(right)
+    def __reversed__(self):
+        return (node.value for node in _range_nodes(self._mapping.root, None, None, (True, True), True))
@@ -21,10 +21,13 @@ OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
 WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 """
 import functools
+import math
 
 import pytest
 
-from pybstree import BinarySearchTree, AVLTree
+from pybstree import (BinarySearchTree, AVLTree, ArrayAVLTree, AVLTreeMap, PersistentAVLTree, ConcurrentAVLTree,
+                      BinarySearchTreeMultiset, AVLTreeMultiset, AugmentedAVLTree, Monoid, IntervalTree, RBTree,
+                      Treap)
 
 
 @functools.total_ordering
@@ -182,6 +185,62 @@ class TestBinarySearchTree:
 
         assert tuple(tree.traverse('bfs')) == (5, 3, 8, 1, 9, 2)
 
+    def test_from_sorted(self, tree):
+        import math
+        entries = list(range(1000))
+        tree = tree.from_sorted(entries)
+
+        assert list(tree.traverse()) == entries
+        assert len(tree) == len(entries)
+        assert tree.height == math.ceil(math.log2(len(entries) + 1))
+
+        def assert_balanced(node):
+            if not node:
+                return 0
+            left, right = assert_balanced(node.left), assert_balanced(node.right)
+            assert abs(left - right) <= 1
+            assert node.height == 1 + max(left, right)
+            assert node.size == 1 + node.left.size + node.right.size
+            return node.height
+
+        assert_balanced(tree.root)
+
+    def test_from_sorted_skips_duplicates(self, tree):
+        tree = tree.from_sorted([1, 1, 2, 3, 3, 3, 4])
+
+        assert list(tree.traverse()) == [1, 2, 3, 4]
+        assert len(tree) == 4
+
+    def test_from_sorted_requires_ascending_order(self, tree):
+        with pytest.raises(ValueError) as context:
+            tree.from_sorted([1, 3, 2])
+        assert f"{tree.__class__.__name__}.from_sorted expects entries in ascending order." in str(context.value)
+
+        assert not tree.from_sorted([])
+
+    def test_initialize_tree_from_sorted_sequence(self, make_tree_from_entries):
+        tree = make_tree_from_entries(range(1, 8))
+
+        assert tuple(tree.traverse('bfs')) == (4, 2, 6, 1, 3, 5, 7)
+        assert tree.height == 3
+
+    def test_build_tree_from_other_copies_the_nodes(self, make_tree_from_entries):
+        original = make_tree_from_entries([5, 3, 8, 9, 1, 2])
+        copy = make_tree_from_entries(original)
+
+        assert copy == original
+        assert tuple(copy.traverse('bfs')) == tuple(original.traverse('bfs'))
+
+        copy.delete(5)
+        assert 5 in original
+        assert len(original) == 6
+
+    def test_iter(self, make_tree_from_entries):
+        entries = get_random_entries()
+        tree = make_tree_from_entries(entries)
+
+        assert list(tree) == sorted(entries)
+
     def test_find_max(self, make_tree_from_entries):
         entries = get_random_entries()
         tree = make_tree_from_entries(entries)
@@ -192,9 +251,14 @@ class TestBinarySearchTree:
         tree = make_tree_from_entries(entries)
         assert tree.min() == min(entries)
 
+    def test_repr(self, make_tree_from_entries):
+        tree = make_tree_from_entries([2, 1, 4, 3, 5])
+        assert repr(tree) == f'{type(tree).__name__}({list(tree.traverse("bfs"))})'
+
     @pytest.mark.parametrize("entries,expected", [
         ([2, 1, 4, 3, 5], '(2 (1 () ()) (4 (3 () ()) (5 () ())))'),
-        ([1, 2, 3, 4, 5], '(1 () (2 () (3 () (4 () (5 () ())))))'),
+        ([1, 2, 3, 4, 5], '(3 (2 (1 () ()) ()) (5 (4 () ()) ()))'),
+        ([1, 5, 2, 4, 3], '(1 () (5 (2 () (4 (3 () ()) ())) ()))'),
         ([], '()')
     ])
     def test_str(self, entries, expected, make_tree_from_entries):
@@ -294,6 +358,21 @@ class TestBinarySearchTree:
 
         assert 4 == entry
 
+    def test_get(self, make_tree_from_entries):
+        tree = make_tree_from_entries([Entry(1, 'a'), Entry(4, 'b'), Entry(3, 'c')])
+
+        assert tree.get(Entry(4, 'b')) == Entry(4, 'b')
+        assert tree.get(Entry(2, 'z')) is None
+        assert tree.get(Entry(2, 'z'), 'x') == 'x'
+        assert make_tree_from_entries([]).get(1, 'x') == 'x'
+
+    def test_contains_with_key(self, tree):
+        tree = tree.__class__(['banana', 'Cherry'], key=str.lower)
+
+        assert 'CHERRY' in tree
+        assert 'apple' not in tree
+        assert tree.get('BANANA') == 'banana'
+
     def test_search_complex_data_type(self, make_tree_from_entries):
         tree = make_tree_from_entries([Entry(1, 'a'),
                                        Entry(4, 'b'),
@@ -327,6 +406,31 @@ class TestBinarySearchTree:
         single_entry.b = 'a'
         assert tree1 == tree2
 
+    def test_copy_does_not_share_nodes(self, make_tree_from_entries):
+        import copy
+        tree = make_tree_from_entries([5, 3, 8, 1])
+
+        for other in (tree.copy(), copy.copy(tree)):
+            other.insert(4)
+            other.delete(8)
+
+            assert list(tree) == [1, 3, 5, 8]
+            assert list(other) == [1, 3, 4, 5]
+            assert type(other) is type(tree)
+
+    def test_deepcopy(self, tree):
+        import copy
+        entries = [[3, 'c'], [1, 'a'], [2, 'b']]
+        tree = tree.__class__(entries, key=lambda entry: entry[0])
+
+        other = copy.deepcopy(tree)
+        entries[0].append('changed')
+
+        assert list(other) == [[1, 'a'], [2, 'b'], [3, 'c']]
+        assert other.search([3]) == [3, 'c']
+        assert other.search([3]) is not tree.search([3])
+        assert other.key is tree.key
+
     def test_length(self, tree):
         entries = sorted(list(range(150)))
         for entry in entries:
@@ -336,6 +440,532 @@ class TestBinarySearchTree:
 
         assert len(BinarySearchTree()) == 0
 
+    def test_subtree_sizes(self, make_tree_from_entries):
+        entries = get_random_entries()
+        tree = make_tree_from_entries(entries)
+
+        def assert_sizes(node):
+            if not node:
+                return 0
+            size = 1 + assert_sizes(node.left) + assert_sizes(node.right)
+            assert node.size == size
+            return size
+
+        assert_sizes(tree.root)
+        for entry in entries[::2]:
+            tree.delete(entry)
+            assert_sizes(tree.root)
+
+        assert len(tree) == len(entries) - len(entries[::2])
+
+    def test_rank(self, make_tree_from_entries):
+        entries = get_random_entries()
+        tree = make_tree_from_entries(entries)
+
+        for rank, entry in enumerate(sorted(entries)):
+            assert tree.rank(entry) == rank
+        assert tree.rank(min(entries) - 1) == 0
+        assert tree.rank(max(entries) + 1) == len(entries)
+        assert make_tree_from_entries([]).rank(10) == 0
+
+    def test_rank_of_missing_entry(self, make_tree_from_entries):
+        tree = make_tree_from_entries([10, 20, 30, 40])
+
+        assert tree.rank(25) == 2
+        assert tree.rank(5) == 0
+        assert tree.rank(45) == 4
+
+    def test_select(self, make_tree_from_entries):
+        entries = get_random_entries()
+        tree = make_tree_from_entries(entries)
+
+        for index, entry in enumerate(sorted(entries)):
+            assert tree.select(index) == entry
+
+        with pytest.raises(IndexError) as context:
+            tree.select(len(entries))
+        assert f"Index {len(entries)} out of range." in str(context.value)
+
+        with pytest.raises(IndexError):
+            tree.select(-1)
+
+    def test_getitem(self, make_tree_from_entries):
+        entries = [5, 3, 8, 9, 1, 2]
+        tree = make_tree_from_entries(entries)
+
+        assert tree[0] == 1
+        assert tree[3] == 5
+        assert tree[-1] == 9
+        assert tree[-6] == 1
+
+        with pytest.raises(IndexError):
+            tree[6]
+        with pytest.raises(IndexError):
+            tree[-7]
+        with pytest.raises(TypeError):
+            tree[1.5]
+        with pytest.raises(TypeError):
+            tree['1']
+
+    @pytest.mark.parametrize("index", [
+        slice(None),
+        slice(2, 5),
+        slice(-3, None),
+        slice(1, 100),
+        slice(5, 2),
+        slice(None, None, 2),
+        slice(1, -1, 3),
+        slice(None, None, -1),
+        slice(6, 1, -2),
+        slice(-2, None, -4),
+    ])
+    def test_slice(self, index, make_tree_from_entries):
+        entries = [5, 3, 8, 9, 1, 2, 7, 4]
+        tree = make_tree_from_entries(entries)
+
+        items = tree[index]
+
+        assert not isinstance(items, list)
+        assert list(items) == sorted(entries)[index]
+
+    @pytest.mark.parametrize("lo,hi,inclusive,expected", [
+        (3, 8, (True, False), [3, 4, 5, 7]),
+        (3, 8, (True, True), [3, 4, 5, 7, 8]),
+        (3, 8, (False, False), [4, 5, 7]),
+        (3, 8, (False, True), [4, 5, 7, 8]),
+        (6, 7, (True, False), []),
+        (6, 6, (True, True), []),
+        (None, 4, (True, False), [1, 2, 3]),
+        (7, None, (True, False), [7, 8, 9]),
+        (None, None, (True, False), [1, 2, 3, 4, 5, 7, 8, 9]),
+        (0, 100, (True, False), [1, 2, 3, 4, 5, 7, 8, 9]),
+        (9, 3, (True, True), []),
+    ])
+    def test_irange(self, lo, hi, inclusive, expected, make_tree_from_entries):
+        tree = make_tree_from_entries([5, 3, 8, 9, 1, 2, 7, 4])
+
+        assert list(tree.irange(lo, hi, inclusive)) == expected
+        assert list(tree.irange(lo, hi, inclusive, reverse=True)) == expected[::-1]
+
+    def test_irange_random_entries(self, make_tree_from_entries):
+        entries = get_random_entries()
+        tree = make_tree_from_entries(entries)
+        lo, hi = sorted(entries)[len(entries) // 4], sorted(entries)[len(entries) // 2]
+
+        assert list(tree.irange(lo, hi)) == [e for e in sorted(entries) if lo <= e < hi]
+        assert list(tree.irange()) == list(tree.traverse())
+        assert list(make_tree_from_entries([]).irange(1, 10)) == []
+
+    def test_pickle_keeps_entries_and_shape(self, make_tree_from_entries):
+        import pickle
+        import random
+        random.seed(2718)
+        entries = get_random_entries()
+        tree = make_tree_from_entries(entries)
+
+        other = pickle.loads(pickle.dumps(tree))
+
+        assert type(other) is type(tree)
+        assert other == tree
+        assert other.height == tree.height
+        assert_sizes_and_heights(other.root)
+        assert not pickle.loads(pickle.dumps(make_tree_from_entries([])))
+
+    def test_pickle_deep_tree(self, tree):
+        import pickle
+        import sys
+        for entry in range(sys.getrecursionlimit() + 500):
+            tree.insert(entry)
+
+        other = pickle.loads(pickle.dumps(tree))
+
+        assert other == tree
+        assert other.height == tree.height
+
+    def test_pickle_with_key(self, tree):
+        import pickle
+        tree = tree.__class__(['banana', 'Cherry', 'apple'], key=str.lower)
+
+        other = pickle.loads(pickle.dumps(tree))
+
+        assert list(other) == ['apple', 'banana', 'Cherry']
+        assert 'CHERRY' in other
+        assert other.key is str.lower
+
+    @pytest.mark.parametrize("keep_shape", [True, False])
+    def test_save_and_load(self, keep_shape, make_tree_from_entries, tmp_path, monkeypatch):
+        import pybstree
+        monkeypatch.setattr(pybstree, '_SAVE_CHUNK_SIZE', 7)
+        entries = get_random_entries()
+        tree = make_tree_from_entries(entries)
+        path = tmp_path / 'tree.bin'
+
+        tree.save(path, keep_shape=keep_shape)
+        other = tree.load(path)
+
+        assert type(other) is type(tree)
+        assert list(other) == sorted(entries)
+        assert (other == tree) if keep_shape else other.height == math.ceil(math.log2(len(entries) + 1))
+        assert_sizes_and_heights(other.root)
+
+        tree.__class__().save(path)
+        assert not tree.load(path)
+
+    def test_load_rejects_other_files(self, tree, tmp_path):
+        import pickle
+        path = tmp_path / 'other.bin'
+        path.write_bytes(pickle.dumps({'entries': [1, 2]}))
+
+        with pytest.raises(ValueError) as context:
+            tree.load(path)
+        assert "was not written by" in str(context.value)
+
+    def test_load_rejects_files_of_other_classes(self, make_tree_from_entries, tmp_path):
+        tree = make_tree_from_entries([3, 1, 2])
+        path = tmp_path / 'tree.bin'
+        tree.save(path)
+
+        for other in (BinarySearchTree, AVLTree, RBTree, Treap, PersistentAVLTree):
+            if other is not type(tree):
+                with pytest.raises(ValueError) as context:
+                    other.load(path)
+                message = f"was written by {type(tree).__name__}.save, not by {other.__name__}.save."
+                assert message in str(context.value)
+
+    def test_load_leaves_the_collector_as_it_was(self, make_tree_from_entries):
+        import gc
+        import pickle
+        data = pickle.dumps(make_tree_from_entries(range(100)))
+
+        enabled = gc.isenabled()
+        try:
+            gc.disable()
+            pickle.loads(data)
+            assert not gc.isenabled()
+
+            gc.enable()
+            pickle.loads(data)
+            assert gc.isenabled()
+        finally:
+            (gc.enable if enabled else gc.disable)()
+
+    def test_sorted_entries_do_not_exhaust_the_stack(self, tree):
+        import sys
+        entries = range(sys.getrecursionlimit() + 500)
+
+        for entry in entries:
+            tree.insert(entry)
+        assert len(tree) == len(entries)
+        assert tree.pred(entries[-1]) == entries[-2]
+        assert tree.succ(entries[0]) == entries[1]
+
+        for order in ('preorder', 'inorder', 'postorder', 'bfs'):
+            assert sorted(tree.traverse(order)) == list(entries)
+        assert tree == tree.__class__(tree)
+
+        for entry in entries[::2]:
+            tree.delete(entry)
+        assert len(tree) == len(entries) // 2
+        assert entries[-1] in tree
+        assert entries[-2] not in tree
+
+        tree.clear()
+        assert not tree
+
+    def test_key_function(self, tree):
+        tree = tree.__class__(['banana', 'Cherry', 'apple', 'date'], key=str.lower)
+
+        assert list(tree.traverse()) == ['apple', 'banana', 'Cherry', 'date']
+        assert 'CHERRY' in tree
+        assert tree.search('cherry') == 'Cherry'
+        assert tree.pred('Cherry') == 'banana'
+        assert tree.succ('CHERRY') == 'date'
+        assert tree.rank('cherry') == 2
+        assert list(tree.irange('b', 'D')) == ['banana', 'Cherry']
+
+        tree.insert('APPLE')
+        assert len(tree) == 4
+
+        tree.delete('BANANA')
+        assert list(tree.traverse()) == ['apple', 'Cherry', 'date']
+
+    def test_key_is_computed_once_per_entry(self, tree):
+        calls = []
+
+        def key(entry):
+            calls.append(entry)
+            return entry.a
+
+        entries = [Entry(a, str(a)) for a in get_random_entries()]
+        tree = tree.__class__(entries, key=key)
+        assert len(calls) == len(entries)
+
+        del calls[:]
+        for entry in entries:
+            tree.search(entry)
+        assert len(calls) == len(entries)
+
+        for batch in (entries[:3], entries):
+            del calls[:]
+            tree.delete_many(batch)
+            assert len(calls) == len(batch)
+
+            del calls[:]
+            tree.insert_many(batch)
+            assert len(calls) == len(batch)
+
+    def test_key_function_with_sorted_entries(self, tree):
+        entries = [Entry(a, 'x') for a in range(100)]
+        tree = tree.from_sorted(entries, key=lambda entry: entry.a)
+
+        assert tree.height == 7
+        assert tree.key is not None
+        assert list(tree.traverse()) == entries
+
+        with pytest.raises(ValueError):
+            tree.from_sorted(entries[::-1], key=lambda entry: entry.a)
+
+    def test_build_tree_from_other_with_another_key(self, make_tree_from_entries):
+        original = make_tree_from_entries([3, 1, 2])
+        tree = original.__class__(original, key=lambda entry: -entry)
+
+        assert list(tree.traverse()) == [3, 2, 1]
+
+    def test_one_comparison_per_level(self, make_tree_from_entries):
+        comparisons = []
+
+        @functools.total_ordering
+        class Key:
+            def __init__(self, value):
+                self.value = value
+
+            def __lt__(self, other):
+                comparisons.append(self)
+                return self.value < other.value
+
+            def __eq__(self, other):
+                comparisons.append(self)
+                return self.value == other.value
+
+        entries = get_random_entries()
+        tree = make_tree_from_entries([Key(entry) for entry in entries])
+
+        for entry in entries + [-1, 1000]:
+            del comparisons[:]
+            Key(entry) in tree
+            assert len(comparisons) <= tree.height + 1
+
+            del comparisons[:]
+            tree.insert(Key(entry))
+            assert len(comparisons) <= tree.height + 1
+
+    def test_cursor_walks_forward_and_backward(self, make_tree_from_entries):
+        entries = get_random_entries()
+        tree = make_tree_from_entries(entries)
+        ordered = sorted(entries)
+
+        cursor = tree.find_cursor(ordered[0])
+        walked = [cursor.entry]
+        while cursor.next():
+            walked.append(cursor.entry)
+        assert walked == ordered
+        assert not cursor.valid
+
+        cursor = tree.find_cursor(ordered[-1])
+        walked = [cursor.entry]
+        while cursor.prev():
+            walked.append(cursor.entry)
+        assert walked == ordered[::-1]
+
+    def test_cursor_steps_around_an_entry(self, make_tree_from_entries):
+        tree = make_tree_from_entries([50, 20, 80, 10, 30, 70, 90, 60])
+
+        cursor = tree.find_cursor(60)
+        assert cursor.valid
+        assert cursor.prev() and cursor.entry == 50
+        assert cursor.next() and cursor.entry == 60
+        assert cursor.next() and cursor.entry == 70
+        assert cursor.next() and cursor.entry == 80
+        assert repr(cursor) == 'TreeCursor(80)'
+
+    def test_find_cursor_of_missing_entry(self, make_tree_from_entries):
+        cursor = make_tree_from_entries([1, 3, 5]).find_cursor(4)
+
+        assert not cursor.valid
+        assert not cursor.next()
+        assert not cursor.prev()
+        with pytest.raises(IndexError) as context:
+            cursor.entry
+        assert "Cursor is not positioned on an entry." in str(context.value)
+
+    @pytest.mark.parametrize("entry,expected", [
+        (0, 1), (1, 1), (2, 3), (5, 5), (6, None),
+    ])
+    def test_lower_bound_cursor(self, entry, expected, make_tree_from_entries):
+        cursor = make_tree_from_entries([3, 1, 5]).lower_bound_cursor(entry)
+
+        if expected is None:
+            assert not cursor.valid
+        else:
+            assert cursor.entry == expected
+
+    def test_cursor_detects_modification(self, make_tree_from_entries):
+        tree = make_tree_from_entries([1, 2, 3])
+        cursor = tree.find_cursor(2)
+
+        tree.insert(4)
+        with pytest.raises(RuntimeError) as context:
+            cursor.next()
+        assert "Tree changed since the cursor was created." in str(context.value)
+
+        cursor = tree.find_cursor(2)
+        tree.delete(4)
+        with pytest.raises(RuntimeError):
+            cursor.entry
+
+    @pytest.mark.parametrize("entry,floor,ceiling,lower,higher", [
+        (0, None, 10, None, 10),
+        (10, 10, 10, None, 20),
+        (15, 10, 20, 10, 20),
+        (20, 20, 20, 10, 30),
+        (35, 30, 40, 30, 40),
+        (40, 40, 40, 30, None),
+        (45, 40, None, 40, None),
+    ])
+    def test_floor_ceiling_lower_higher(self, entry, floor, ceiling, lower, higher, make_tree_from_entries):
+        tree = make_tree_from_entries([30, 10, 40, 20])
+
+        assert tree.floor(entry) == floor
+        assert tree.ceiling(entry) == ceiling
+        assert tree.lower(entry) == lower
+        assert tree.higher(entry) == higher
+
+    def test_floor_ceiling_lower_higher_default(self, make_tree_from_entries):
+        tree = make_tree_from_entries([5])
+
+        assert tree.floor(1, default='x') == 'x'
+        assert tree.ceiling(9, default='x') == 'x'
+        assert tree.lower(5, default='x') == 'x'
+        assert tree.higher(5, default='x') == 'x'
+        assert make_tree_from_entries([]).floor(1, default=-1) == -1
+
+    def test_floor_ceiling_on_random_entries(self, make_tree_from_entries):
+        import bisect
+        entries = sorted(get_random_entries())[::3]
+        tree = make_tree_from_entries(entries)
+
+        for entry in range(entries[0] - 2, entries[-1] + 3):
+            i = bisect.bisect_right(entries, entry)
+            assert tree.floor(entry) == (entries[i - 1] if i else None)
+            i = bisect.bisect_left(entries, entry)
+            assert tree.ceiling(entry) == (entries[i] if i < len(entries) else None)
+
+    @pytest.mark.parametrize("queries", [
+        [7, 3, 100, 3, -1, 40],
+        list(range(-5, 60)),
+    ], ids=['sparse', 'dense'])
+    def test_search_many_and_contains_many(self, queries, make_tree_from_entries):
+        entries = list(range(0, 50, 3))
+        tree = make_tree_from_entries(entries)
+
+        assert tree.contains_many(queries) == [query in entries for query in queries]
+        assert tree.search_many(queries) == [query if query in entries else None for query in queries]
+        assert tree.search_many(queries, default='x') == [query if query in entries else 'x' for query in queries]
+
+    def test_contains_many_on_random_entries(self, make_tree_from_entries):
+        import random
+        random.seed(5021)
+        entries = get_random_entries()
+        tree = make_tree_from_entries(entries)
+
+        for size in (10, len(entries) * 2):
+            queries = [random.randint(-1000, 1000) for _ in range(size)]
+            assert tree.contains_many(queries) == [query in tree for query in queries]
+
+    def test_search_many_with_key(self, tree):
+        tree = tree.__class__(['banana', 'Cherry', 'apple'], key=str.lower)
+
+        assert tree.search_many(['CHERRY', 'kiwi', 'Apple']) == ['Cherry', None, 'apple']
+        assert tree.contains_many(iter(['kiwi', 'BANANA'])) == [False, True]
+
+    def test_contains_many_on_empty_tree(self, tree):
+        assert tree.contains_many([1, 2]) == [False, False]
+        assert tree.search_many([]) == []
+
+    def test_contains_many_numpy_mask(self, make_tree_from_entries):
+        np = pytest.importorskip('numpy')
+        tree = make_tree_from_entries([1, 4, 9])
+
+        mask = tree.contains_many(np.array([[9, 2], [1, 5]]))
+
+        assert mask.dtype == bool
+        assert mask.tolist() == [[True, False], [True, False]]
+
+    @pytest.mark.parametrize("initial,batch", [
+        (list(range(0, 200, 2)), [7, 3, 4, 7, 301]),
+        ([10, 4, 12], [5, 1, 12, 30, 5, 8, 4, -2]),
+        ([], [3, 1, 2, 1]),
+    ], ids=['per-entry', 'rebuild', 'empty'])
+    def test_insert_many(self, initial, batch, make_tree_from_entries):
+        tree = make_tree_from_entries(initial)
+        cursor = tree.find_cursor(min(initial, default=0))
+
+        tree.insert_many(iter(batch))
+
+        assert list(tree) == sorted(set(initial) | set(batch))
+        assert len(tree) == len(set(initial) | set(batch))
+        with pytest.raises(RuntimeError):
+            cursor.next()
+
+    def test_insert_many_keeps_existing_entries(self, tree):
+        tree = tree.__class__(['Apple'], key=str.lower)
+
+        tree.insert_many(['apple', 'Kiwi', 'KIWI', 'banana'])
+
+        assert list(tree) == ['Apple', 'banana', 'Kiwi']
+
+    @pytest.mark.parametrize("initial,batch", [
+        (list(range(0, 200, 2)), [8, 4, 8, 198]),
+        ([10, 4, 12, 7, 1], [12, 1, 4, 7]),
+        ([3], [3]),
+    ], ids=['per-entry', 'rebuild', 'all'])
+    def test_delete_many(self, initial, batch, make_tree_from_entries):
+        tree = make_tree_from_entries(initial)
+
+        tree.delete_many(batch)
+
+        assert list(tree) == sorted(set(initial) - set(batch))
+        assert len(tree) == len(set(initial) - set(batch))
+
+    @pytest.mark.parametrize("initial", [list(range(0, 200, 2)), [10, 4, 12]])
+    def test_delete_many_not_existent_entry(self, initial, make_tree_from_entries):
+        tree = make_tree_from_entries(initial)
+
+        with pytest.raises(KeyError) as context:
+            tree.delete_many([4, 5, 10])
+        assert "Entry 5 not found." in str(context.value)
+        assert list(tree) == sorted(initial)
+
+    def test_insert_many_and_delete_many_on_random_entries(self, make_tree_from_entries):
+        import random
+        random.seed(3303)
+        entries = get_random_entries()
+        tree = make_tree_from_entries(entries[:20])
+
+        tree.insert_many(entries)
+        tree.delete_many(entries[::2])
+        tree.insert(max(entries) + 1)
+
+        assert list(tree) == sorted(set(entries) - set(entries[::2]) | {max(entries) + 1})
+
+    def test_quantile(self, make_tree_from_entries):
+        tree = make_tree_from_entries([40, 10, 30, 20])
+
+        assert [tree.quantile(q) for q in (0, 0.25, 0.26, 0.5, 0.75, 1)] == [10, 10, 20, 20, 30, 40]
+        with pytest.raises(ValueError) as context:
+            tree.quantile(1.5)
+        assert "Quantile 1.5 is not between 0 and 1." in str(context.value)
+
     def test_pred(self):
         import random
         random.seed(7477)
@@ -383,6 +1013,33 @@ def assert_entry_error(entries, entry_to_be_deleted):
         assert f"entryError: {entry_to_be_deleted}" in str(context.value)
 
 
+def assert_sizes_and_heights(node):
+    if not node:
+        return 0
+    height = 1 + max(assert_sizes_and_heights(node.left), assert_sizes_and_heights(node.right))
+    assert node.height == height
+    assert node.size == 1 + node.left.size + node.right.size
+    return height
+
+
+def assert_totals(node):
+    if not node:
+        return 0
+    total = node.count + assert_totals(node.left) + assert_totals(node.right)
+    assert node.total == total
+    return total
+
+
+def assert_avl_invariants(node):
+    if not node:
+        return 0
+    left, right = assert_avl_invariants(node.left), assert_avl_invariants(node.right)
+    assert abs(left - right) <= 1
+    assert node.height == 1 + max(left, right)
+    assert node.size == 1 + node.left.size + node.right.size
+    return node.height
+
+
 class TestAVLTree(TestBinarySearchTree):
     @pytest.fixture
     def tree(self):
@@ -781,9 +1438,19 @@ class TestAVLTree(TestBinarySearchTree):
         assert tuple(tree.traverse('bfs')) == ()
         assert not tree
 
+    def test_insert_after_deleting_a_leaf(self, make_tree_from_entries):
+        tree = make_tree_from_entries([2, 1, 3])
+        tree.delete(1)
+
+        for entry in range(0, -10, -1):
+            tree.insert(entry)
+
+        assert list(tree.traverse()) == list(range(-9, 1)) + [2, 3]
+        assert tree.height == 4
+
     def test_repr(self, make_tree_from_entries):
         tree = make_tree_from_entries([1, 2, 3, 4, 5])
-        assert repr(tree) == 'AVLTree([2, 1, 4, 3, 5])'
+        assert repr(tree) == 'AVLTree([3, 2, 5, 1, 4])'
 
     @pytest.mark.parametrize("entries,expected", [
         ([2, 1, 4, 3, 5], 'AVLTree([2, 1, 4, 3, 5])'),
@@ -795,7 +1462,7 @@ class TestAVLTree(TestBinarySearchTree):
 
     def test_equals(self):
         tree1 = AVLTree([1, 2, 3, 4, 5])
-        tree2 = AVLTree([2, 1, 4, 3, 5])
+        tree2 = AVLTree([3, 2, 5, 1, 4])
         tree3 = AVLTree([1, 2, 3, 4, 5, 6])
 
         assert tree1 == tree2
@@ -811,7 +1478,7 @@ class TestAVLTree(TestBinarySearchTree):
         original = AVLTree([1, 2, 3, 4, 5])
         copy = AVLTree(original)
 
-        assert copy == AVLTree([2, 1, 4, 3, 5])
+        assert copy == AVLTree([3, 2, 5, 1, 4])
 
     def test_copy(self):
         import copy
@@ -864,6 +1531,1313 @@ class TestAVLTree(TestBinarySearchTree):
             tree.succ(1000000)
         assert "Successor of 1000000 not found." in str(context.value)
 
+    @pytest.mark.parametrize("entry,found", [(-1, None), (50, 50), (51, None), (300, None)])
+    def test_split(self, entry, found):
+        tree = AVLTree(range(0, 200, 2))
+
+        lesser, middle, greater = tree.split(entry)
+
+        assert middle == found
+        assert list(lesser) == [e for e in range(0, 200, 2) if e < entry]
+        assert list(greater) == [e for e in range(0, 200, 2) if e > entry]
+        assert not tree
+        assert_avl_invariants(lesser.root)
+        assert_avl_invariants(greater.root)
+
+    @pytest.mark.parametrize("left,right", [(range(10), range(11, 1000)), (range(1000), range(1001, 1003)),
+                                            ([], range(11, 20)), (range(10), [])])
+    def test_join(self, left, right):
+        left, right = AVLTree(left), AVLTree(right)
+        expected = list(left) + [10 if not right else min(right) - 1] + list(right)
+
+        tree = AVLTree.join(left, expected[len(left)], right)
+
+        assert list(tree) == expected
+        assert not left and not right
+        assert_avl_invariants(tree.root)
+
+    def test_join_without_entry(self):
+        tree = AVLTree.join(AVLTree(range(100)), None, AVLTree(range(100, 103)))
+
+        assert list(tree) == list(range(103))
+        assert_avl_invariants(tree.root)
+
+    def test_split_then_join_with_key(self):
+        tree = AVLTree(range(100), key=lambda entry: -entry)
+
+        lesser, middle, greater = tree.split(40)
+        assert list(lesser) == list(range(99, 40, -1))
+        tree = AVLTree.join(lesser, middle, greater)
+
+        assert list(tree) == list(range(99, -1, -1))
+        assert_avl_invariants(tree.root)
+
+    def test_join_requires_ascending_order(self):
+        with pytest.raises(ValueError) as context:
+            AVLTree.join(AVLTree([1, 5]), 3, AVLTree([7]))
+        assert "AVLTree.join expects left < entry < right." in str(context.value)
+
+        with pytest.raises(ValueError):
+            AVLTree.join(AVLTree([1, 5]), None, AVLTree([5, 7]))
+        with pytest.raises(ValueError):
+            AVLTree.join(AVLTree([1]), None, AVLTree([5], key=lambda entry: entry))
+
+    def test_join_rejects_other_trees(self):
+        with pytest.raises(TypeError) as context:
+            AVLTree.join(RBTree(range(10)), 100, RBTree(range(200, 260)))
+        assert "AVLTree.join expects two AVLTree instances, got RBTree and RBTree." in str(context.value)
+
+        with pytest.raises(TypeError):
+            AVLTree.join(BinarySearchTree([1, 2]), 3, BinarySearchTree([4]))
+        with pytest.raises(TypeError):
+            AugmentedAVLTree.join(AVLTree([1]), 2, AVLTree([3]))
+
+    @pytest.mark.parametrize("a,b", [
+        (range(0, 300, 2), range(0, 300, 3)),
+        (range(1000), [5, 500, 2000]),
+        ([5, 500, 2000], range(1000)),
+        ([], range(10)),
+        (range(10), []),
+    ])
+    def test_set_operators(self, a, b):
+        tree_a, tree_b = AVLTree(a), AVLTree(b)
+
+        for operator, expected in (('__or__', set(a) | set(b)), ('__and__', set(a) & set(b)),
+                                   ('__sub__', set(a) - set(b)), ('__xor__', set(a) ^ set(b))):
+            result = getattr(tree_a, operator)(tree_b)
+            assert list(result) == sorted(expected)
+            assert len(result) == len(expected)
+            assert_avl_invariants(result.root)
+
+        assert list(tree_a) == sorted(a) and list(tree_b) == sorted(b)
+
+    def test_in_place_set_operators(self):
+        import random
+        random.seed(9191)
+        entries = get_random_entries()
+        tree, expected = AVLTree(entries[:150]), set(entries[:150])
+        cursor = tree.find_cursor(entries[0])
+
+        for other in (entries[100:300], entries[::3], entries[50:120], entries[::7]):
+            tree |= AVLTree(other)
+            expected |= set(other)
+            tree &= AVLTree(entries[::2])
+            expected &= set(entries[::2])
+            tree -= AVLTree(other[::5])
+            expected -= set(other[::5])
+            tree ^= AVLTree(other)
+            expected ^= set(other)
+
+            assert list(tree) == sorted(expected)
+            assert_avl_invariants(tree.root)
+
+        with pytest.raises(RuntimeError):
+            cursor.next()
+
+    def test_in_place_set_operators_leave_larger_operand_alone(self, monkeypatch):
+        import pybstree
+        large = AVLTree(range(100000))
+        walked = []
+        range_nodes = pybstree._range_nodes
+
+        def recording_range_nodes(root, *args):
+            walked.append(root)
+            return range_nodes(root, *args)
+
+        def failing_copy_nodes(root):
+            raise AssertionError('an operand was copied')
+
+        monkeypatch.setattr(pybstree, '_range_nodes', recording_range_nodes)
+        monkeypatch.setattr(pybstree, '_copy_nodes', failing_copy_nodes)
+
+        tree = AVLTree([5, 7, 100001, -3])
+        tree &= large
+        assert list(tree) == [5, 7]
+        tree = AVLTree([5, 7, 100001, -3])
+        tree -= large
+        assert list(tree) == [-3, 100001]
+
+        assert walked and large.root not in walked
+        assert len(large) == 100000
+
+    def test_set_operators_keep_entries_of_left_operand(self):
+        tree = AVLTree(['Apple', 'kiwi'], key=str.lower) | AVLTree(['apple', 'Banana'], key=str.lower)
+
+        assert list(tree) == ['Apple', 'Banana', 'kiwi']
+        assert list(AVLTree([3, 1], key=str) & AVLTree([1, 2])) == [1]
+
+    def test_set_operators_with_other_types(self):
+        with pytest.raises(TypeError):
+            AVLTree([1]) | [2]
+        with pytest.raises(TypeError):
+            AVLTree([1]) & BinarySearchTree([1])
+
+
+class TestArrayAVLTree:
+    @pytest.fixture
+    def tree(self):
+        return ArrayAVLTree()
+
+    def test_empty_tree(self, tree):
+        assert not tree
+        assert len(tree) == 0
+        assert tree.height == 0
+        assert 10 not in tree
+        assert list(tree.traverse()) == []
+
+    def test_same_shape_as_avl_tree(self, tree):
+        import random
+        random.seed(7477)
+        reference = AVLTree()
+        entries = list(range(1000))
+        random.shuffle(entries)
+
+        for entry in entries:
+            tree.insert(entry)
+            reference.insert(entry)
+        assert list(tree.traverse('bfs')) == list(reference.traverse('bfs'))
+
+        random.shuffle(entries)
+        for entry in entries[:700]:
+            tree.delete(entry)
+            reference.delete(entry)
+            assert tree.height == reference.height
+        assert list(tree.traverse('bfs')) == list(reference.traverse('bfs'))
+        assert len(tree) == len(reference) == 300
+
+    @pytest.mark.parametrize("order", ['preorder', 'inorder', 'postorder', 'bfs'])
+    def test_traversal(self, order, tree):
+        for entry in [20, 10, 25, 23, 29, 30]:
+            tree.insert(entry)
+
+        assert list(tree.traverse(order)) == list(AVLTree([20, 10, 25, 23, 29, 30]).traverse(order))
+
+    def test_freed_nodes_are_reused(self, tree):
+        for entry in range(100):
+            tree.insert(entry)
+        for entry in range(0, 100, 2):
+            tree.delete(entry)
+        for entry in range(100, 150):
+            tree.insert(entry)
+
+        assert len(tree._entries) == 101
+        assert list(tree) == list(range(1, 100, 2)) + list(range(100, 150))
+
+    def test_search(self, tree):
+        for entry in [5, 3, 8]:
+            tree.insert(entry)
+
+        assert tree.search(8) == 8
+        with pytest.raises(KeyError) as context:
+            tree.search(4)
+        assert "Entry 4 not found." in str(context.value)
+
+    def test_contains_and_get(self, tree):
+        for entry in [5, 3, 8]:
+            tree.insert(entry)
+
+        assert 3 in tree
+        assert 4 not in tree
+        assert 9 not in tree
+        assert tree.get(8) == 8
+        assert tree.get(4) is None
+        assert tree.get(4, -1) == -1
+
+    def test_delete_not_existent_entry(self, tree):
+        with pytest.raises(KeyError):
+            tree.delete(1)
+
+        tree.insert(2)
+        with pytest.raises(KeyError):
+            tree.delete(1)
+
+    def test_pred_and_succ(self):
+        entries = get_random_entries()
+        tree = ArrayAVLTree(entries)
+        ordered = sorted(entries)
+
+        for prev, entry in zip(ordered, ordered[1:]):
+            assert tree.pred(entry) == prev
+            assert tree.succ(prev) == entry
+
+        with pytest.raises(KeyError) as context:
+            tree.pred(ordered[0])
+        assert f"Predecessor of {ordered[0]} not found." in str(context.value)
+        with pytest.raises(KeyError) as context:
+            tree.succ(ordered[-1])
+        assert f"Successor of {ordered[-1]} not found." in str(context.value)
+
+    def test_min_max(self, tree):
+        with pytest.raises(ValueError):
+            tree.min()
+        with pytest.raises(ValueError):
+            tree.max()
+
+        entries = get_random_entries()
+        tree = ArrayAVLTree(entries)
+        assert tree.min() == min(entries)
+        assert tree.max() == max(entries)
+
+    def test_float_entries(self):
+        tree = ArrayAVLTree([2.5, 0.5, 1.5], typecode='d')
+
+        assert list(tree) == [0.5, 1.5, 2.5]
+        assert 1.5 in tree
+
+    def test_constructor_not_properly_called(self):
+        with pytest.raises(TypeError) as context:
+            ArrayAVLTree(['a', 'b'])
+        assert "ArrayAVLTree constructor called with incompatible data type" in str(context.value)
+
+    def test_from_sorted(self):
+        tree = ArrayAVLTree.from_sorted(range(1, 8))
+
+        assert list(tree.traverse('bfs')) == [4, 2, 6, 1, 3, 5, 7]
+        assert tree == ArrayAVLTree([4, 2, 6, 1, 3, 5, 7])
+        assert tree != ArrayAVLTree(range(1, 7))
+
+    def test_copy_is_a_snapshot(self):
+        import copy
+        tree = ArrayAVLTree(range(10))
+        snapshot = copy.copy(tree)
+
+        tree.delete(5)
+        tree.insert(20)
+
+        assert list(snapshot) == list(range(10))
+        assert list(tree) == [0, 1, 2, 3, 4, 6, 7, 8, 9, 20]
+
+    def test_pickle(self):
+        import pickle
+        tree = ArrayAVLTree(range(100))
+
+        assert pickle.loads(pickle.dumps(tree)) == tree
+
+    def test_clear(self):
+        tree = ArrayAVLTree(range(10))
+        tree.clear()
+
+        assert not tree
+        assert len(tree._entries) == 1
+
+
+class TestAVLTreeMap:
+    @pytest.fixture
+    def tree_map(self):
+        return AVLTreeMap([(5, 'e'), (3, 'c'), (8, 'h'), (9, 'i'), (1, 'a'), (2, 'b')])
+
+    def test_empty_map(self):
+        tree_map = AVLTreeMap()
+
+        assert not tree_map
+        assert len(tree_map) == 0
+        assert 1 not in tree_map
+        assert list(tree_map) == []
+
+    def test_none_values(self):
+        tree_map = AVLTreeMap()
+        tree_map[1] = None
+        tree_map[2] = None
+        tree_map[3] = 'x'
+
+        assert len(tree_map) == 3
+        assert list(tree_map) == [1, 2, 3]
+        assert 1 in tree_map
+        assert tree_map[2] is None
+        assert list(tree_map.values()) == [None, None, 'x']
+
+        del tree_map[2]
+        assert list(tree_map.items()) == [(1, None), (3, 'x')]
+
+    def test_mapping_interface(self, tree_map):
+        assert tree_map[3] == 'c'
+        assert 3 in tree_map
+        assert 4 not in tree_map
+        assert tree_map.get(3) == 'c'
+        assert tree_map.get(4, 'x') == 'x'
+        assert len(tree_map) == 6
+
+        tree_map[4] = 'd'
+        tree_map[3] = 'C'
+        assert tree_map[4] == 'd'
+        assert tree_map[3] == 'C'
+        assert len(tree_map) == 7
+
+        del tree_map[5]
+        assert 5 not in tree_map
+        with pytest.raises(KeyError):
+            tree_map[5]
+        with pytest.raises(KeyError):
+            del tree_map[5]
+
+        assert tree_map == {1: 'a', 2: 'b', 3: 'C', 4: 'd', 8: 'h', 9: 'i'}
+
+    def test_ordered_views(self, tree_map):
+        assert list(tree_map) == [1, 2, 3, 5, 8, 9]
+        assert list(tree_map.keys()) == [1, 2, 3, 5, 8, 9]
+        assert list(tree_map.values()) == ['a', 'b', 'c', 'e', 'h', 'i']
+        assert list(tree_map.items())[:2] == [(1, 'a'), (2, 'b')]
+        assert list(reversed(tree_map)) == [9, 8, 5, 3, 2, 1]
+        assert list(reversed(tree_map.items()))[0] == (9, 'i')
+        assert (5, 'e') in tree_map.items()
+        assert 'e' in tree_map.values()
+
+    def test_only_keys_are_compared(self):
+        class Incomparable:
+            def __lt__(self, other):
+                raise AssertionError('values must not be compared')
+
+            __gt__ = __lt__
+
+        tree_map = AVLTreeMap()
+        for key in [3, 1, 2, 5, 4]:
+            tree_map[key] = Incomparable()
+        tree_map[3] = Incomparable()
+        del tree_map[1]
+
+        assert list(tree_map) == [2, 3, 4, 5]
+
+    def test_values_follow_keys_through_rotations(self):
+        import random
+        random.seed(7477)
+        keys = list(range(500))
+        random.shuffle(keys)
+        tree_map = AVLTreeMap()
+        reference = {}
+
+        for key in keys:
+            tree_map[key] = reference[key] = str(key)
+        for key in keys[:300]:
+            del tree_map[key]
+            del reference[key]
+
+        assert list(tree_map.items()) == sorted(reference.items())
+        assert tree_map.height <= 1.45 * math.log2(len(reference) + 2)
+
+    def test_floor_and_ceiling_item(self, tree_map):
+        assert tree_map.floor_item(5) == (5, 'e')
+        assert tree_map.floor_item(7) == (5, 'e')
+        assert tree_map.floor_item(100) == (9, 'i')
+        assert tree_map.ceiling_item(5) == (5, 'e')
+        assert tree_map.ceiling_item(6) == (8, 'h')
+        assert tree_map.ceiling_item(-1) == (1, 'a')
+
+        with pytest.raises(KeyError) as context:
+            tree_map.floor_item(0)
+        assert "Floor of 0 not found." in str(context.value)
+        with pytest.raises(KeyError) as context:
+            tree_map.ceiling_item(10)
+        assert "Ceiling of 10 not found." in str(context.value)
+
+    def test_pop_min_and_pop_max(self, tree_map):
+        assert tree_map.pop_min() == (1, 'a')
+        assert tree_map.pop_max() == (9, 'i')
+        assert tree_map.popitem() == (2, 'b')
+        assert list(tree_map) == [3, 5, 8]
+
+        tree_map.clear()
+        with pytest.raises(KeyError):
+            tree_map.pop_min()
+        with pytest.raises(KeyError):
+            tree_map.pop_max()
+
+    def test_irange(self, tree_map):
+        assert list(tree_map.irange(2, 8)) == [2, 3, 5]
+        assert list(tree_map.irange(2, 8, inclusive=(False, True), reverse=True)) == [8, 5, 3]
+        assert list(tree_map.irange_items(4)) == [(5, 'e'), (8, 'h'), (9, 'i')]
+
+    def test_initialize_from_mapping(self):
+        tree_map = AVLTreeMap({3: 'c', 1: 'a', 2: 'b'})
+
+        assert list(tree_map.items()) == [(1, 'a'), (2, 'b'), (3, 'c')]
+
+    def test_initialize_from_sorted_items(self):
+        tree_map = AVLTreeMap([(1, 'a'), (2, 'b'), (2, 'B'), (3, 'c')])
+
+        assert list(tree_map.items()) == [(1, 'a'), (2, 'B'), (3, 'c')]
+        assert tree_map.height == 2
+
+    def test_constructor_not_properly_called(self):
+        with pytest.raises(TypeError) as context:
+            AVLTreeMap(4)
+        assert ("AVLTreeMap constructor called with incompatible data type: "
+                "'int' object is not iterable" in str(context.value))
+
+    def test_copy(self, tree_map):
+        import copy
+        other = copy.copy(tree_map)
+        other[1] = 'z'
+        del other[2]
+
+        assert tree_map[1] == 'a'
+        assert 2 in tree_map
+        assert AVLTreeMap(tree_map) == tree_map
+
+    def test_deepcopy(self):
+        import copy
+        tree_map = AVLTreeMap([(2, ['b']), (1, ['a'])])
+
+        other = copy.deepcopy(tree_map)
+        tree_map[1].append('z')
+
+        assert other == {1: ['a'], 2: ['b']}
+
+    def test_pickle(self, tree_map):
+        import pickle
+        other = pickle.loads(pickle.dumps(tree_map))
+
+        assert other == tree_map
+        assert type(other) is AVLTreeMap
+
+    def test_repr(self):
+        assert repr(AVLTreeMap([(2, 'b'), (1, 'a')])) == "AVLTreeMap({1: 'a', 2: 'b'})"
+
+
+class TestBinarySearchTreeMultiset:
+    @pytest.fixture
+    def tree(self):
+        return BinarySearchTreeMultiset()
+
+    def test_add_remove_and_count(self, tree):
+        tree.add(5)
+        tree.add(3, 2)
+        tree.add(5, 3)
+        tree.insert(8)
+
+        assert len(tree) == 7
+        assert tree.count(5) == 4
+        assert tree.count(4) == 0
+        assert list(tree) == [3, 3, 5, 5, 5, 5, 8]
+        assert list(tree.items()) == [(3, 2), (5, 4), (8, 1)]
+
+        tree.remove(5, 3)
+        tree.delete(3)
+        tree.remove(8)
+
+        assert list(tree) == [3, 5]
+        assert 8 not in tree
+        assert len(tree) == 2
+
+    def test_remove_errors(self, tree):
+        tree.add(1, 2)
+
+        with pytest.raises(KeyError) as context:
+            tree.remove(4)
+        assert "Entry 4 not found." in str(context.value)
+        with pytest.raises(ValueError) as context:
+            tree.remove(1, 3)
+        assert "Cannot remove 3 occurrences of 1, there are 2." in str(context.value)
+        with pytest.raises(ValueError):
+            tree.add(1, 0)
+        assert tree.count(1) == 2
+
+    @pytest.mark.parametrize("n,error", [(2.5, TypeError), ('2', TypeError), (0, ValueError), (-1, ValueError)])
+    def test_counts_must_be_positive_integers(self, n, error, tree):
+        tree.add(1, 2)
+
+        with pytest.raises(error):
+            tree.add(1, n)
+        with pytest.raises(error):
+            tree.add(5, n)
+        with pytest.raises(error):
+            tree.remove(1, n)
+
+        assert list(tree.items()) == [(1, 2)]
+        assert len(tree) == 2
+
+    def test_build_from_entries_with_duplicates(self, tree):
+        for entries in ([4, 1, 4, 2, 4, 1], [1, 1, 2, 4, 4, 4]):
+            tree = tree.__class__(entries)
+
+            assert list(tree) == [1, 1, 2, 4, 4, 4]
+            assert list(tree.items()) == [(1, 2), (2, 1), (4, 3)]
+        assert tree.from_sorted([1, 1, 2, 4, 4, 4]) == tree
+        with pytest.raises(ValueError):
+            tree.from_sorted([2, 1])
+
+    def test_rank_select_and_quantile(self, tree):
+        import random
+        random.seed(4242)
+        entries = [random.randint(0, 50) for _ in range(500)]
+        for entry in entries:
+            tree.add(entry)
+        entries.sort()
+
+        for entry in range(-1, 52):
+            assert tree.rank(entry) == sum(1 for e in entries if e < entry)
+        assert [tree.select(i) for i in range(len(entries))] == entries
+        assert tree[-1] == entries[-1]
+        assert list(tree[10:200:7]) == entries[10:200:7]
+        assert list(tree[::-3]) == entries[::-3]
+        assert tree.quantile(0) == entries[0]
+        assert tree.quantile(0.5) == entries[249]
+        assert tree.quantile(0.99) == entries[494]
+        assert tree.quantile(1) == entries[-1]
+        with pytest.raises(IndexError):
+            tree.select(len(entries))
+
+    def test_totals_are_kept_through_deletes(self, tree):
+        import random
+        random.seed(1357)
+        entries = get_random_entries()
+        for entry in entries:
+            tree.add(entry, entry % 3 + 1)
+        for entry in entries[::2]:
+            tree.remove(entry, entry % 3 + 1)
+
+        expected = sorted(e for e in entries[1::2] for _ in range(e % 3 + 1))
+        assert list(tree) == expected
+        assert len(tree) == len(expected)
+        assert_totals(tree.root)
+
+    def test_key_counts_equal_entries(self, tree):
+        tree = tree.__class__(['b', 'A', 'a', 'B', 'a'], key=str.lower)
+
+        assert list(tree.items()) == [('A', 3), ('b', 2)]
+        assert tree.count('a') == 3
+
+    def test_irange(self, tree):
+        tree = tree.__class__([1, 2, 2, 3, 3, 3, 4])
+
+        assert list(tree.irange(2, 4)) == [2, 2, 3, 3, 3]
+        assert list(tree.irange(2, 3, inclusive=(False, True), reverse=True)) == [3, 3, 3]
+
+    def test_insert_many_and_delete_many(self, tree):
+        tree.insert_many([3, 1, 3, 2])
+        tree.delete_many([3, 1])
+
+        assert list(tree) == [2, 3]
+        with pytest.raises(ValueError):
+            tree.delete_many([3, 3])
+        with pytest.raises(KeyError):
+            tree.delete_many([2, 7])
+        assert list(tree) == [2, 3]
+
+    def test_copy_pickle_and_save(self, tree, tmp_path):
+        import copy
+        import pickle
+        tree = tree.__class__([5, 1, 5, 5, 2])
+        path = tmp_path / 'multiset.bin'
+
+        other = copy.copy(tree)
+        other.add(5)
+        tree.save(path)
+
+        assert tree.count(5) == 3
+        assert pickle.loads(pickle.dumps(tree)) == tree
+        assert tree.load(path) == tree
+        assert_totals(tree.load(path).root)
+        with pytest.raises(ValueError):
+            AVLTree.load(path)
+
+    @pytest.mark.parametrize("keep_shape", [True, False])
+    def test_save_keep_shape(self, keep_shape, tree, tmp_path):
+        for entry in [1, 2, 3, 4, 5, 6, 7, 2, 7, 7]:
+            tree.add(entry)
+        path = tmp_path / 'multiset.bin'
+
+        tree.save(path, keep_shape=keep_shape)
+        other = tree.load(path)
+
+        assert list(other) == list(tree)
+        assert [other.count(entry) for entry in range(1, 8)] == [1, 2, 1, 1, 1, 1, 3]
+        assert other == tree
+        assert other.height == (tree.height if keep_shape else 3)
+        assert_totals(other.root)
+
+    def test_load_rejects_files_of_other_multisets(self, tree, tmp_path):
+        path = tmp_path / 'multiset.bin'
+        tree.__class__([2, 1, 2]).save(path)
+
+        for other in (BinarySearchTreeMultiset, AVLTreeMultiset):
+            if other is not type(tree):
+                with pytest.raises(ValueError):
+                    other.load(path)
+
+    def test_repr(self, tree):
+        tree = tree.__class__([2, 1, 2])
+        assert repr(tree) == str(tree) == f'{type(tree).__name__}([1, 2, 2])'
+
+
+class TestAVLTreeMultiset(TestBinarySearchTreeMultiset):
+    @pytest.fixture
+    def tree(self):
+        return AVLTreeMultiset()
+
+    def test_stays_balanced(self, tree):
+        for entry in range(200):
+            tree.add(entry, 2)
+        for entry in range(0, 200, 3):
+            tree.remove(entry, 2)
+
+        assert_avl_invariants(tree.root)
+        assert_totals(tree.root)
+
+
+def assert_aggregates(node, monoid):
+    if not node:
+        assert node.aggregate == monoid.identity
+        return monoid.identity
+    left, right = assert_aggregates(node.left, monoid), assert_aggregates(node.right, monoid)
+    assert node.aggregate == monoid.combine(monoid.combine(left, monoid.measure_of(node.entry)), right)
+    return node.aggregate
+
+
+class TestAugmentedAVLTree:
+    def test_aggregate_sums_by_default(self):
+        tree = AugmentedAVLTree(range(100))
+
+        assert tree.aggregate() == sum(range(100))
+        assert tree.aggregate(10, 20) == sum(range(10, 20))
+        assert tree.aggregate(10, 20, inclusive=(False, True)) == sum(range(11, 21))
+        assert tree.aggregate(hi=50) == sum(range(50))
+        assert tree.aggregate(200) == 0
+        assert repr(AugmentedAVLTree([1, 2, 3])) == 'AugmentedAVLTree([2, 1, 3])'
+        assert AugmentedAVLTree().aggregate() == 0
+
+    def test_min_and_max(self):
+        entries = [5, 3, 8, 1, 9, 7]
+        lowest = AugmentedAVLTree(entries, monoid=Monoid.min())
+        highest = AugmentedAVLTree(entries, monoid=Monoid.max())
+
+        assert lowest.aggregate() == 1
+        assert lowest.aggregate(4) == 5
+        assert highest.aggregate(hi=8) == 7
+        assert highest.aggregate(10) == -math.inf
+
+    def test_custom_monoid_with_measure(self):
+        import operator
+        monoid = Monoid(operator.add, '', measure=lambda entry: entry[1])
+        tree = AugmentedAVLTree([(3, 'c'), (1, 'a'), (2, 'b'), (4, 'd')], key=lambda entry: entry[0], monoid=monoid)
+
+        assert tree.aggregate() == 'abcd'
+        assert tree.aggregate((2, ''), (4, '')) == 'bc'
+        assert tree.aggregate((2, ''), (4, ''), inclusive=(True, True)) == 'bcd'
+
+    def test_aggregates_follow_updates(self):
+        import operator
+        import random
+        random.seed(2207)
+        monoid = Monoid(operator.add, '', measure=str)
+        tree = AugmentedAVLTree(monoid=monoid)
+        entries = random.sample(range(1000), 300)
+        for entry in entries:
+            tree.insert(entry)
+        for entry in entries[::2]:
+            tree.delete(entry)
+        tree.insert_many(range(1000, 1050))
+        tree.delete_many(entries[1:100:2])
+
+        assert_avl_invariants(tree.root)
+        assert_aggregates(tree.root, monoid)
+        kept = list(tree)
+        for _ in range(200):
+            lo, hi = sorted(random.sample(range(1100), 2))
+            assert tree.aggregate(lo, hi) == ''.join(str(entry) for entry in kept if lo <= entry < hi)
+
+    def test_derived_trees_keep_the_monoid(self, tmp_path):
+        import copy
+        import pickle
+        monoid = Monoid.max()
+        tree = AugmentedAVLTree(range(0, 100, 3), monoid=monoid)
+        other = AugmentedAVLTree(range(0, 100, 5))
+        tree.save(tmp_path / 'tree.bst')
+
+        for result in (tree | other, tree & other, tree - other, tree ^ other, tree.copy(),
+                       copy.deepcopy(tree), pickle.loads(pickle.dumps(tree)),
+                       AugmentedAVLTree.load(tmp_path / 'tree.bst'),
+                       AugmentedAVLTree.from_sorted(range(10), monoid=monoid)):
+            assert isinstance(result, AugmentedAVLTree)
+            assert result.aggregate() == max(result)
+            assert_aggregates(result.root, result.monoid)
+
+        lesser, entry, greater = tree.copy().split(50)
+        assert entry is None
+        assert (lesser.aggregate(), greater.aggregate()) == (48, 99)
+        joined = AugmentedAVLTree.join(lesser, 50, greater)
+        assert joined.monoid is monoid
+        assert joined.aggregate(hi=60) == 57
+        assert_aggregates(joined.root, monoid)
+
+    def test_join_rejects_other_monoids(self):
+        with pytest.raises(ValueError):
+            AugmentedAVLTree.join(AugmentedAVLTree([1]), 2, AugmentedAVLTree([3], monoid=Monoid.max()))
+
+    def test_join_with_unpickled_and_loaded_trees(self, tmp_path):
+        import pickle
+        AugmentedAVLTree(range(6, 9)).save(tmp_path / 'tree.bst')
+
+        joined = AugmentedAVLTree.join(AugmentedAVLTree(range(5)), None,
+                                       pickle.loads(pickle.dumps(AugmentedAVLTree(range(6, 9)))))
+        assert list(joined) == [0, 1, 2, 3, 4, 6, 7, 8]
+        assert joined.monoid is AugmentedAVLTree._default_monoid
+
+        joined = AugmentedAVLTree.join(AugmentedAVLTree(range(5)), 5, AugmentedAVLTree.load(tmp_path / 'tree.bst'))
+        assert joined.aggregate() == sum(range(9))
+
+
+class TestIntervalTree:
+    @pytest.fixture
+    def intervals(self):
+        import random
+        random.seed(2303)
+        intervals = set()
+        while len(intervals) < 500:
+            start = random.randrange(1000)
+            intervals.add((start, start + random.randrange(1, 100)))
+        return intervals
+
+    def test_overlap_and_at(self, intervals):
+        import random
+        random.seed(2304)
+        tree = IntervalTree(intervals)
+
+        for _ in range(200):
+            lo = random.randrange(-50, 1150)
+            hi = lo + random.randrange(1, 200)
+            assert list(tree.overlap(lo, hi)) == sorted(i for i in intervals if i[0] < hi and lo < i[1])
+            assert list(tree.at(lo)) == sorted(i for i in intervals if i[0] <= lo < i[1])
+
+    def test_intervals_are_half_open(self):
+        tree = IntervalTree([(1, 3), (3, 5), (6, 8)])
+
+        assert list(tree.at(3)) == [(3, 5)]
+        assert list(tree.at(5)) == []
+        assert list(tree.overlap(5, 6)) == []
+        assert list(tree.overlap(4, 7)) == [(3, 5), (6, 8)]
+        assert list(tree.overlap(2, 2)) == []
+        assert list(IntervalTree().at(0)) == []
+
+    def test_updates_keep_max_end(self, intervals):
+        tree = IntervalTree()
+        for interval in intervals:
+            tree.insert(interval)
+        for interval in list(intervals)[::2]:
+            tree.delete(interval)
+        kept = set(list(intervals)[1::2])
+
+        assert_avl_invariants(tree.root)
+        assert_aggregates(tree.root, tree.monoid)
+        assert tree.aggregate() == max(end for _, end in kept)
+        assert list(tree.overlap(300, 400)) == sorted(i for i in kept if i[0] < 400 and 300 < i[1])
+
+    def test_from_sorted_and_pickle(self, intervals):
+        import pickle
+        tree = IntervalTree.from_sorted(sorted(intervals))
+        loaded = pickle.loads(pickle.dumps(tree))
+
+        assert isinstance(loaded, IntervalTree)
+        assert list(loaded) == list(tree) == sorted(intervals)
+        assert list(loaded.at(500)) == list(tree.at(500))
+        assert_aggregates(tree.root, tree.monoid)
+
+    def test_intervals_with_data(self):
+        tree = IntervalTree([(9, 12, {'room': 'b'}), (8, 10, {'room': 'a'})], key=lambda interval: interval[:2])
+
+        assert [data['room'] for _, _, data in tree.at(9)] == ['a', 'b']
+        assert tree.search((9, 12)) == (9, 12, {'room': 'b'})
+
+
+def assert_rb_root(root):
+    assert not root.red
+    assert_rb_invariants(root)
+
+
+def assert_rb_invariants(node):
+    if not node:
+        return 1
+    if node.red:
+        assert not node.left.red and not node.right.red
+    left, right = assert_rb_invariants(node.left), assert_rb_invariants(node.right)
+    assert left == right
+    assert node.height == 1 + max(node.left.height, node.right.height)
+    assert node.size == 1 + node.left.size + node.right.size
+    return left + (not node.red)
+
+
+class TestRBTree(TestBinarySearchTree):
+    @pytest.fixture
+    def tree(self):
+        return RBTree()
+
+    @pytest.fixture
+    def make_tree_from_entries(self):
+        def _make_tree(entries):
+            return RBTree(entries)
+
+        return _make_tree
+
+    def test_initialize_tree_from_sequence(self, make_tree_from_entries):
+        tree = make_tree_from_entries([5, 3, 8, 9, 1, 2])
+
+        assert tuple(tree.traverse('bfs')) == (5, 2, 8, 1, 3, 9)
+        assert_rb_root(tree.root)
+
+    @pytest.mark.parametrize("entries,expected", [
+        ([2, 1, 4, 3, 5], 'RBTree([2, 1, 4, 3, 5])'),
+        ([], 'RBTree([])')
+    ])
+    def test_str(self, entries, expected, make_tree_from_entries):
+        tree = make_tree_from_entries(entries)
+        assert str(tree) == expected
+
+    def test_stays_balanced_under_updates(self):
+        import random
+        random.seed(2401)
+        tree = RBTree()
+        entries = set()
+        for _ in range(3000):
+            entry = random.randrange(500)
+            if random.random() < 0.6:
+                tree.insert(entry)
+                entries.add(entry)
+            elif entry in entries:
+                tree.delete(entry)
+                entries.discard(entry)
+
+        assert_rb_root(tree.root)
+        assert list(tree) == sorted(entries)
+        assert tree.height <= 2 * math.log2(len(tree) + 1)
+
+        for entry in sorted(entries)[::3]:
+            tree.delete(entry)
+            assert_rb_root(tree.root)
+
+    def test_root_is_black(self, tree):
+        tree.insert(1)
+        assert_rb_root(tree.root)
+
+        tree.insert(2)
+        tree.delete(1)
+        assert_rb_root(tree.root)
+
+        tree.delete(2)
+        tree.insert(3)
+        assert_rb_root(tree.root)
+
+    def test_sorted_inserts_stay_shallow(self, tree):
+        for entry in range(1000):
+            tree.insert(entry)
+
+        assert_rb_root(tree.root)
+        assert tree.height <= 2 * math.log2(len(tree) + 1)
+
+    @pytest.mark.parametrize('size', [0, 1, 2, 3, 7, 8, 100])
+    def test_bulk_built_trees_are_colored(self, size):
+        tree = RBTree(range(size))
+        assert_rb_root(tree.root)
+
+        tree.insert_many(range(size, 3 * size))
+        assert_rb_root(tree.root)
+
+        tree.delete_many(range(0, 3 * size, 2))
+        assert_rb_root(tree.root)
+        assert list(tree) == list(range(1, 3 * size, 2))
+
+    def test_copies_and_pickles_keep_the_colors(self):
+        import copy
+        import pickle
+        tree = RBTree()
+        for entry in range(50):
+            tree.insert(entry)
+
+        for other in (tree.copy(), copy.deepcopy(tree), pickle.loads(pickle.dumps(tree))):
+            assert isinstance(other, RBTree)
+            assert other == tree
+            assert list(other._shape()) == list(tree._shape())
+            assert_rb_root(other.root)
+            other.insert(50)
+            assert_rb_root(other.root)
+
+    def test_repr(self):
+        assert repr(RBTree([1, 2, 3])) == 'RBTree([2, 1, 3])'
+
+
+def assert_treap_invariants(node):
+    if not node:
+        return
+    for child in (node.left, node.right):
+        assert not child or child.priority <= node.priority
+    assert_treap_invariants(node.left)
+    assert_treap_invariants(node.right)
+    assert node.height == 1 + max(node.left.height, node.right.height)
+    assert node.size == 1 + node.left.size + node.right.size
+
+
+class DecreasingPriorities:
+    """Stands in for the random generator of a Treap. Every priority drawn is lower than the
+    ones before, so inserted entries stay where a BinarySearchTree would put them."""
+
+    def __init__(self):
+        self.priority = 1 << 32
+
+    def getrandbits(self, bits):
+        self.priority -= 1
+        return self.priority
+
+
+class TestTreap(TestBinarySearchTree):
+    @pytest.fixture
+    def tree(self):
+        return Treap(rng=DecreasingPriorities())
+
+    @pytest.fixture
+    def make_tree_from_entries(self):
+        def _make_tree(entries):
+            return Treap(entries, rng=DecreasingPriorities())
+
+        return _make_tree
+
+    @pytest.mark.parametrize("entries,expected", [
+        ([2, 1, 4, 3, 5], 'Treap([2, 1, 4, 3, 5])'),
+        ([1, 5, 2, 4, 3], 'Treap([1, 5, 2, 4, 3])'),
+        ([], 'Treap([])')
+    ])
+    def test_str(self, entries, expected, make_tree_from_entries):
+        tree = make_tree_from_entries(entries)
+        assert str(tree) == expected
+
+    def test_stays_shallow_under_updates(self):
+        import random
+        random.seed(2502)
+        tree = Treap(rng=random.Random(2503))
+        for entry in range(2000):
+            tree.insert(entry)
+        entries = set(range(2000))
+        for _ in range(3000):
+            entry = random.randrange(4000)
+            if random.random() < 0.5:
+                tree.insert(entry)
+                entries.add(entry)
+            elif entry in entries:
+                tree.delete(entry)
+                entries.discard(entry)
+
+        assert_treap_invariants(tree.root)
+        assert list(tree) == sorted(entries)
+        assert tree.height <= 4 * math.log2(len(tree) + 1)
+
+    def test_same_seed_gives_same_tree(self):
+        import random
+        entries = get_random_entries()
+        tree = Treap(rng=random.Random(7))
+        other = Treap(rng=random.Random(7))
+        for entry in entries:
+            tree.insert(entry)
+            other.insert(entry)
+
+        assert tree == other
+        assert list(tree._shape()) == list(other._shape())
+
+    def test_bulk_built_trees_are_heaps(self):
+        import random
+        tree = Treap(range(100), rng=random.Random(2504))
+        assert_treap_invariants(tree.root)
+
+        tree.insert_many(range(100, 300))
+        assert_treap_invariants(tree.root)
+        assert tree.height == math.ceil(math.log2(len(tree) + 1))
+
+        for entry in range(300, 400):
+            tree.insert(entry)
+        assert_treap_invariants(tree.root)
+
+    def test_split(self):
+        import random
+        tree = Treap(rng=random.Random(2505))
+        for entry in range(0, 200, 2):
+            tree.insert(entry)
+
+        lesser, entry, greater = tree.split(100)
+        assert entry == 100
+        assert list(lesser) == list(range(0, 100, 2))
+        assert list(greater) == list(range(102, 200, 2))
+        assert not tree
+        for part in (lesser, greater):
+            assert_treap_invariants(part.root)
+            assert part.rng is not tree.rng
+        assert lesser.rng.getrandbits(32) != greater.rng.getrandbits(32)
+
+        lesser, entry, greater = Treap(range(10)).split(4.5)
+        assert entry is None
+        assert (list(lesser), list(greater)) == ([0, 1, 2, 3, 4], [5, 6, 7, 8, 9])
+
+    def test_merge(self):
+        import random
+        left = Treap(rng=random.Random(2506))
+        right = Treap(rng=random.Random(2507))
+        for entry in range(100):
+            left.insert(entry)
+            right.insert(entry + 100)
+
+        tree = Treap.merge(left, right)
+        assert list(tree) == list(range(200))
+        assert_treap_invariants(tree.root)
+        assert not left and not right
+
+        assert list(Treap.merge(Treap(), Treap([1]))) == [1]
+        with pytest.raises(ValueError):
+            Treap.merge(Treap([5]), Treap([3]))
+        with pytest.raises(ValueError):
+            Treap.merge(Treap([1]), Treap([3], key=lambda entry: -entry))
+
+    def test_merge_rejects_other_trees(self):
+        with pytest.raises(TypeError) as context:
+            Treap.merge(AVLTree([1, 2]), AVLTree([5]))
+        assert "Treap.merge expects two Treap instances, got AVLTree and AVLTree." in str(context.value)
+
+        with pytest.raises(TypeError):
+            Treap.merge(Treap([1]), RBTree([5]))
+
+    def test_copies_and_pickles_keep_the_priorities(self):
+        import copy
+        import pickle
+        import random
+        tree = Treap(rng=random.Random(2508))
+        for entry in range(50):
+            tree.insert(entry)
+
+        for other in (tree.copy(), copy.deepcopy(tree), pickle.loads(pickle.dumps(tree))):
+            assert isinstance(other, Treap)
+            assert other == tree
+            assert list(other._shape()) == list(tree._shape())
+            other.insert(50)
+            assert_treap_invariants(other.root)
+
+    def test_copies_draw_from_their_own_rng(self):
+        import copy
+        import random
+        tree = Treap(range(10), rng=random.Random(2509))
+        copies = [tree.copy(), copy.copy(tree), copy.deepcopy(tree)]
+        state, first_state = tree.rng.getstate(), copies[0].rng.getstate()
+
+        for other in copies:
+            assert other.rng is not tree.rng
+            other.insert_many(range(10, 20))
+            assert tree.rng.getstate() == state
+
+        draws = [other.rng.getrandbits(32) for other in copies + [tree]]
+        assert len(set(draws)) == len(draws)
+
+        same = Treap(range(10), rng=random.Random(2509)).copy()
+        assert same.rng.getstate() == first_state
+
+        tree = Treap(range(10), rng=random.SystemRandom())
+        assert copy.deepcopy(tree) == tree
+        assert type(tree.copy().rng) is random.Random
+
+
+class TestPersistentAVLTree:
+    @pytest.fixture
+    def tree(self):
+        return PersistentAVLTree(range(0, 100, 2))
+
+    def test_insert_returns_new_tree(self, tree):
+        other = tree.insert(51)
+
+        assert 51 in other
+        assert 51 not in tree
+        assert len(other) == len(tree) + 1
+        assert tree.insert(50) is not tree
+        assert list(tree.insert(50)) == list(tree)
+
+    def test_delete_returns_new_tree(self, tree):
+        other = tree.delete(50)
+
+        assert 50 not in other
+        assert 50 in tree
+        assert list(other) == [entry for entry in range(0, 100, 2) if entry != 50]
+        with pytest.raises(KeyError):
+            tree.delete(51)
+
+    def test_versions_stay_valid(self):
+        import random
+        random.seed(1812)
+        entries = get_random_entries()
+        versions = [PersistentAVLTree()]
+        for entry in entries:
+            versions.append(versions[-1].insert(entry))
+        for entry in entries[::2]:
+            versions.append(versions[-1].delete(entry))
+
+        for i, version in enumerate(versions[:len(entries) + 1]):
+            assert list(version) == sorted(entries[:i])
+            assert_avl_invariants(version.root)
+        assert list(versions[-1]) == sorted(entries[1::2])
+        assert_avl_invariants(versions[-1].root)
+
+    def test_updates_share_untouched_subtrees(self, tree):
+        def nodes(root):
+            stack, found = [root], set()
+            while stack:
+                node = stack.pop()
+                if node:
+                    found.add(id(node))
+                    stack.extend((node.left, node.right))
+            return found
+
+        other = tree.insert(51).delete(0)
+
+        assert len(nodes(other.root) - nodes(tree.root)) <= 2 * (tree.height + 1)
+
+    @pytest.mark.parametrize("batch", [[7, 3, 3, 200], list(range(-50, 50))], ids=['per-entry', 'rebuild'])
+    def test_insert_many_and_delete_many(self, tree, batch):
+        inserted = tree.insert_many(batch)
+        deleted = inserted.delete_many(batch)
+
+        assert list(inserted) == sorted(set(range(0, 100, 2)) | set(batch))
+        assert list(deleted) == sorted(set(range(0, 100, 2)) - set(batch))
+        assert list(tree) == list(range(0, 100, 2))
+        with pytest.raises(KeyError) as context:
+            tree.delete_many([2, 3])
+        assert "Entry 3 not found." in str(context.value)
+
+    def test_copy_and_clear(self, tree):
+        import copy
+
+        assert copy.copy(tree) is tree
+        assert tree.copy() is tree
+        assert not tree.clear()
+        assert len(tree) == 50
+
+        duplicate = copy.deepcopy(tree)
+        assert duplicate is not tree
+        assert duplicate == tree
+        assert duplicate.root is not tree.root
+
+    def test_deepcopy_does_not_share_entries(self):
+        import copy
+
+        tree = PersistentAVLTree([[1], [2], [3]], key=lambda entry: entry[0])
+        newer = tree.insert([4])
+        duplicate = copy.deepcopy(tree)
+
+        duplicate.search([1]).append('x')
+
+        assert tree.search([1]) == [1]
+        assert newer.search([1]) == [1]
+        assert list(duplicate) == [[1, 'x'], [2], [3]]
+
+    def test_build_from_other_trees(self, tree):
+        assert PersistentAVLTree(tree).root is tree.root
+        mutable = AVLTree(tree)
+        mutable.insert(1)
+
+        assert 1 not in tree
+        assert list(PersistentAVLTree(mutable)) == sorted(list(tree) + [1])
+
+    def test_queries(self, tree):
+        assert tree.search(50) == 50
+        assert tree.floor(51) == 50
+        assert tree.select(3) == 6
+        assert tree.rank(6) == 3
+        assert list(tree.irange(10, 16)) == [10, 12, 14]
+        assert repr(PersistentAVLTree([1, 2, 3])) == 'PersistentAVLTree([2, 1, 3])'
+
+
+class TestConcurrentAVLTree:
+    def test_updates_and_queries(self):
+        tree = ConcurrentAVLTree([5, 3, 8])
+
+        tree.insert(4)
+        tree.delete(8)
+        tree.insert_many([10, 1])
+        tree.delete_many([10])
+
+        assert list(tree) == [1, 3, 4, 5]
+        assert len(tree) == 4
+        assert 4 in tree and 8 not in tree
+        assert tree.search(4) == 4
+        assert tree.get(8, 'x') == 'x'
+        assert tree.floor(2) == 1
+        assert tree.select(1) == 3 and tree[-1] == 5
+        assert tree.contains_many([5, 6]) == [True, False]
+        assert list(tree.irange(3, 5)) == [3, 4]
+        assert (tree.min(), tree.max()) == (1, 5)
+        assert (tree.pred(4), tree.succ(4)) == (3, 5)
+        assert tree.quantile(0.5) == 3
+        assert list(tree.traverse()) == [1, 3, 4, 5]
+        assert list(tree.traverse('bfs')) == list(tree.snapshot().traverse('bfs'))
+        assert repr(ConcurrentAVLTree([1, 2, 3])) == 'ConcurrentAVLTree([2, 1, 3])'
+        with pytest.raises(KeyError):
+            tree.pred(1)
+        with pytest.raises(KeyError):
+            tree.delete(8)
+
+        tree.clear()
+        assert not tree
+
+    def test_snapshot_is_not_affected_by_updates(self):
+        tree = ConcurrentAVLTree(range(10), key=lambda entry: -entry)
+        snapshot = tree.snapshot()
+
+        tree.delete(5)
+        tree.insert(20)
+
+        assert list(snapshot) == list(range(9, -1, -1))
+        assert list(tree)[:2] == [20, 9]
+        assert list(ConcurrentAVLTree(tree)) == [0, 1, 2, 3, 4, 6, 7, 8, 9, 20]
+
+    def test_pickle_save_and_load(self, tmp_path):
+        import pickle
+        tree = ConcurrentAVLTree([5, 1, 3], key=abs)
+
+        other = pickle.loads(pickle.dumps(tree))
+        other.insert(-4)
+        tree.save(tmp_path / 'tree.bin')
+        loaded = ConcurrentAVLTree.load(tmp_path / 'tree.bin')
+        loaded.insert(2)
+
+        assert list(other) == [1, 3, -4, 5]
+        assert list(loaded) == [1, 2, 3, 5]
+        assert loaded.key is abs
+
+    def test_readers_see_consistent_versions_under_writes(self):
+        import random
+        import threading
+        stable = list(range(0, 4000, 4))
+        tree = ConcurrentAVLTree(stable)
+        failures = []
+        done = threading.Event()
+
+        def writer(seed):
+            rng = random.Random(seed)
+            for _ in range(1000):
+                entry = rng.randrange(4000) * 4 + 1 + seed
+                if entry in tree and rng.random() < 0.5:
+                    tree.delete(entry)
+                else:
+                    tree.insert(entry)
+
+        def reader():
+            rng = random.Random()
+            while not done.is_set():
+                snapshot = tree.snapshot()
+                entries = list(snapshot)
+                if entries != sorted(set(entries)) or len(entries) != len(snapshot):
+                    failures.append('unordered snapshot')
+                if not all(entry in tree for entry in rng.sample(stable, 50)):
+                    failures.append('lost a stable entry')
+                try:
+                    assert_avl_invariants(snapshot.root)
+                except AssertionError:
+                    failures.append('unbalanced snapshot')
+
+        writers = [threading.Thread(target=writer, args=(seed,)) for seed in range(3)]
+        readers = [threading.Thread(target=reader) for _ in range(4)]
+        for thread in readers + writers:
+            thread.start()
+        for thread in writers:
+            thread.join()
+        done.set()
+        for thread in readers:
+            thread.join()
+
+        assert not failures
+        assert list(tree) == sorted(tree)
+        assert set(stable) <= set(tree)
+        assert_avl_invariants(tree.snapshot().root)
+
 
 def get_random_entries():
     from random import randint, shuffle, seed